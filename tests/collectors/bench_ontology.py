@@ -0,0 +1,81 @@
+#!/bin/env python
+"""Measure the NetworkConnection ontology payload of a single-page app session, with and without coalescing.
+
+Run from the root of the repository:
+    python -m tests.collectors.bench_ontology --entries 10000 --endpoints 5
+
+The synthetic session loads a few resources then polls a handful of endpoints, and the size reported is the
+size of the JSON serialized NetworkConnection parts. Tags are counted as the number of values validated.
+"""
+
+import argparse
+import hashlib
+import json
+import time
+
+from urldownloader.collectors import NetworkConnectionCollector, TagDeduplicator
+from urldownloader.har import HAREntry
+
+
+def synthetic_entries(count, endpoints):
+    headers = [{"name": "Content-Type", "value": "application/json"}, {"name": "Cache-Control", "value": "no-store"}]
+    for i in range(count):
+        url = f"http://spa.test/api/poll/{i % endpoints}" if i >= 20 else f"http://spa.test/static/{i}.js"
+        yield {
+            "request": {"url": url, "method": "GET", "headers": headers},
+            "response": {
+                "status": 200,
+                "headers": headers,
+                "content": {
+                    "size": 15,
+                    "mimeType": "application/json",
+                    "_replaced": hashlib.sha256(url.encode()).hexdigest(),
+                },
+            },
+        }
+
+
+def run(entries, coalesce):
+    collector = NetworkConnectionCollector(coalesce=coalesce)
+    validated = []
+    add_unique_tag = TagDeduplicator(lambda section, tag_type, value: validated.append(value))
+    start = time.monotonic()
+    for har_entry in entries:
+        entry = HAREntry(har_entry)
+        http_details = {
+            "request_uri": entry.url,
+            "request_headers": entry.request_headers.to_dict(),
+            "request_method": entry.method,
+            "response_headers": entry.response_headers.to_dict(),
+            "response_status_code": entry.status,
+            "response_content_fileinfo": {"sha256": entry.content["_replaced"]},
+            "response_content_mimetype": entry.content["mimeType"],
+        }
+        collector.add(http_details)
+        if coalesce:
+            add_unique_tag(None, "network.static.uri", entry.url)
+        else:
+            validated.append(entry.url)
+    parts = []
+    collector.emit(lambda details: parts.append(json.dumps({"http_details": details, "connection_type": "http"})))
+    elapsed = time.monotonic() - start
+    return len(parts), sum(len(part) for part in parts), len(validated), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--endpoints", type=int, default=5)
+    options = parser.parse_args()
+
+    entries = list(synthetic_entries(options.entries, options.endpoints))
+    for coalesce in (False, True):
+        parts, size, tags, elapsed = run(entries, coalesce)
+        print(
+            f"coalesce={coalesce!s:<5} parts: {parts:<6} ontology: {size / 1024:.0f}KiB "
+            f"tags validated: {tags:<6} time: {elapsed * 1000:.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
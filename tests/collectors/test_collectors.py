@@ -0,0 +1,71 @@
+from urldownloader.collectors import NetworkConnectionCollector, TagDeduplicator
+
+
+def http_details(url, status=200, sha256=None):
+    details = {
+        "request_uri": url,
+        "request_headers": {},
+        "request_method": "GET",
+        "response_headers": {},
+        "response_status_code": status,
+    }
+    if sha256:
+        details["response_content_fileinfo"] = {"sha256": sha256}
+    return details
+
+
+POLLING_SESSION = [
+    http_details("http://test.test/"),
+    http_details("http://test.test/poll", sha256="a"),
+    http_details("http://test.test/poll", sha256="a"),
+    http_details("http://test.test/poll", sha256="b"),
+    http_details("http://test.test/poll", sha256="a"),
+    http_details("http://test.test/poll", status=500),
+]
+
+
+def collect(collector):
+    for details in POLLING_SESSION:
+        collector.add(details)
+    emitted = []
+    collector.emit(emitted.append)
+    return emitted
+
+
+def test_connections_are_kept_by_default():
+    collector = NetworkConnectionCollector()
+    assert collect(collector) == POLLING_SESSION
+    assert collector.repeated() == []
+
+
+def test_identical_connections_are_coalesced():
+    collector = NetworkConnectionCollector(coalesce=True)
+    assert collect(collector) == [POLLING_SESSION[i] for i in (0, 1, 3, 5)]
+    assert collector.repeated() == [(POLLING_SESSION[1], 3)]
+
+
+def test_connection_ceiling():
+    collector = NetworkConnectionCollector(max_connections=2)
+    assert collect(collector) == POLLING_SESSION[:2]
+    assert collector.dropped == 4
+
+    collector = NetworkConnectionCollector(coalesce=True, max_connections=2)
+    assert collect(collector) == POLLING_SESSION[:2]
+    # Repeats of a kept connection are still counted
+    assert collector.repeated() == [(POLLING_SESSION[1], 3)]
+    assert collector.dropped == 2
+
+
+def test_tags_are_added_once_per_section():
+    added = []
+    add_unique_tag = TagDeduplicator(lambda section, tag_type, value: added.append((section, tag_type, value)))
+    first, second = object(), object()
+    for section in (first, second, first):
+        add_unique_tag(section, "network.static.uri", "http://test.test/")
+        add_unique_tag(section, "network.static.uri", "http://test.test/poll")
+    assert added == [
+        (first, "network.static.uri", "http://test.test/"),
+        (first, "network.static.uri", "http://test.test/poll"),
+        (second, "network.static.uri", "http://test.test/"),
+        (second, "network.static.uri", "http://test.test/poll"),
+    ]
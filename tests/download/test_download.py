@@ -0,0 +1,74 @@
+import hashlib
+import os
+import tempfile
+
+from urldownloader.download import Download
+
+
+class Sniffer:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, buf, length, path):
+        with open(path, "rb") as f:
+            self.calls.append((buf, length, f.read()))
+        return {"type": "archive/zip" if buf.startswith(b"PK") else "unknown"}
+
+
+def test_hashes_and_sniff():
+    sniffer = Sniffer()
+    chunks = [b"PK\x03\x04first", b"", b"second", b"third"]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "requests_content")
+        with Download(path, sniff=sniffer) as download:
+            for chunk in chunks:
+                assert download.write(chunk)
+        with open(path, "rb") as f:
+            assert f.read() == b"".join(chunks)
+
+    content = b"".join(chunks)
+    assert not download.truncated
+    assert download.size == len(content)
+    assert download.sha256 == hashlib.sha256(content).hexdigest()
+    assert download.hashes["md5"] == hashlib.md5(content).hexdigest()
+    # Only the first chunk is sniffed, once it is on disk
+    assert sniffer.calls == [(chunks[0], len(chunks[0]), chunks[0])]
+    assert download.sniffed == {"type": "archive/zip"}
+
+
+def test_reset():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "requests_content")
+        with Download(path, max_size=5) as download:
+            assert not download.write(b"partial content")
+            download.reset()
+            assert download.write(b"full")
+        with open(path, "rb") as f:
+            assert f.read() == b"full"
+
+    assert not download.truncated
+    assert download.size == 4
+    assert download.sha256 == hashlib.sha256(b"full").hexdigest()
+
+
+def test_size_limit():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "requests_content")
+        with Download(path, max_size=10) as download:
+            assert download.write(b"12345")
+            assert download.write(b"6789")
+            assert not download.write(b"abcdef")
+        with open(path, "rb") as f:
+            assert f.read() == b"123456789a"
+
+    assert download.truncated
+    assert download.size == 10
+    assert download.sha256 == hashlib.sha256(b"123456789a").hexdigest()
+    assert download.sniffed == {}
+
+
+def test_exact_size_is_not_truncated():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with Download(os.path.join(temp_dir, "requests_content"), max_size=4) as download:
+            assert download.write(b"1234")
+    assert not download.truncated
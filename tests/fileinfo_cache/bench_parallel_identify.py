@@ -0,0 +1,71 @@
+#!/bin/env python
+"""Measure the identification time of the HAR bodies of a task, one at a time and with a pool of threads.
+
+Run from the root of the repository, inside the service container:
+    python -m tests.fileinfo_cache.bench_parallel_identify --entries 50 200 500 --workers 0 2 4
+
+Every body is unique and the cache is emptied between runs, so that each body gets identified.
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from assemblyline.common.identify import Identify
+
+from urldownloader.fileinfo_cache import FileInfoBatch, FileInfoCache
+
+# Kind of subresources loaded by a heavy page
+BODIES = [
+    b"<html><head><title>page</title></head><body>%s</body></html>",
+    b"function f%s(){return document.getElementById('x');}",
+    b".class%s{color:#fff;background:url(a.png)}",
+    b'{"key": "%s", "values": [1, 2, 3]}',
+    b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR%s",
+]
+
+
+def write_bodies(folder, count):
+    bodies = []
+    for i in range(count):
+        content = random.choice(BODIES) % str(i).encode() * random.randint(10, 2000)
+        sha256 = hashlib.sha256(content).hexdigest()
+        path = os.path.join(folder, sha256)
+        with open(path, "wb") as f:
+            f.write(content)
+        bodies.append((path, sha256))
+    return bodies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4])
+    options = parser.parse_args()
+
+    identify = Identify(use_cache=False)
+    log = logging.getLogger(__name__)
+    for count in options.entries:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            bodies = write_bodies(temp_dir, count)
+            for workers in options.workers:
+                executor = ThreadPoolExecutor(workers) if workers else None
+                batch = FileInfoBatch(FileInfoCache(identify, log), executor)
+                start = time.monotonic()
+                for path, sha256 in bodies:
+                    batch.submit(path, sha256)
+                for _, sha256 in bodies:
+                    batch.result(sha256)
+                elapsed = time.monotonic() - start
+                if executor:
+                    executor.shutdown()
+                print(f"entries={count:<5} workers={workers:<3} {elapsed:.2f}s ({count / elapsed:.0f} bodies/s)")
+
+
+if __name__ == "__main__":
+    main()
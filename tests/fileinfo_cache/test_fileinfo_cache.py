@@ -0,0 +1,115 @@
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from urldownloader.fileinfo_cache import FileInfoBatch, FileInfoCache
+
+log = logging.getLogger(__name__)
+
+
+class FakeIdentify:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def fileinfo(self, path, skip_fuzzy_hashes=False, calculate_entropy=True):
+        self.calls += 1
+        with open(path, "rb") as f:
+            data = f.read()
+        return {"sha256": hashlib.sha256(data).hexdigest(), "size": len(data), "type": "text/plain"}
+
+
+def write_files(folder, contents):
+    paths = []
+    for i, content in enumerate(contents):
+        path = os.path.join(folder, str(i))
+        with open(path, "wb") as f:
+            f.write(content)
+        paths.append(path)
+    return paths
+
+
+def test_identify_only_unseen_content():
+    identify = FakeIdentify()
+    cache = FileInfoCache(identify, log)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = write_files(temp_dir, [b"jquery", b"jquery", b"fonts"])
+        fileinfos = [cache.fileinfo(path) for path in paths]
+        fileinfos.append(cache.fileinfo(paths[2], hashlib.sha256(b"fonts").hexdigest()))
+
+    assert identify.calls == 2
+    assert fileinfos[0] == fileinfos[1]
+    assert fileinfos[2] == fileinfos[3]
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 2
+
+    # Changes made by the caller do not leak in the cache
+    fileinfos[0]["type"] = "modified"
+    assert cache.entries[fileinfos[1]["sha256"]][0]["type"] == "text/plain"
+
+
+def test_lru_eviction():
+    identify = FakeIdentify()
+    cache = FileInfoCache(identify, log, max_entries=2)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        first, second, third = write_files(temp_dir, [b"first", b"second", b"third"])
+        cache.fileinfo(first)
+        cache.fileinfo(second)
+        cache.fileinfo(first)
+        cache.fileinfo(third)
+        assert list(cache.entries) == [hashlib.sha256(b"first").hexdigest(), hashlib.sha256(b"third").hexdigest()]
+
+        entry_size = cache.entries[hashlib.sha256(b"first").hexdigest()][1]
+        cache.max_size = entry_size
+        cache.fileinfo(second)
+        assert list(cache.entries) == [hashlib.sha256(b"second").hexdigest()]
+        assert cache.size == entry_size
+    assert identify.calls == 4
+
+
+def test_persisted_index():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        index_path = os.path.join(temp_dir, "cache", "fileinfo_cache.json")
+        (path,) = write_files(temp_dir, [b"analytics"])
+
+        cache = FileInfoCache(FakeIdentify(), log, index_path=index_path, version="1")
+        cache.fileinfo(path)
+        cache.save()
+
+        identify = FakeIdentify()
+        cache = FileInfoCache(identify, log, index_path=index_path, version="1")
+        cache.load()
+        cache.fileinfo(path)
+        assert identify.calls == 0
+
+        # Another version of the service could identify the content differently
+        cache = FileInfoCache(identify, log, index_path=index_path, version="2")
+        cache.load()
+        cache.fileinfo(path)
+        assert identify.calls == 1
+
+
+class SlowIdentify(FakeIdentify):
+    def fileinfo(self, path, skip_fuzzy_hashes=False, calculate_entropy=True):
+        # The first files take the longest to identify
+        time.sleep(0.05 / (int(os.path.basename(path)) + 1))
+        return super().fileinfo(path, skip_fuzzy_hashes, calculate_entropy)
+
+
+def test_parallel_batch_keeps_results_by_sha256():
+    identify = SlowIdentify()
+    cache = FileInfoCache(identify, log)
+    contents = [b"a", b"b", b"a", b"c", b"d", b"b"]
+    with tempfile.TemporaryDirectory() as temp_dir, ThreadPoolExecutor(4) as executor:
+        sequential = FileInfoBatch(FileInfoCache(FakeIdentify(), log))
+        parallel = FileInfoBatch(cache, executor)
+        for path, content in zip(write_files(temp_dir, contents), contents):
+            sequential.submit(path, hashlib.sha256(content).hexdigest())
+            parallel.submit(path, hashlib.sha256(content).hexdigest())
+
+        for content in contents:
+            sha256 = hashlib.sha256(content).hexdigest()
+            assert parallel.result(sha256) == sequential.result(sha256)
+    assert identify.calls == 4
@@ -0,0 +1,62 @@
+import base64
+import json
+import os
+import tempfile
+
+from urldownloader.body_filter import BodyFilter
+from urldownloader.har import HARRewriter
+
+CONFIG = {
+    "skip_mimetypes": ["^font/"],
+    "skip_urls": ["analytics"],
+    "max_size_mb": 1,
+    "tracking_pixel_size": 64,
+}
+
+
+def har_entry(url, mimetype, size, text):
+    return {
+        "request": {"url": url},
+        "response": {"content": {"size": size, "mimeType": mimetype, "encoding": "base64", "text": text}},
+    }
+
+
+def test_skipped_bodies_are_not_spooled():
+    pixel = base64.b64encode(b"GIF89a").decode()
+    entries = [
+        har_entry("http://target.test/", "text/html", 6, pixel),
+        har_entry("http://target.test/font.woff2", "font/woff2", 6, pixel),
+        har_entry("http://target.test/pixel.gif", "image/gif", 6, pixel),
+        har_entry("http://analytics.test/collect", "text/javascript", 6, pixel),
+        har_entry("http://target.test/large.bin", "application/octet-stream", 2 * 1024 * 1024, pixel),
+        har_entry("http://target.test/script.js", "text/javascript", 6, pixel),
+        # The target URLs are always kept
+        har_entry("http://target.test/final.gif", "image/gif", 6, pixel),
+    ]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        har_path = os.path.join(temp_dir, "session.har")
+        with open(har_path, "w") as f:
+            json.dump({"log": {"entries": entries}}, f)
+
+        body_filter = BodyFilter(CONFIG, ["http://target.test/", "http://target.test/final.gif"])
+        modified_har_path = os.path.join(temp_dir, "modified.har")
+        kept = []
+        for entry, body in HARRewriter(har_path, modified_har_path, temp_dir, body_filter):
+            if body is not None:
+                kept.append(entry["request"]["url"])
+        assert kept == ["http://target.test/", "http://target.test/script.js", "http://target.test/final.gif"]
+        assert sorted(os.listdir(temp_dir)) == ["modified.har", "session.har"]
+
+        with open(modified_har_path) as f:
+            contents = [entry["response"]["content"] for entry in json.load(f)["log"]["entries"]]
+        assert [content.get("_skipped") for content in contents] == [
+            None,
+            "Skipped mimeType font/woff2",
+            "Tracking pixel",
+            "Skipped URL",
+            "Larger than 1MB",
+            None,
+            None,
+        ]
+        assert all(("text" in content) != ("_skipped" in content) for content in contents)
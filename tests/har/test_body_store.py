@@ -0,0 +1,55 @@
+import base64
+import hashlib
+import json
+import os
+import tempfile
+
+from urldownloader.body_store import BodyStore
+from urldownloader.har import HARRewriter
+
+
+def test_identical_bodies_are_stored_once():
+    beacon = b"GIF89a\x01\x00\x01\x00beacon"
+    script = b"console.log('script');"
+    contents = [
+        {"size": len(beacon), "encoding": "base64", "text": base64.b64encode(beacon).decode()},
+        {"size": len(beacon), "encoding": "base64", "text": base64.b64encode(beacon).decode()},
+        # Same body, encoded with line breaks
+        {"size": len(beacon), "encoding": "base64", "text": base64.encodebytes(beacon).decode()},
+        {"size": len(script), "text": script.decode()},
+        {"size": len(script), "encoding": "base64", "text": base64.b64encode(script).decode()},
+        {"size": 4, "encoding": "base64", "text": "not base64!"},
+    ]
+    har_content = {"log": {"entries": [{"response": {"content": content}} for content in contents]}}
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        har_path = os.path.join(temp_dir, "session.har")
+        with open(har_path, "w") as f:
+            json.dump(har_content, f)
+
+        store = BodyStore(os.path.join(temp_dir, "bodies"))
+        stored = []
+        for _, body in HARRewriter(har_path, os.path.join(temp_dir, "modified.har"), temp_dir):
+            stored.append(store.add(body))
+
+        assert [hashes["sha256"] for hashes in stored] == [
+            hashlib.sha256(data).hexdigest() for data in [beacon, beacon, beacon, script, script, b"not base64!"]
+        ]
+        assert stored[0] == {
+            "md5": hashlib.md5(beacon).hexdigest(),
+            "sha1": hashlib.sha1(beacon).hexdigest(),
+            "sha256": hashlib.sha256(beacon).hexdigest(),
+            "size": len(beacon),
+        }
+
+        # One blob per unique body, and no spooled text left behind
+        assert sorted(os.listdir(store.folder)) == sorted(store.blobs)
+        assert len(store.blobs) == 3
+        assert sorted(os.listdir(temp_dir)) == ["bodies", "modified.har", "session.har"]
+        for sha256 in store.blobs:
+            with open(store.path(sha256), "rb") as f:
+                assert hashlib.sha256(f.read()).hexdigest() == sha256
+
+        with open(os.path.join(temp_dir, "modified.har")) as f:
+            for entry in json.load(f)["log"]["entries"]:
+                assert "text" not in entry["response"]["content"]
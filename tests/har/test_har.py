@@ -0,0 +1,133 @@
+import base64
+import glob
+import hashlib
+import json
+import os
+import tempfile
+
+import pytest
+
+import urldownloader.har
+from urldownloader.har import HAREntry, HARRewriter, decode_base64
+
+RESULTS_FOLDER = os.path.join(os.path.dirname(__file__), "..", "results")
+
+
+def extract_bodies(har_path, modified_har_path, body_folder):
+    for entry, body in HARRewriter(har_path, modified_har_path, body_folder):
+        content = entry["response"]["content"]
+        if body is not None and content.get("size", 0) != 0:
+            with open(body.extract(), "rb") as f:
+                content["_replaced"] = hashlib.sha256(f.read()).hexdigest()
+
+
+def extract_bodies_in_memory(har_path, modified_har_path):
+    with open(har_path) as f:
+        har_content = json.load(f)
+    for entry in har_content["log"]["entries"]:
+        content = entry["response"]["content"]
+        if content.get("size", 0) != 0:
+            text = content.pop("text")
+            try:
+                data = base64.b64decode(text) if content.get("encoding") == "base64" else text.encode()
+            except Exception:
+                data = text.encode()
+            content["_replaced"] = hashlib.sha256(data).hexdigest()
+    with open(modified_har_path, "w") as f:
+        json.dump(har_content, f)
+
+
+@pytest.mark.parametrize("read_size", [7, urldownloader.har.READ_SIZE])
+@pytest.mark.parametrize("har_path", sorted(glob.glob(os.path.join(RESULTS_FOLDER, "*", "kangooroo", "session.har"))))
+def test_rewrite_matches_json_dump(monkeypatch, har_path, read_size):
+    # Small reads make values and escapes span multiple buffers
+    monkeypatch.setattr(urldownloader.har, "READ_SIZE", read_size)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        extract_bodies(har_path, os.path.join(temp_dir, "streamed.har"), temp_dir)
+        extract_bodies_in_memory(har_path, os.path.join(temp_dir, "in_memory.har"))
+        with open(os.path.join(temp_dir, "streamed.har"), "rb") as streamed:
+            with open(os.path.join(temp_dir, "in_memory.har"), "rb") as in_memory:
+                assert streamed.read() == in_memory.read()
+
+
+def test_text_escapes_and_unextracted_bodies():
+    text = 'quote " backslash \\ newline \n unicode é \U0001f600'
+    har_content = {
+        "log": {
+            "entries": [
+                {"response": {"content": {"size": 0, "text": text}}},
+                {"response": {"content": {"size": len(text), "text": text}}},
+            ]
+        }
+    }
+    with tempfile.TemporaryDirectory() as temp_dir:
+        har_path = os.path.join(temp_dir, "session.har")
+        with open(har_path, "w") as f:
+            json.dump(har_content, f)
+
+        entries = HARRewriter(har_path, os.path.join(temp_dir, "modified.har"), temp_dir)
+        paths = [body.extract() for entry, body in entries if entry["response"]["content"]["size"]]
+        with open(paths[0], "rb") as f:
+            assert f.read() == text.encode()
+
+        with open(os.path.join(temp_dir, "modified.har")) as f:
+            modified_entries = json.load(f)["log"]["entries"]
+        assert modified_entries[0]["response"]["content"]["text"] == text
+        assert "text" not in modified_entries[1]["response"]["content"]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        base64.b64encode(os.urandom(1000)).decode(),
+        base64.b64encode(os.urandom(1001)).decode(),
+        base64.encodebytes(os.urandom(1002)).decode(),
+        "QQ==QQ==",
+        "QUJD",
+        "QUJ",
+        "not base64 at all!",
+    ],
+)
+def test_chunked_base64_decoding(monkeypatch, text):
+    monkeypatch.setattr(urldownloader.har, "BASE64_CHUNK_SIZE", 8)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        text_path = os.path.join(temp_dir, "text")
+        with open(text_path, "w") as f:
+            f.write(text)
+
+        try:
+            expected = base64.b64decode(text)
+        except ValueError:
+            expected = None
+
+        output_path = os.path.join(temp_dir, "output")
+        with open(output_path, "wb") as output:
+            try:
+                decode_base64(text_path, output)
+            except ValueError:
+                assert expected is None
+                return
+        with open(output_path, "rb") as f:
+            assert f.read() == expected
+
+
+def test_entry_headers_are_case_insensitive():
+    entry = HAREntry(
+        {
+            "request": {"url": "http://test.test/", "method": "GET", "headers": []},
+            "response": {
+                "status": 302,
+                "content": {"size": 0},
+                "headers": [
+                    {"name": "location", "value": "/first"},
+                    {"name": "Location", "value": "/second"},
+                    {"name": "Content-Disposition", "value": ""},
+                ],
+            },
+        }
+    )
+    assert entry.response_headers.get("LOCATION") == "/second"
+    assert "content-disposition" in entry.response_headers
+    assert "Refresh" not in entry.response_headers
+    assert entry.response_headers.to_dict() == {"location": "/first", "Location": "/second", "Content-Disposition": ""}
+    assert entry.server_ip is None and entry.error is None and entry.redirect_url == ""
@@ -0,0 +1,77 @@
+import base64
+import json
+import os
+import tempfile
+from unittest.mock import MagicMock
+
+from assemblyline.common.importing import load_module_by_path
+from assemblyline_v4_service.common.result import Result
+
+from urldownloader.kangooroo_folders import KangoorooFolders
+
+service_class = load_module_by_path(
+    "urldownloader.urldownloader.URLDownloader", os.path.join(os.path.dirname(__file__), "..", "..")
+)
+
+PARAMS = {
+    "proxy": "no_proxy",
+    "regex_extract_filetype": "^archive/",
+    "regex_supplementary_filetype": ".*",
+    "extract_unmatched_filetype": False,
+    "open_directory_crawl": False,
+    "webdav_recursion": False,
+}
+
+
+def har_entry(url, mimetype, text):
+    return {
+        "request": {"url": url, "method": "GET", "headers": []},
+        "response": {
+            "status": 200,
+            "headers": [],
+            "content": {"size": 6, "mimeType": mimetype, "encoding": "base64", "text": text},
+        },
+    }
+
+
+def test_skipped_bodies_section():
+    ud = service_class()
+    ud.ontology = MagicMock()
+    ud.config["body_filter"] = {"enabled": True, "skip_mimetypes": ["^font/"], "tracking_pixel_size": 64}
+    request = MagicMock()
+    request.result = Result()
+    request.task.fileinfo.uri_info.uri = "http://target.test/"
+    request.get_param = PARAMS.get
+
+    pixel = base64.b64encode(b"GIF89a").decode()
+    entries = [
+        har_entry("http://target.test/", "text/html", pixel),
+        har_entry("http://target.test/regular.woff2", "font/woff2", pixel),
+        har_entry("http://target.test/bold.woff2", "font/woff2", pixel),
+        har_entry("http://target.test/pixel.gif", "image/gif", pixel),
+    ]
+    results = {
+        "summary": {
+            "fetchResult": {"response_code": 200},
+            "requestedUrl": {"url": "http://target.test/"},
+            "actualUrl": {"url": "http://target.test/"},
+        },
+        "experiment": {
+            "params": {},
+            "execution": {"startTime": "Mon Jan 01 00:00:00 UTC 2024"},
+            "engineInfo": {"engineName": "Kangooroo", "engineVersion": "test"},
+        },
+    }
+    with tempfile.TemporaryDirectory() as output_folder:
+        ud.kangooroo_folders = KangoorooFolders(ud.working_directory, {}, ud.log)
+        with open(os.path.join(output_folder, "results.json"), "w") as f:
+            json.dump(results, f)
+        with open(os.path.join(output_folder, "session.har"), "w") as f:
+            json.dump({"log": {"entries": entries}}, f)
+        ud.process_kangooroo_output(request, output_folder, {})
+
+    section = next(section for section in request.result.sections if section.title_text == "Skipped HTTP Bodies")
+    assert json.loads(section.body) == [
+        {"reason": "Skipped mimeType font/woff2", "count": 2},
+        {"reason": "Tracking pixel", "count": 1},
+    ]
@@ -0,0 +1,162 @@
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+
+from urldownloader.host_governor import (
+    FileGovernorBackend,
+    GovernorBackend,
+    HostGovernor,
+    registrable_domain,
+    take_slot,
+)
+
+
+class MemoryGovernorBackend(GovernorBackend):
+    """Stand-in for a cross-node backend."""
+
+    def __init__(self):
+        self.states = {}
+        self.lock = threading.Lock()
+
+    def try_acquire(self, key, max_in_flight, rate, burst):
+        with self.lock:
+            state = self.states.setdefault(key, {"in_flight": {}, "tokens": burst, "updated": time.time()})
+            return take_slot(state, max_in_flight, rate, burst, time.time())
+
+    def renew(self, key, slot):
+        with self.lock:
+            if slot in self.states[key]["in_flight"]:
+                self.states[key]["in_flight"][slot] = time.time()
+
+    def release(self, key, slot):
+        with self.lock:
+            self.states[key]["in_flight"].pop(slot, None)
+
+
+@pytest.mark.parametrize(
+    "host, expected",
+    [
+        ("www.example.com", "example.com"),
+        ("a.b.example.com.", "example.com"),
+        ("example.com", "example.com"),
+        ("WWW.Example.co.uk", "example.co.uk"),
+        ("login.example.gc.ca", "example.gc.ca"),
+        ("sub.example.ca", "example.ca"),
+        ("192.168.0.1", "192.168.0.1"),
+        ("::1", "::1"),
+        ("localhost", "localhost"),
+    ],
+)
+def test_registrable_domain(host, expected):
+    assert registrable_domain(host) == expected
+
+
+def test_take_slot():
+    state = {"in_flight": {}, "tokens": 2, "updated": 100}
+    first, _ = take_slot(state, 2, 1, 2, 100)
+    second, _ = take_slot(state, 3, 1, 2, 100)
+    assert first and second and first != second
+    # No token left, one is added every second
+    assert take_slot(state, 3, 1, 2, 100.5) == (None, 0.5)
+    assert take_slot(state, 3, 1, 2, 101)[0] is not None
+    # Every slot is taken
+    assert take_slot(state, 3, 1, 2, 200) == (None, 0)
+    assert state["tokens"] == 2
+
+
+def test_file_backend():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Two backends act as two service instances of the node
+        first = FileGovernorBackend(temp_dir)
+        second = FileGovernorBackend(temp_dir)
+        slot, _ = first.try_acquire("example.com", 1, 100, 5)
+        assert slot
+        assert second.try_acquire("example.com", 1, 100, 5)[0] is None
+        assert second.try_acquire("example.org", 1, 100, 5)[0]
+        first.release("example.com", slot)
+        assert second.try_acquire("example.com", 1, 100, 5)[0]
+
+
+def test_file_backend_leases():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        backend = FileGovernorBackend(temp_dir, lease=0.1)
+        assert backend.try_acquire("example.com", 1, 100, 5)[0]
+        assert backend.try_acquire("example.com", 1, 100, 5)[0] is None
+        time.sleep(0.1)
+        assert backend.try_acquire("example.com", 1, 100, 5)[0]
+
+        # The lease of a held slot is renewed until it is released
+        governor = HostGovernor(backend, max_in_flight=1, rate=100, burst=5, max_wait=0, heartbeat=0.02)
+        with governor.slot("www.example.org") as slot:
+            assert slot.acquired
+            time.sleep(0.3)
+            assert backend.try_acquire("example.org", 1, 100, 5)[0] is None
+        assert backend.try_acquire("example.org", 1, 100, 5)[0]
+
+        # Files not used for a day are removed
+        for name in os.listdir(temp_dir):
+            os.utime(os.path.join(temp_dir, name), (0, 0))
+        FileGovernorBackend(temp_dir)
+        assert os.listdir(temp_dir) == []
+
+
+@pytest.mark.parametrize("backend", [MemoryGovernorBackend, FileGovernorBackend])
+def test_max_in_flight(backend):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        governor = HostGovernor(
+            backend(temp_dir) if backend is FileGovernorBackend else backend(),
+            max_in_flight=2,
+            rate=1000,
+            burst=1000,
+            poll_interval=0.01,
+        )
+        in_flight = []
+        peak = []
+
+        def task(host):
+            with governor.slot(host) as slot:
+                assert slot.acquired
+                in_flight.append(host)
+                peak.append(len(in_flight))
+                time.sleep(0.05)
+                in_flight.remove(host)
+
+        threads = [threading.Thread(target=task, args=(f"www{i}.example.com",)) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert max(peak) == 2
+        stats = governor.stats()
+        assert stats["acquired"] == 6
+        assert stats["timeouts"] == 0
+        assert stats["longest_wait"] >= 0.05
+
+
+def test_rate_and_timeout():
+    governor = HostGovernor(
+        MemoryGovernorBackend(), max_in_flight=10, rate=10, burst=1, max_wait=0.5, poll_interval=0.01
+    )
+    start = time.monotonic()
+    for _ in range(3):
+        with governor.slot("example.com") as slot:
+            assert slot.acquired
+    # A token is added every 100ms after the first one is used
+    assert time.monotonic() - start >= 0.2
+
+    governor = HostGovernor(MemoryGovernorBackend(), max_in_flight=1, max_wait=0.1, poll_interval=0.01)
+    with governor.slot("example.com"):
+        with governor.slot("www.example.com") as slot:
+            assert not slot.acquired
+            assert slot.key == "example.com"
+            assert slot.waited >= 0.1
+        with governor.slot("example.org") as slot:
+            assert slot.acquired
+        # A task with less time left waits less
+        with governor.slot("example.com", max_wait=0) as slot:
+            assert not slot.acquired
+            assert slot.waited < 0.1
+    assert governor.stats()["timeouts"] == 2
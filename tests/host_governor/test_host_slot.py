@@ -0,0 +1,100 @@
+import os
+import tempfile
+import time
+from unittest.mock import MagicMock, patch
+
+from assemblyline.common.importing import load_module_by_path
+from assemblyline_v4_service.common.result import Result
+
+from urldownloader.host_governor import FileGovernorBackend, HostGovernor
+from urldownloader.routing import RoutingStats
+from urldownloader.urldownloader import container_local
+
+service_class = load_module_by_path(
+    "urldownloader.urldownloader.URLDownloader", os.path.join(os.path.dirname(__file__), "..", "..")
+)
+
+
+def new_request():
+    request = MagicMock()
+    request.result = Result()
+    request.task.fileinfo.uri_info.uri = "http://www.example.com/"
+    request.task.fileinfo.uri_info.hostname = "www.example.com"
+    request.get_param = {"proxy": "no_proxy"}.get
+    return request
+
+
+def fetch(ud, request):
+    ud.task_deadline = time.monotonic() + 300
+    ud.host_slot = None
+    with ud.host_slots:
+        ud.fetch(request, "GET", {}, False)
+
+
+def test_slot_held_for_every_request_to_the_host():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        ud = service_class()
+        ud.host_governor = HostGovernor(FileGovernorBackend(temp_dir), max_in_flight=1, max_wait=0)
+        ud.download_routing = RoutingStats()
+        held = []
+
+        def holding(result):
+            def side_effect(*args):
+                held.append(ud.host_slot is not None and ud.host_slot.acquired)
+                return result
+
+            return side_effect
+
+        def process(request, output_folder, data):
+            # The download of an incomplete Kangooroo run is fetched again with the same slot
+            held.append(ud.hold_host_slot(request))
+
+        with (
+            patch.object(ud, "route_download", side_effect=holding(False)),
+            patch.object(ud, "execute_kangooroo", side_effect=holding(temp_dir)),
+            patch.object(ud, "process_kangooroo_output", side_effect=process),
+        ):
+            fetch(ud, new_request())
+        assert held == [True, True, True]
+        assert ud.host_governor.stats()["acquired"] == 1
+
+        # The slot is released once the task is done
+        with ud.host_governor.slot("example.com") as slot:
+            assert slot.acquired
+
+
+def test_busy_host():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        ud = service_class()
+        ud.host_governor = HostGovernor(FileGovernorBackend(temp_dir), max_in_flight=1, max_wait=0)
+        ud.download_routing = RoutingStats()
+        request = new_request()
+        with (
+            ud.host_governor.slot("example.com"),
+            patch.object(ud, "route_download") as route_download,
+            patch.object(ud, "execute_kangooroo") as execute_kangooroo,
+        ):
+            fetch(ud, request)
+        route_download.assert_not_called()
+        execute_kangooroo.assert_not_called()
+        assert [section.title_text for section in request.result.sections] == ["Host busy"]
+
+
+def test_cached_output_does_not_take_a_slot():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        ud = service_class()
+        ud.host_governor = HostGovernor(FileGovernorBackend(temp_dir), max_in_flight=1, max_wait=0)
+        ud.result_cache = MagicMock()
+        with (
+            ud.host_governor.slot("example.com"),
+            patch.object(ud, "process_cached_output", return_value=True),
+            patch.object(ud, "execute_kangooroo") as execute_kangooroo,
+        ):
+            fetch(ud, new_request())
+        execute_kangooroo.assert_not_called()
+        assert ud.host_slot is None
+
+
+def test_container_local():
+    assert container_local(os.path.join(tempfile.gettempdir(), "urldownloader"))
+    assert not container_local("/mount/urldownloader")
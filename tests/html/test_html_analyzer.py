@@ -0,0 +1,49 @@
+import hashlib
+import os
+import tempfile
+
+import pytest
+
+import urldownloader.html_analyzer
+from urldownloader.html_analyzer import analyze_html
+
+PAGE = b"""<html><head><title>Index of /files</title>
+<meta http-equiv="Refresh" content="5; URL='https://next.test/'">
+<title>Second title</title></head>
+<body><a href="a.zip">a</a><a name="anchor">no href</a><div><a href="sub/">sub</a></div><a href="">empty</a></body>
+</html>"""
+
+
+def write_page(folder, content):
+    path = os.path.join(folder, "source.html")
+    with open(path, "wb") as f:
+        f.write(content)
+    return path
+
+
+@pytest.mark.parametrize("read_size", [7, urldownloader.html_analyzer.READ_SIZE])
+def test_analyze_html(monkeypatch, read_size):
+    # Small reads make tags span multiple chunks
+    monkeypatch.setattr(urldownloader.html_analyzer, "READ_SIZE", read_size)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        page = analyze_html(write_page(temp_dir, PAGE))
+    assert page.title == "Index of /files"
+    assert page.hrefs == ["a.zip", "sub/", ""]
+    assert page.meta_refresh == "https://next.test/"
+    assert page.sha256 == hashlib.sha256(PAGE).hexdigest()
+
+
+def test_noscript_meta_refresh_is_ignored():
+    content = b'<html><body><noscript><meta http-equiv="refresh" content="0; URL=/nojs"></noscript></body></html>'
+    with tempfile.TemporaryDirectory() as temp_dir:
+        page = analyze_html(write_page(temp_dir, content))
+    assert page.meta_refresh == ""
+    assert page.title is None
+
+
+def test_empty_page():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        page = analyze_html(write_page(temp_dir, b""))
+    assert page.title is None
+    assert page.hrefs == []
+    assert page.sha256 == hashlib.sha256(b"").hexdigest()
@@ -0,0 +1,89 @@
+#!/bin/env python
+"""Compare the latency of back-to-back no_browser requests with a new client per request and with pooled clients.
+
+Run from the root of the repository, inside the service container:
+    python -m tests.http_clients.bench_http_clients --requests 200
+
+A local proxy stand-in answers every request itself, keeping the connections open. The previous behaviour built new
+transports, a new SSL context and a new client for each request, the pool keeps one client per proxy profile. The
+requests are plain HTTP: the pool saves the connection and the SSL context, TLS sessions are not resumed as httpx does
+not reuse them across connections.
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+import httpx
+
+from urldownloader.http_clients import HTTPClientPool
+
+BODY = b"x" * 16 * 1024
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # The headers and the body are written separately, with Nagle's algorithm the body waits for the delayed ACK of
+    # the client and every response takes 40ms more
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def new_client(proxies, url):
+    # What send_http_request did before
+    proxy_mounts = {
+        f"{scheme}://": httpx.HTTPTransport(proxy=f"http://{proxy}" if "://" not in proxy else proxy)
+        for scheme, proxy in proxies["local_proxy"].items()
+    }
+    with httpx.Client(mounts=proxy_mounts) as client, client.stream("GET", url) as r:
+        for _ in r.iter_bytes():
+            pass
+
+
+def pooled_client(pool, url):
+    with pool.client("local_proxy") as client, client.stream("GET", url) as r:
+        for _ in r.iter_bytes():
+            pass
+
+
+def measure(function, argument, url, count):
+    times = []
+    for _ in range(count):
+        start = time.monotonic()
+        function(argument, url)
+        times.append(time.monotonic() - start)
+    quantiles = statistics.quantiles(times, n=20)
+    return statistics.median(times), quantiles[18]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    options = parser.parse_args()
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ProxyHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    proxies = {"local_proxy": {"http": f"127.0.0.1:{httpd.server_address[1]}"}}
+    url = "http://website.test/payload"
+
+    pool = HTTPClientPool(proxies, MagicMock())
+    for name, function, argument in (("new client", new_client, proxies), ("pooled client", pooled_client, pool)):
+        p50, p95 = measure(function, argument, url, options.requests)
+        print(f"{name:<14} p50 {p50 * 1000:>7.2f}ms p95 {p95 * 1000:>7.2f}ms")
+    pool.close()
+    httpd.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+import pytest
+
+from urldownloader.http_clients import HTTPClientPool
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    # Keep the connections open like a real proxy
+    protocol_version = "HTTP/1.1"
+    connections = set()
+
+    def do_GET(self):
+        ProxyHandler.connections.add(self.client_address)
+        body = f"{self.path} {self.headers.get('Cookie')}".encode()
+        self.send_response(200)
+        self.send_header("Set-Cookie", "session=1")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def proxy():
+    ProxyHandler.connections = set()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ProxyHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_client_per_profile(proxy):
+    pool = HTTPClientPool({"no_proxy": {}, "local_proxy": {"http": proxy}}, MagicMock())
+    with pool.client("local_proxy") as first, pool.client("local_proxy") as second, pool.client("no_proxy") as other:
+        assert first is second
+        assert first is not other
+    pool.close()
+    assert pool.clients == {}
+
+
+def test_connections_are_reused_and_cookies_cleared(proxy):
+    pool = HTTPClientPool({"local_proxy": {"http": proxy}}, MagicMock())
+    for _ in range(3):
+        with pool.client("local_proxy") as client:
+            response = client.get("http://website.test/page")
+            # The proxy receives the absolute URL, the cookie of the previous task was not sent
+            assert response.text == "http://website.test/page None"
+            assert client.cookies.get("session") == "1"
+        assert not client.cookies
+    assert len(ProxyHandler.connections) == 1
+    pool.close()
+
+
+def test_http2_without_h2(monkeypatch):
+    monkeypatch.setattr("importlib.util.find_spec", lambda name: None)
+    log = MagicMock()
+    pool = HTTPClientPool({}, log, http2=True)
+    assert not pool.http2
+    log.warning.assert_called_once()
@@ -0,0 +1,99 @@
+#!/bin/env python
+"""Measure Kangooroo launch-to-first-navigation time with and without the AppCDS archive and startup flags.
+
+Run from the root of the repository, inside the service container:
+    python -m tests.kangooroo.bench_jvm_startup --repeat 5 --single-core
+
+A local HTTP server is used as the target so that only the startup cost is measured. The first navigation is
+the first line printed by Kangooroo mentioning the target URL.
+"""
+
+import argparse
+import http.server
+import os
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+
+import yaml
+
+from urldownloader.jvm import KangoorooJVM
+
+KANGOOROO_FOLDER = os.path.join(os.path.dirname(__file__), "..", "..", "urldownloader", "kangooroo")
+
+
+def run_kangooroo(options, jvm, conf_path, url):
+    env = {**os.environ, "JAVA_OPTS": jvm.java_opts()}
+    start = time.monotonic()
+    process = subprocess.Popen(
+        ["./bin/kangooroo", "--no-sandbox", "--conf-file", conf_path, "-mods", "summary", "--url", url],
+        cwd=KANGOOROO_FOLDER,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        preexec_fn=(lambda: os.sched_setaffinity(0, {0})) if options.single_core else None,
+    )
+    first_navigation = None
+    for line in process.stdout:
+        if first_navigation is None and url in line:
+            first_navigation = time.monotonic() - start
+    process.wait()
+    jvm.commit_archive()
+    return first_navigation, time.monotonic() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--ram-mb", type=int, default=1024)
+    parser.add_argument("--single-core", action="store_true", help="Pin Kangooroo on a single CPU")
+    options = parser.parse_args()
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), http.server.SimpleHTTPRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with open(os.path.join(KANGOOROO_FOLDER, "default_conf.yml")) as f:
+            config = yaml.safe_load(f)
+        config.pop("kang-upstream-proxy", None)
+        config["temporary_folder"] = os.path.join(temp_dir, "tmp")
+        config["output_folder"] = os.path.join(temp_dir, "output")
+        conf_path = os.path.join(temp_dir, "conf.yml")
+        with open(conf_path, "w") as f:
+            yaml.dump(config, f)
+
+        for class_data_sharing in (False, True):
+            for startup_flags in (False, True):
+                jvm = KangoorooJVM(
+                    KANGOOROO_FOLDER,
+                    os.path.join(temp_dir, "cache"),
+                    int(options.ram_mb * 0.75),
+                    class_data_sharing=class_data_sharing,
+                    startup_flags=startup_flags,
+                )
+                if class_data_sharing:
+                    # Training run generating the archive
+                    run_kangooroo(options, jvm, conf_path, url)
+
+                navigations, totals = [], []
+                for _ in range(options.repeat):
+                    first_navigation, total = run_kangooroo(options, jvm, conf_path, url)
+                    if first_navigation is not None:
+                        navigations.append(first_navigation)
+                    totals.append(total)
+
+                print(
+                    f"cds={class_data_sharing!s:<5} startup_flags={startup_flags!s:<5} "
+                    f"first navigation: {statistics.median(navigations) if navigations else float('nan'):.2f}s "
+                    f"total: {statistics.median(totals):.2f}s (median of {options.repeat})"
+                )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
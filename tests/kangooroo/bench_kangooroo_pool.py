@@ -0,0 +1,102 @@
+#!/bin/env python
+"""Compare the tasks per minute of one-shot Kangooroo runs against a pool of warm workers.
+
+Run from the root of the repository, inside the service container to use the real Kangooroo:
+    python -m tests.kangooroo.bench_kangooroo_pool --worker-command "<kangooroo worker command>" \
+        --url https://example.com/ --repeat 10
+
+Without a worker command, a stand-in worker with a simulated JVM and Chrome startup cost is used.
+"""
+
+import argparse
+import json
+import logging
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+
+import yaml
+
+from urldownloader.kangooroo_pool import KangoorooPool
+
+KANGOOROO_FOLDER = os.path.join(os.path.dirname(__file__), "..", "..", "urldownloader", "kangooroo")
+FAKE_WORKER = os.path.join(os.path.dirname(__file__), "fake_kangooroo_worker.py")
+
+
+def kangooroo_args(conf_path, url):
+    return ["--no-sandbox", "--conf-file", conf_path, "-mods", "summary", "--simple-result", "--url", url]
+
+
+def one_shot(options, conf_path, urls):
+    start = time.monotonic()
+    for url in urls:
+        if options.worker_command:
+            subprocess.run(["./bin/kangooroo", *kangooroo_args(conf_path, url)], cwd=KANGOOROO_FOLDER, timeout=300)
+        else:
+            # A stand-in worker that exits after a single URL
+            subprocess.run(
+                [sys.executable, FAKE_WORKER, "--startup-delay", str(options.startup_delay)],
+                input=json.dumps({"args": kangooroo_args(conf_path, url)}).encode() + b"\n",
+                stdout=subprocess.DEVNULL,
+                timeout=300,
+            )
+    return time.monotonic() - start
+
+
+def pooled(options, conf_path, urls):
+    command = shlex.split(options.worker_command) or [
+        sys.executable,
+        FAKE_WORKER,
+        "--startup-delay",
+        str(options.startup_delay),
+    ]
+    pool = KangoorooPool(
+        command,
+        cwd=KANGOOROO_FOLDER,
+        env=lambda: dict(os.environ),
+        log=logging.getLogger("bench"),
+        size=options.pool_size,
+        max_urls_per_worker=options.max_urls_per_worker,
+    )
+    pool.start()
+    try:
+        start = time.monotonic()
+        for url in urls:
+            if not pool.run(kangooroo_args(conf_path, url), 300):
+                print(f"Pool could not process {url}")
+        return time.monotonic() - start
+    finally:
+        pool.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", action="append", default=[])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--worker-command", default="")
+    parser.add_argument("--pool-size", type=int, default=1)
+    parser.add_argument("--max-urls-per-worker", type=int, default=50)
+    parser.add_argument("--startup-delay", type=float, default=3, help="Simulated startup cost of the stand-in")
+    options = parser.parse_args()
+
+    urls = (options.url or ["http://localhost/"]) * options.repeat
+    with tempfile.TemporaryDirectory() as temp_dir:
+        conf_path = os.path.join(temp_dir, "conf.yml")
+        with open(os.path.join(KANGOOROO_FOLDER, "default_conf.yml")) as f:
+            config = yaml.safe_load(f)
+        config.pop("kang-upstream-proxy", None)
+        config["temporary_folder"] = os.path.join(temp_dir, "tmp")
+        config["output_folder"] = os.path.join(temp_dir, "output")
+        with open(conf_path, "w") as f:
+            yaml.dump(config, f)
+
+        for name, runner in (("one-shot", one_shot), ("pooled", pooled)):
+            elapsed = runner(options, conf_path, urls)
+            print(f"{name:>8}: {len(urls)} tasks in {elapsed:.2f}s, {len(urls) / elapsed * 60:.1f} tasks per minute")
+
+
+if __name__ == "__main__":
+    main()
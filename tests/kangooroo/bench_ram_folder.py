@@ -0,0 +1,88 @@
+#!/bin/env python
+"""Compare Kangooroo runs with their folders in the working directory against a RAM backed mount.
+
+Run from the root of the repository, inside the service container:
+    python -m tests.kangooroo.bench_ram_folder --url https://example.com/ --repeat 5
+
+Disk I/O is the number of blocks read and written by Kangooroo, Chrome and their children.
+"""
+
+import argparse
+import logging
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+import yaml
+
+from urldownloader.kangooroo_folders import KangoorooFolders
+
+KANGOOROO_FOLDER = os.path.join(os.path.dirname(__file__), "..", "..", "urldownloader", "kangooroo")
+
+
+def run_kangooroo(working_directory, ram_config, url):
+    folders = KangoorooFolders(working_directory, ram_config, logging.getLogger("bench"))
+    with open(os.path.join(KANGOOROO_FOLDER, "default_conf.yml")) as f:
+        config = yaml.safe_load(f)
+    config.pop("kang-upstream-proxy", None)
+    config["temporary_folder"] = folders.temporary_folder
+    config["output_folder"] = folders.output_folder
+    conf_path = os.path.join(working_directory, "conf.yml")
+    with open(conf_path, "w") as f:
+        yaml.dump(config, f)
+
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.monotonic()
+    subprocess.run(
+        ["./bin/kangooroo", "--no-sandbox", "--conf-file", conf_path, "-mods", "summary", "--url", url],
+        cwd=KANGOOROO_FOLDER,
+        env={**os.environ, **folders.env()},
+        stdout=subprocess.DEVNULL,
+        timeout=300,
+    )
+    # Files the service adds to the result are moved back to the working directory
+    for root, _, files in os.walk(folders.output_folder):
+        for name in files:
+            if name != "session.har":
+                folders.retrieve(os.path.join(root, name))
+    folders.cleanup()
+    elapsed = time.monotonic() - start
+    new_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return elapsed, new_usage.ru_inblock - usage.ru_inblock, new_usage.ru_oublock - usage.ru_oublock
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="https://example.com/")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--ram-path", default="/dev/shm/urldownloader")
+    parser.add_argument("--min-free-mb", type=int, default=256)
+    options = parser.parse_args()
+
+    for name, ram_config in (
+        ("working directory", {}),
+        ("RAM folder", {"enabled": True, "path": options.ram_path, "min_free_mb": options.min_free_mb}),
+    ):
+        times, reads, writes = [], [], []
+        for _ in range(options.repeat):
+            working_directory = tempfile.mkdtemp()
+            try:
+                elapsed, blocks_read, blocks_written = run_kangooroo(working_directory, ram_config, options.url)
+            finally:
+                shutil.rmtree(working_directory, ignore_errors=True)
+            times.append(elapsed)
+            reads.append(blocks_read)
+            writes.append(blocks_written)
+
+        print(
+            f"{name:>17}: {statistics.median(times):.2f}s per task, "
+            f"{statistics.median(reads)} blocks read, {statistics.median(writes)} blocks written (median)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+#!/bin/env python
+# Stand-in for a Kangooroo worker, speaking the protocol of urldownloader/kangooroo_pool.py.
+# URLs containing "crash" make the worker exit, URLs containing "hang" make it stop answering.
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+import yaml
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--startup-delay", type=float, default=0)
+parser.add_argument("--url-delay", type=float, default=0)
+options, _ = parser.parse_known_args()
+
+kangooroo_parser = argparse.ArgumentParser()
+kangooroo_parser.add_argument("-cf", "--conf-file", action="store", dest="conf")
+kangooroo_parser.add_argument("--url", action="store", dest="url")
+
+
+def process(args, env):
+    namespace, _ = kangooroo_parser.parse_known_args(args)
+    if "crash" in namespace.url:
+        os._exit(1)
+    if "hang" in namespace.url:
+        time.sleep(3600)
+
+    time.sleep(options.url_delay)
+    with open(namespace.conf) as f:
+        config = yaml.safe_load(f)
+    output_folder = os.path.join(config["output_folder"], hashlib.md5(namespace.url.encode()).hexdigest())
+    os.makedirs(output_folder, exist_ok=True)
+    with open(os.path.join(output_folder, "results.json"), "w") as f:
+        json.dump(
+            {"summary": {"requestedUrl": {"url": namespace.url}}, "pid": os.getpid(), "tmpdir": env.get("TMPDIR")}, f
+        )
+
+
+time.sleep(options.startup_delay)
+for line in sys.stdin:
+    print(f"INFO - Fetching {line.strip()}", flush=True)
+    request = json.loads(line)
+    process(request["args"], request.get("env", {}))
+    print(json.dumps({"status": "done"}), flush=True)
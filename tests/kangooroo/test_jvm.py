@@ -0,0 +1,46 @@
+import os
+import tempfile
+
+from urldownloader.jvm import STARTUP_FLAGS, KangoorooJVM
+
+
+def test_default_java_opts():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        jvm = KangoorooJVM(temp_dir, os.path.join(temp_dir, "cache"), 768)
+        assert jvm.java_opts() == "-Xmx768m"
+
+
+def test_class_data_sharing_archive_lifecycle():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        jvm = KangoorooJVM(temp_dir, os.path.join(temp_dir, "cache"), 768, class_data_sharing=True, startup_flags=True)
+
+        java_opts = jvm.java_opts()
+        assert all(flag in java_opts for flag in STARTUP_FLAGS)
+        dump_flag = [opt for opt in java_opts.split() if opt.startswith("-XX:ArchiveClassesAtExit=")][0]
+
+        # A run killed while dumping the archive does not leave a broken archive behind
+        dumped_archive = dump_flag.split("=", 1)[1]
+        with open(dumped_archive, "wb") as f:
+            f.write(b"partial")
+        jvm.commit_archive(completed=False)
+        assert not os.path.exists(dumped_archive)
+        assert not os.path.exists(jvm.archive_path)
+
+        # Every run dumps to its own file
+        dumped_archives = [
+            opt.split("=", 1)[1] for _ in range(2) for opt in jvm.java_opts().split() if "ArchiveClassesAtExit" in opt
+        ]
+        assert dumped_archives[0] != dumped_archives[1] != dumped_archive
+        with open(dumped_archives[0], "wb") as f:
+            f.write(b"archive")
+        jvm.commit_archive()
+        assert jvm.pending_dumps == [dumped_archives[1]]
+        with open(dumped_archives[1], "wb") as f:
+            f.write(b"other archive")
+        jvm.commit_archive()
+        assert jvm.pending_dumps == []
+        assert not os.path.exists(dumped_archives[1])
+        with open(jvm.archive_path, "rb") as f:
+            assert f.read() == b"archive"
+        assert os.path.exists(jvm.archive_path)
+        assert f"-XX:SharedArchiveFile={jvm.archive_path}" in jvm.java_opts().split()
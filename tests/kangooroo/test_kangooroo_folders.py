@@ -0,0 +1,45 @@
+import logging
+import os
+import tempfile
+
+from urldownloader.kangooroo_folders import KangoorooFolders
+
+log = logging.getLogger(__name__)
+
+
+def test_working_directory_by_default():
+    with tempfile.TemporaryDirectory() as working_directory:
+        folders = KangoorooFolders(working_directory, {}, log)
+        assert not folders.in_ram
+        assert folders.output_folder == os.path.join(working_directory, "output")
+        assert folders.env() == {}
+
+
+def test_ram_folder_retrieve_and_cleanup():
+    with tempfile.TemporaryDirectory() as working_directory, tempfile.TemporaryDirectory() as ram_path:
+        folders = KangoorooFolders(working_directory, {"enabled": True, "path": ram_path, "min_free_mb": 1}, log)
+        assert folders.in_ram
+        assert folders.output_folder.startswith(ram_path)
+        assert folders.env() == {"TMPDIR": folders.temporary_folder}
+
+        os.makedirs(os.path.join(folders.output_folder, "url_md5"))
+        screenshot_path = os.path.join(folders.output_folder, "url_md5", "screenshot.png")
+        with open(screenshot_path, "wb") as f:
+            f.write(b"png")
+
+        retrieved_path = folders.retrieve(screenshot_path)
+        assert retrieved_path == os.path.join(working_directory, "output", "url_md5", "screenshot.png")
+        assert os.path.exists(retrieved_path)
+
+        folders.cleanup()
+        assert not os.path.exists(folders.root)
+        assert os.path.exists(retrieved_path)
+
+
+def test_ram_folder_without_enough_room():
+    with tempfile.TemporaryDirectory() as working_directory, tempfile.TemporaryDirectory() as ram_path:
+        folders = KangoorooFolders(
+            working_directory, {"enabled": True, "path": ram_path, "min_free_mb": 1024 * 1024 * 1024}, log
+        )
+        assert not folders.in_ram
+        assert folders.output_folder == os.path.join(working_directory, "output")
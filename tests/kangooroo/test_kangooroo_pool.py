@@ -0,0 +1,78 @@
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+
+import pytest
+import yaml
+
+from urldownloader.kangooroo_pool import KangoorooPool
+
+FAKE_WORKER = os.path.join(os.path.dirname(__file__), "fake_kangooroo_worker.py")
+
+
+def run_url(pool, temp_dir, url, timeout=10, env=None):
+    conf_path = os.path.join(temp_dir, "conf.yml")
+    with open(conf_path, "w") as f:
+        yaml.dump({"output_folder": os.path.join(temp_dir, "output")}, f)
+    handled = pool.run(["--no-sandbox", "--conf-file", conf_path, "--url", url], timeout, env)
+
+    results_path = os.path.join(temp_dir, "output", hashlib.md5(url.encode()).hexdigest(), "results.json")
+    if not os.path.exists(results_path):
+        return handled, None
+    with open(results_path) as f:
+        results = json.load(f)
+    if env:
+        assert results["tmpdir"] == env["TMPDIR"]
+    return handled, results["pid"]
+
+
+@pytest.fixture
+def pool():
+    pool = KangoorooPool(
+        [sys.executable, FAKE_WORKER],
+        cwd=os.path.dirname(__file__),
+        env=lambda: dict(os.environ),
+        log=logging.getLogger(__name__),
+        max_urls_per_worker=2,
+    )
+    pool.start()
+    yield pool
+    pool.stop()
+
+
+def test_pool_reuses_and_recycles_workers(pool):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        handled, first_pid = run_url(pool, temp_dir, "http://one.test/")
+        assert handled
+        # Every URL gets the folders of its own task
+        handled, second_pid = run_url(pool, temp_dir, "http://two.test/", env={"TMPDIR": os.path.join(temp_dir, "tmp")})
+        assert handled
+        assert first_pid == second_pid
+
+        # The worker reached max_urls_per_worker and was replaced
+        handled, third_pid = run_url(pool, temp_dir, "http://three.test/")
+        assert handled
+        assert third_pid != first_pid
+
+
+def test_pool_falls_back_after_crash(pool):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        handled, _ = run_url(pool, temp_dir, "http://crash.test/")
+        assert not handled
+
+        handled, pid = run_url(pool, temp_dir, "http://recovered.test/")
+        assert handled
+        assert pid is not None
+
+
+def test_pool_timeout_kills_worker(pool):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with pytest.raises(subprocess.TimeoutExpired):
+            run_url(pool, temp_dir, "http://hang.test/", timeout=1)
+
+        handled, _ = run_url(pool, temp_dir, "http://recovered.test/")
+        assert handled
@@ -0,0 +1,91 @@
+#!/bin/env python
+"""Compare the streaming HTML analyzer with the BeautifulSoup tree previously built from source.html.
+
+Run from the root of the repository, inside the service container:
+    python -m tests.open_directory.bench_html_analyzer --scale 1 100 --repeat 5
+
+Each fixture of this folder is used as is, then with its body repeated to mimic a huge "Index of" listing. The
+time and the peak of memory allocated by Python are reported for both paths.
+"""
+
+import argparse
+import glob
+import hashlib
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+from urldownloader.html_analyzer import analyze_html
+
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "[0-9a-f]" * 64)))
+
+
+def soup_path(path):
+    # What the service did before: parse the whole file, walk every <a>, then read the file again to hash it
+    with open(path, "rb") as f:
+        data = f.read()
+    soup = BeautifulSoup(data, features="lxml")
+    title = soup.title.string if soup.title else None
+    hrefs = [a["href"] for a in soup.find_all("a", href=True)]
+    with open(path, "rb") as f:
+        sha256 = hashlib.sha256(f.read()).hexdigest()
+    return title, hrefs, sha256
+
+
+def analyzer_path(path):
+    page = analyze_html(path)
+    return page.title, page.hrefs, page.sha256
+
+
+def measure(function, path, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.monotonic()
+        function(path)
+        times.append(time.monotonic() - start)
+    tracemalloc.start()
+    function(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(times), peak
+
+
+def scaled_copy(path, scale, folder):
+    with open(path, "rb") as f:
+        data = f.read()
+    start = data.lower().find(b"<body")
+    end = data.lower().rfind(b"</body>")
+    if scale > 1 and 0 <= start < end:
+        data = data[:end] + data[start:end] * (scale - 1) + data[end:]
+    scaled_path = os.path.join(folder, f"{os.path.basename(path)}.{scale}")
+    with open(scaled_path, "wb") as f:
+        f.write(data)
+    return scaled_path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 100])
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for fixture in FIXTURES:
+            for scale in options.scale:
+                path = scaled_copy(fixture, scale, temp_dir)
+                assert soup_path(path)[1:] == analyzer_path(path)[1:]
+                size = os.path.getsize(path) / 1024
+                for name, function in (("soup", soup_path), ("analyzer", analyzer_path)):
+                    elapsed, peak = measure(function, path, options.repeat)
+                    print(
+                        f"{os.path.basename(fixture)[:12]} x{scale:<4} {size:>8.0f}KiB {name:<9} "
+                        f"{elapsed * 1000:>8.1f}ms peak {peak / 1024 / 1024:>7.1f}MiB"
+                    )
+
+
+if __name__ == "__main__":
+    main()
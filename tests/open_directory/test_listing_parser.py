@@ -0,0 +1,65 @@
+import io
+import os
+
+import pytest
+
+from urldownloader.open_directory import parse_date, parse_listing, parse_size
+
+FOLDER = os.path.dirname(__file__)
+
+
+@pytest.mark.parametrize(
+    "text, size",
+    [
+        ("-", None),
+        ("1234567", 1234567),
+        ("13K", 13 * 1024),
+        ("1.5M", int(1.5 * 1024 * 1024)),
+        ("4.0 KiB", 4 * 1024),
+        ("ZIP-File 51,579,928 Bytes", 51579928),
+    ],
+)
+def test_parse_size(text, size):
+    assert parse_size(text) == size
+
+
+def test_parse_date():
+    assert parse_date("2024-11-09 13:34 -")[0] == "2024-11-09 13:34"
+    assert parse_date("27-Nov-2024 10:00:05 1234")[0] == "27-Nov-2024 10:00:05"
+    last_modified, timestamp = parse_date("ZIP-File Thu, 07 Nov 2024 09:54:56 GMT")
+    assert last_modified == "Thu, 07 Nov 2024 09:54:56 GMT"
+    assert timestamp == 1730973296
+    assert parse_date("no date here") is None
+
+
+def test_apache_listing():
+    entries = parse_listing(os.path.join(FOLDER, "519c5a7c047293a5ca84e79c0e45d59ccd85501066bab18006c3b0e6a65aa414"))
+    by_href = {entry.href: entry for entry in entries}
+    assert by_href["12.8.0/"].is_folder
+    assert (by_href["12.8.0/"].size, by_href["12.8.0/"].last_modified) == (None, "2024-11-09 18:22")
+    assert not by_href["ls-lR.gz"].is_folder
+    assert (by_href["ls-lR.gz"].size, by_href["ls-lR.gz"].last_modified) == (13 * 1024, "2024-11-21 16:12")
+
+
+def test_wsgidav_listing():
+    entries = parse_listing(os.path.join(FOLDER, "9df18b3a810195a3c8578537d7e7dbbcc70dba9d02209369dac125ed260133ab"))
+    by_href = {entry.href: entry for entry in entries}
+    assert by_href["./ESAYBSA_YSA830246738229/"].is_folder
+    assert by_href["bab.zip"].size == 51579928
+    assert by_href["bab.zip"].last_modified == "Thu, 07 Nov 2024 09:54:56 GMT"
+
+
+def test_nginx_listing():
+    content = (
+        b"<html><head><title>Index of /files/</title></head><body><h1>Index of /files/</h1><hr><pre>"
+        b'<a href="../">../</a>\n'
+        b'<a href="sub/">sub/</a>                                     27-Nov-2024 10:00                   -\n'
+        b'<a href="payload.hta">payload.hta</a>                     27-Nov-2024 10:05                2048\n'
+        b"</pre><hr></body></html>"
+    )
+    entries = parse_listing(io.BytesIO(content))
+    assert [(entry.href, entry.size, entry.last_modified) for entry in entries] == [
+        ("../", None, None),
+        ("sub/", None, "27-Nov-2024 10:00"),
+        ("payload.hta", 2048, "27-Nov-2024 10:05"),
+    ]
@@ -9,8 +9,8 @@ from assemblyline.odm.models.file import URIInfo
 from assemblyline_v4_service.common.request import ServiceRequest
 from assemblyline_v4_service.common.result import Result
 from assemblyline_v4_service.common.task import Task
-from bs4 import BeautifulSoup
 
+from urldownloader.html_analyzer import analyze_html
 from urldownloader.urldownloader import detect_open_directory
 
 
@@ -33,11 +33,9 @@ def test_invoiceposs_shop_open_directory():
         uri_ident(uri_file_path, uri_info)
     mock_request.task.fileinfo.uri_info = URIInfo(uri_info["uri_info"])
 
-    with open(file_path, "rb") as f:
-        data = f.read()
-    soup = BeautifulSoup(data, features="lxml")
+    page = analyze_html(file_path)
 
-    detect_open_directory(mock_request, soup)
+    detect_open_directory(mock_request, page)
     assert len(mock_request.result.sections) == 1
     section = mock_request.result.sections[0]
     assert "open directory" in section.title_text.lower()
@@ -63,11 +61,9 @@ def test_debian_open_directory():
         uri_ident(uri_file_path, uri_info)
     mock_request.task.fileinfo.uri_info = URIInfo(uri_info["uri_info"])
 
-    with open(file_path, "rb") as f:
-        data = f.read()
-    soup = BeautifulSoup(data, features="lxml")
+    page = analyze_html(file_path)
 
-    detect_open_directory(mock_request, soup)
+    detect_open_directory(mock_request, page)
     assert len(mock_request.result.sections) == 1
     section = mock_request.result.sections[0]
     assert "open directory" in section.title_text.lower()
@@ -102,11 +98,9 @@ def test_debian_current_open_directory():
         uri_ident(uri_file_path, uri_info)
     mock_request.task.fileinfo.uri_info = URIInfo(uri_info["uri_info"])
 
-    with open(file_path, "rb") as f:
-        data = f.read()
-    soup = BeautifulSoup(data, features="lxml")
+    page = analyze_html(file_path)
 
-    detect_open_directory(mock_request, soup)
+    detect_open_directory(mock_request, page)
     assert len(mock_request.result.sections) == 1
     section = mock_request.result.sections[0]
     assert "open directory" in section.title_text.lower()
@@ -145,11 +139,9 @@ def test_WsgiDAV_open_directory():
         uri_ident(uri_file_path, uri_info)
     mock_request.task.fileinfo.uri_info = URIInfo(uri_info["uri_info"])
 
-    with open(file_path, "rb") as f:
-        data = f.read()
-    soup = BeautifulSoup(data, features="lxml")
+    page = analyze_html(file_path)
 
-    detect_open_directory(mock_request, soup)
+    detect_open_directory(mock_request, page)
     assert len(mock_request.result.sections) == 1
     section = mock_request.result.sections[0]
     assert "open directory" in section.title_text.lower()
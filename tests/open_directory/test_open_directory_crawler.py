@@ -0,0 +1,136 @@
+import functools
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from urldownloader.open_directory import parse_listing
+from urldownloader.open_directory_crawler import OpenDirectoryCrawler
+
+ROW = '<tr><td><a href="{href}">{href}</a></td><td align="right">{date}  </td><td align="right">{size}</td></tr>\n'
+
+
+def listing(rows):
+    return (
+        "<html><head><title>Index of /</title></head><body><table>"
+        '<tr><th><a href="?C=N;O=D">Name</a></th></tr>\n'
+        '<tr><td><a href="/">Parent Directory</a></td><td>&nbsp;</td><td align="right">  - </td></tr>\n'
+        f"{''.join(ROW.format(href=href, date=date, size=size) for href, date, size in rows)}"
+        "</table></body></html>"
+    )
+
+
+class StaticHandler(SimpleHTTPRequestHandler):
+    delay = 0
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with StaticHandler.lock:
+            StaticHandler.in_flight += 1
+            StaticHandler.max_in_flight = max(StaticHandler.max_in_flight, StaticHandler.in_flight)
+        try:
+            time.sleep(self.delay)
+            super().do_GET()
+        finally:
+            with StaticHandler.lock:
+                StaticHandler.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+@pytest.fixture
+def server():
+    StaticHandler.delay = 0
+    StaticHandler.max_in_flight = 0
+    with tempfile.TemporaryDirectory() as root:
+        # The root listing is what Kangooroo saved as source.html, the sub folder gets the listing of http.server
+        write(
+            os.path.join(root, "index.html"),
+            listing(
+                [
+                    ("old/", "2020-01-01 10:00", "-"),
+                    ("sub/", "2024-11-27 10:00", "-"),
+                    ("small.txt", "2024-11-27 10:05", "5"),
+                    ("big.bin", "2024-11-27 10:05", "1.0M"),
+                ]
+            ),
+        )
+        write(os.path.join(root, "small.txt"), "small")
+        write(os.path.join(root, "big.bin"), "b" * 1024 * 1024)
+        write(os.path.join(root, "old", "index.html"), listing([("gone.txt", "2020-01-01 10:00", "4")]))
+        write(os.path.join(root, "sub", "payload.lnk"), "payload")
+        write(os.path.join(root, "sub", "deep", "deeper.txt"), "deeper")
+
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(StaticHandler, directory=root))
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        yield f"http://127.0.0.1:{httpd.server_address[1]}/", os.path.join(root, "index.html")
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_crawl_and_fetch(server):
+    url, source_path = server
+    with tempfile.TemporaryDirectory() as fetch_folder:
+        crawl = OpenDirectoryCrawler(max_depth=1, fetch_max_size=100, fetch_folder=fetch_folder).crawl(
+            url, parse_listing(source_path)
+        )
+        crawled = {entry.url[len(url) :]: entry for entry in crawl.entries}
+        assert set(crawled) == {
+            "old/",
+            "sub/",
+            "small.txt",
+            "big.bin",
+            "old/gone.txt",
+            "sub/payload.lnk",
+            "sub/deep/",
+        }
+        assert (crawled["big.bin"].entry.size, crawled["big.bin"].fetched) == (1024 * 1024, None)
+        assert crawled["small.txt"].fetched["sha256"] == hashlib.sha256(b"small").hexdigest()
+        assert os.path.exists(crawled["small.txt"].fetched["path"])
+        # http.server does not give the sizes, the files are still downloaded up to the size limit
+        assert crawled["sub/payload.lnk"].fetched["size"] == len("payload")
+        # old/gone.txt is listed but missing from the server
+        assert "HTTP 404" in crawl.errors[f"{url}old/gone.txt"]
+        assert crawl.depth_truncated and not crawl.bytes_truncated and not crawl.timed_out
+        assert crawl.bytes_read < 1024 * 1024
+
+
+def test_budgets(server):
+    url, source_path = server
+    entries = parse_listing(source_path)
+
+    crawl = OpenDirectoryCrawler(max_entries=3).crawl(url, entries)
+    assert len(crawl.entries) == 3 and crawl.entries_truncated
+
+    with tempfile.TemporaryDirectory() as fetch_folder:
+        crawl = OpenDirectoryCrawler(max_bytes=100, fetch_max_size=2 * 1024 * 1024, fetch_folder=fetch_folder).crawl(
+            url, entries
+        )
+        assert crawl.bytes_truncated
+        assert crawl.bytes_read <= 100
+        # Only the files read before the budget was exhausted are kept
+        assert set(os.listdir(fetch_folder)) <= {hashlib.sha256(b"small").hexdigest()}
+
+
+def test_per_host_limit_and_priority(server):
+    url, source_path = server
+    StaticHandler.delay = 0.1
+    crawl = OpenDirectoryCrawler(max_per_host=1, max_depth=1).crawl(url, parse_listing(source_path))
+    assert StaticHandler.max_in_flight == 1
+    # The most recent folder is listed first, its entries come before the ones of the older folder
+    urls = [entry.url[len(url) :] for entry in crawl.entries]
+    assert urls.index("sub/payload.lnk") < urls.index("old/gone.txt")
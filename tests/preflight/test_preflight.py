@@ -0,0 +1,72 @@
+import socket
+from unittest.mock import MagicMock
+
+import pytest
+
+from urldownloader.preflight import Preflight
+
+
+@pytest.fixture
+def listening_port():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    yield server.getsockname()[1]
+    server.close()
+
+
+@pytest.fixture
+def closed_port():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    port = server.getsockname()[1]
+    server.close()
+    return port
+
+
+def failing_getaddrinfo(errno):
+    def getaddrinfo(*args, **kwargs):
+        raise socket.gaierror(errno, "Name or service not known")
+
+    return getaddrinfo
+
+
+def test_reachable(listening_port):
+    preflight = Preflight(MagicMock())
+    result = preflight.check("127.0.0.1", listening_port)
+    assert result.reachable
+    assert preflight.check("127.0.0.1", listening_port) is result
+    assert preflight.stats() == {"checks": 1, "cache_hits": 1, "failures": 0}
+
+
+def test_connection_refused(closed_port):
+    preflight = Preflight(MagicMock(), negative_ttl=60)
+    result = preflight.check("127.0.0.1", closed_port)
+    assert not result.reachable
+    assert result.error.startswith(f"Unable to connect to 127.0.0.1 on port {closed_port} (127.0.0.1: ")
+    assert preflight.check("127.0.0.1", closed_port) is result
+    assert preflight.stats() == {"checks": 1, "cache_hits": 1, "failures": 2}
+
+
+def test_unable_to_resolve(monkeypatch):
+    monkeypatch.setattr(socket, "getaddrinfo", failing_getaddrinfo(socket.EAI_NONAME))
+    preflight = Preflight(MagicMock())
+    result = preflight.check("gacyryw.com", 80)
+    assert result.error == "Unable to resolve host: gacyryw.com"
+
+
+def test_inconclusive_checks_are_not_cached(monkeypatch):
+    monkeypatch.setattr(socket, "getaddrinfo", failing_getaddrinfo(socket.EAI_AGAIN))
+    preflight = Preflight(MagicMock())
+    assert preflight.check("example.com", 80).reachable
+    assert preflight.check("example.com", 80).reachable
+    assert preflight.stats() == {"checks": 2, "cache_hits": 0, "failures": 0}
+
+
+def test_expiry(closed_port, listening_port):
+    preflight = Preflight(MagicMock(), positive_ttl=0, negative_ttl=0, max_entries=1)
+    assert not preflight.check("127.0.0.1", closed_port).reachable
+    assert not preflight.check("127.0.0.1", closed_port).reachable
+    assert preflight.check("127.0.0.1", listening_port).reachable
+    assert list(preflight.results) == [("127.0.0.1", listening_port)]
+    assert preflight.stats() == {"checks": 3, "cache_hits": 0, "failures": 2}
@@ -0,0 +1,122 @@
+import socket
+from unittest.mock import MagicMock
+
+import pytest
+
+from urldownloader.proxy_pool import ProxyPool, parse_proxy
+
+
+@pytest.fixture
+def proxy_ports():
+    """Listen on two ports standing in for proxies, and find a closed one.
+
+    Yields:
+        The ports of the two listening proxy stand-ins, then of the closed one.
+    """
+    servers = []
+    for _ in range(3):
+        server = socket.socket()
+        server.bind(("127.0.0.1", 0))
+        server.listen()
+        servers.append(server)
+    ports = [server.getsockname()[1] for server in servers]
+    servers[2].close()
+    yield ports
+    for server in servers[:2]:
+        server.close()
+
+
+def new_pool(ports, **kwargs):
+    proxies = {
+        "no_proxy": {},
+        "single_proxy": {"http": "127.0.0.1:3128"},
+        "string_proxy": "127.0.0.1:3128",
+        "pooled_proxy": [
+            f"127.0.0.1:{ports[2]}",
+            {"http": f"http://127.0.0.1:{ports[0]}", "https": f"http://127.0.0.1:{ports[0]}"},
+            f"user:password@127.0.0.1:{ports[1]}",
+        ],
+    }
+    return ProxyPool(proxies, MagicMock(), **kwargs)
+
+
+def test_parse_proxy():
+    assert parse_proxy("127.0.0.1:8080").port == 8080
+    assert parse_proxy("user:password@proxy:8080").hostname == "proxy"
+    assert parse_proxy("http://proxy:8080").hostname == "proxy"
+
+
+def test_endpoints(proxy_ports):
+    pool = new_pool(proxy_ports)
+    assert list(pool.endpoints) == [
+        "no_proxy",
+        "single_proxy",
+        "string_proxy",
+        "pooled_proxy#0",
+        "pooled_proxy#1",
+        "pooled_proxy#2",
+    ]
+    assert pool.endpoints["string_proxy"] == {"http": "127.0.0.1:3128", "https": "127.0.0.1:3128"}
+    assert pool.endpoints["pooled_proxy#0"] == {
+        "http": f"127.0.0.1:{proxy_ports[2]}",
+        "https": f"127.0.0.1:{proxy_ports[2]}",
+    }
+    assert pool.upstreams["pooled_proxy#2"].address == ("127.0.0.1", proxy_ports[1])
+    assert pool.select("no_proxy") == ["no_proxy"]
+    assert pool.select("single_proxy") == ["single_proxy"]
+    # Nothing was checked yet
+    assert pool.select("pooled_proxy") == ["pooled_proxy#0", "pooled_proxy#1", "pooled_proxy#2"]
+
+
+def test_selection(proxy_ports):
+    pool = new_pool(proxy_ports, max_errors=2)
+    pool.upstreams["pooled_proxy#1"].latency = 0.2
+    pool.check_all()
+    pool.check_all()
+    assert not pool.upstreams["pooled_proxy#0"].alive
+    assert pool.upstreams["pooled_proxy#1"].alive
+    # The dead upstream is only tried last
+    assert pool.select("pooled_proxy")[2] == "pooled_proxy#0"
+
+    # Errors of the fetches count as well
+    best = pool.select("pooled_proxy")[0]
+    pool.report_error(best, "ConnectError")
+    assert pool.select("pooled_proxy")[0] == best
+    pool.report_error(best, "ConnectError")
+    assert pool.select("pooled_proxy")[1:] == [best, "pooled_proxy#0"]
+
+    # A successful check brings it back
+    pool.check(pool.upstreams[best])
+    assert pool.upstreams[best].alive
+
+    pool.report_error("no_proxy", "ConnectError")
+
+
+def test_health(proxy_ports):
+    pool = new_pool(proxy_ports)
+    pool.check_all()
+    health = pool.health("pooled_proxy")
+    assert [row["upstream"] for row in health] == ["pooled_proxy#0", "pooled_proxy#1", "pooled_proxy#2"]
+    assert health[0]["address"] == f"127.0.0.1:{proxy_ports[2]}"
+    assert health[0]["latency_ms"] is None
+    assert health[0]["error_rate"] == 1
+    assert health[0]["last_error"]
+    assert health[1]["latency_ms"] is not None
+    assert health[1]["error_rate"] == 0
+    assert pool.health("no_proxy") == []
+    assert list(pool.stats()) == ["pooled_proxy"]
+
+
+def test_background_checks(proxy_ports):
+    pool = new_pool(proxy_ports, check_interval=0.01)
+    pool.start()
+    try:
+        for _ in range(100):
+            if pool.upstreams["pooled_proxy#2"].attempts >= 2:
+                break
+            pool.stopping.wait(0.01)
+    finally:
+        pool.stop()
+    assert pool.thread is None
+    assert not pool.upstreams["pooled_proxy#0"].alive
+    assert pool.upstreams["pooled_proxy#2"].attempts >= 2
@@ -0,0 +1,97 @@
+import base64
+import json
+import os
+import tempfile
+from unittest.mock import MagicMock
+
+from assemblyline.common.importing import load_module_by_path
+from assemblyline.odm.models.ontology.results.http import HTTP as HTTPResult
+from assemblyline_v4_service.common.result import Result
+
+from urldownloader.kangooroo_folders import KangoorooFolders
+
+service_class = load_module_by_path(
+    "urldownloader.urldownloader.URLDownloader", os.path.join(os.path.dirname(__file__), "..", "..")
+)
+
+PARAMS = {
+    "proxy": "no_proxy",
+    "regex_extract_filetype": "^archive/",
+    "regex_supplementary_filetype": ".*",
+    "extract_unmatched_filetype": False,
+    "open_directory_crawl": False,
+    "webdav_recursion": False,
+}
+
+
+def har_entry(url, status, headers=None, redirect_url="", content=None):
+    return {
+        "request": {"url": url, "method": "GET", "headers": []},
+        "response": {
+            "status": status,
+            "redirectURL": redirect_url,
+            "content": content or {"size": 0},
+            "headers": [{"name": name, "value": value} for name, value in (headers or {}).items()],
+        },
+    }
+
+
+def write_output(output_folder):
+    results = {
+        "summary": {
+            "fetchResult": {"response_code": 200},
+            "requestedUrl": {"url": "http://start.test/"},
+            "actualUrl": {"url": "http://final.test/"},
+        },
+        "experiment": {
+            "params": {},
+            "execution": {"startTime": "Mon Jan 01 00:00:00 UTC 2024"},
+            "engineInfo": {"engineName": "Kangooroo", "engineVersion": "test"},
+        },
+    }
+    payload = b"\x00\x01binary payload" * 64
+    entries = [
+        har_entry("http://start.test/", 302, redirect_url="http://final.test/"),
+        har_entry("http://final.test/", 200, {"Content-Type": "text/html"}),
+        # A download without Content-Disposition, its file name comes from its URL
+        har_entry(
+            "http://final.test/files/payload.bin",
+            200,
+            content={
+                "size": len(payload),
+                "mimeType": "application/octet-stream",
+                "encoding": "base64",
+                "text": base64.b64encode(payload).decode(),
+            },
+        ),
+    ]
+    with open(os.path.join(output_folder, "results.json"), "w") as f:
+        json.dump(results, f)
+    with open(os.path.join(output_folder, "session.har"), "w") as f:
+        json.dump({"log": {"entries": entries}}, f)
+    with open(os.path.join(output_folder, "source.html"), "w") as f:
+        f.write('<html><head><meta http-equiv="refresh" content="0; url=https://phish.test/"></head></html>')
+
+
+def test_download_entry_then_redirect_chain():
+    ud = service_class()
+    ud.ontology = MagicMock()
+    request = MagicMock()
+    request.result = Result()
+    request.task.fileinfo.uri_info.uri = "http://start.test/"
+    request.get_param = PARAMS.get
+
+    with tempfile.TemporaryDirectory() as output_folder:
+        ud.kangooroo_folders = KangoorooFolders(ud.working_directory, {}, ud.log)
+        write_output(output_folder)
+        ud.process_kangooroo_output(request, output_folder, {})
+
+    http_result = next(
+        call.kwargs["data"] for call in ud.ontology.add_result_part.call_args_list if call.kwargs["model"] is HTTPResult
+    )
+    # The chain of the requested URL comes first, the meta refresh is a hop from the final URL
+    assert http_result["redirects"] == [
+        {"from_url": "http://start.test/", "to_url": "http://final.test/"},
+        {"from_url": "http://final.test/", "to_url": "https://phish.test/"},
+    ]
+    assert any(section.title_text == "Redirections" for section in request.result.sections)
@@ -0,0 +1,103 @@
+import pytest
+
+from urldownloader.har import HAREntry
+from urldownloader.redirects import RedirectGraph, parse_refresh_header
+
+
+def har_entry(url, status, headers=None, redirect_url="", server_ip=None):
+    entry = {
+        "request": {"url": url, "method": "GET", "headers": []},
+        "response": {
+            "status": status,
+            "redirectURL": redirect_url,
+            "content": {"size": 0},
+            "headers": [{"name": name, "value": value} for name, value in (headers or {}).items()],
+        },
+    }
+    if server_ip:
+        entry["serverIPAddress"] = server_ip
+    return HAREntry(entry)
+
+
+@pytest.mark.parametrize(
+    "value, target",
+    [
+        ("0;url=http://next.test/", "http://next.test/"),
+        ("5; URL='/relative'", "/relative"),
+        ("15, url=http://next.test/", "http://next.test/"),
+        ("0; https://example.com/", "https://example.com/"),
+        ("0;'/relative'", "/relative"),
+        ("0;", ""),
+        ("16;url=http://next.test/", ""),
+        ("0", ""),
+        ("soon;url=http://next.test/", ""),
+        (None, ""),
+    ],
+)
+def test_parse_refresh_header(value, target):
+    assert parse_refresh_header(value) == target
+
+
+def test_rows_and_resolved_chain():
+    graph = RedirectGraph()
+    graph.add_entry(har_entry("http://start.test/", 302, {"location": "/login"}, server_ip="10.0.0.1"))
+    graph.add_entry(har_entry("http://other.test/pixel", 200))
+    graph.add_entry(har_entry("http://start.test/login", 301, redirect_url="http://final.test/"))
+    graph.add_entry(har_entry("http://final.test/", 200, {"Refresh": "0;url=/landing"}))
+    graph.add_entry(har_entry("http://other.test/", 307))
+    graph.add_meta_refresh("http://final.test/landing", "https://phish.test/")
+
+    # Rows keep the targets as found in the responses
+    assert [redirect.row() for redirect in graph.redirects] == [
+        {
+            "status": 302,
+            "redirecting_url": "http://start.test/",
+            "redirecting_ip": "10.0.0.1",
+            "redirecting_to": "/login",
+        },
+        {
+            "status": 301,
+            "redirecting_url": "http://start.test/login",
+            "redirecting_ip": "Not Available",
+            "redirecting_to": "http://final.test/",
+        },
+        {
+            "status": 200,
+            "redirecting_url": "http://final.test/",
+            "redirecting_ip": "Not Available",
+            "redirecting_to": "/landing",
+        },
+        {
+            "status": 307,
+            "redirecting_url": "http://other.test/",
+            "redirecting_ip": "Not Available",
+            "redirecting_to": "Not Available",
+        },
+        {
+            "status": "meta refresh",
+            "redirecting_url": "http://final.test/landing",
+            "redirecting_ip": "Not Available",
+            "redirecting_to": "https://phish.test/",
+        },
+    ]
+    assert [redirect.resolved for redirect in graph.chain("http://start.test/")] == [
+        "http://start.test/login",
+        "http://final.test/",
+        "http://final.test/landing",
+        "https://phish.test/",
+    ]
+    assert [redirect.url for redirect in graph.ordered("http://final.test/")] == [
+        "http://final.test/",
+        "http://final.test/landing",
+        "http://start.test/",
+        "http://start.test/login",
+        "http://other.test/",
+    ]
+
+
+def test_redirect_loop():
+    graph = RedirectGraph()
+    for i in range(10000):
+        graph.add_entry(har_entry(f"http://loop.test/{i}", 302, {"Location": f"/{(i + 1) % 10000}"}))
+    assert len(graph.chain("http://loop.test/0")) == 10000
+    assert len(graph.ordered("http://loop.test/5000")) == 10000
@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest.mock import MagicMock
+
+from urldownloader.result_cache import CACHED_FILES, LocalResultCacheBackend, ResultCache, ResultCacheBackend
+
+
+class MemoryBackend(ResultCacheBackend):
+    """Stand-in for a shared backend."""
+
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, key, destination):
+        if key not in self.entries:
+            return None
+        stored_at, files = self.entries[key]
+        os.makedirs(destination, exist_ok=True)
+        for name, content in files.items():
+            with open(os.path.join(destination, name), "wb") as f:
+                f.write(content)
+        return stored_at
+
+    def put(self, key, source, names):
+        files = {}
+        for name in names:
+            with open(os.path.join(source, name), "rb") as f:
+                files[name] = f.read()
+        self.entries[key] = (time.time(), files)
+
+    def delete(self, key):
+        self.entries.pop(key, None)
+
+
+def kangooroo_output(folder, names, size=10):
+    os.makedirs(folder, exist_ok=True)
+    for name in names:
+        with open(os.path.join(folder, name), "wb") as f:
+            f.write(name.encode()[:size].ljust(size, b"."))
+    return folder
+
+
+def test_key():
+    params = {"proxy": "no_proxy", "headers": {}, "browser_settings": {}, "no_browser": False}
+    key = ResultCache.key("HTTP://Example.com:80/page#top", params)
+    assert key == ResultCache.key("http://example.com/page", dict(reversed(params.items())))
+    assert key != ResultCache.key("http://example.com/page", {**params, "proxy": "localhost_proxy"})
+    assert key != ResultCache.key("http://example.com/page", {**params, "headers": {"Referer": "x"}})
+    assert key != ResultCache.key("http://example.com/other", params)
+
+
+def test_store_and_restore_with_a_shared_backend():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ResultCache(MemoryBackend(), ttl=60)
+        output = kangooroo_output(os.path.join(temp_dir, "output"), ["results.json", "source.html", "unrelated.log"])
+
+        cache.store("key", output)
+        assert sorted(cache.backend.entries["key"][1]) == ["results.json", "source.html"]
+        restored = os.path.join(temp_dir, "restored")
+        assert cache.restore("key", restored) is not None
+        assert sorted(os.listdir(restored)) == ["results.json", "source.html"]
+        assert cache.restore("missing", os.path.join(temp_dir, "missing")) is None
+        assert cache.stats() == {"hits": 1, "misses": 1}
+
+        # An output without results.json is not cached
+        cache.store("incomplete", kangooroo_output(os.path.join(temp_dir, "incomplete"), ["session.har"]))
+        assert "incomplete" not in cache.backend.entries
+
+
+def test_ttl():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ResultCache(MemoryBackend(), ttl=60)
+        cache.store("key", kangooroo_output(os.path.join(temp_dir, "output"), CACHED_FILES))
+        stored_at, files = cache.backend.entries["key"]
+        cache.backend.entries["key"] = (stored_at - 61, files)
+        restored = os.path.join(temp_dir, "restored")
+        assert cache.restore("key", restored) is None
+        assert not os.path.exists(restored)
+        assert "key" not in cache.backend.entries
+
+
+def test_local_backend():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        folder = os.path.join(temp_dir, "results")
+        backend = LocalResultCacheBackend(folder, MagicMock(), max_size=50)
+        output = kangooroo_output(os.path.join(temp_dir, "output"), ["results.json", "source.html"], size=10)
+
+        backend.put("first", output, ["results.json", "source.html"])
+        backend.put("second", output, ["results.json", "source.html"])
+        assert backend.size == 40
+        assert backend.get("first", os.path.join(temp_dir, "restored")) is not None
+        with open(os.path.join(temp_dir, "restored", "source.html"), "rb") as f:
+            assert f.read() == b"source.htm"
+
+        # "second" is the least recently used output
+        backend.put("third", output, ["results.json", "source.html"])
+        assert list(backend.entries) == ["first", "third"]
+        assert not os.path.exists(os.path.join(folder, "second"))
+        assert backend.get("second", os.path.join(temp_dir, "second")) is None
+
+        # Outputs larger than the cache are not kept
+        large = kangooroo_output(os.path.join(temp_dir, "large"), ["results.json"], size=60)
+        backend.put("large", large, ["results.json"])
+        assert "large" not in backend.entries
+
+        # The outputs are found again by the next run, the leftovers of an interrupted put are removed
+        os.makedirs(os.path.join(folder, "broken"))
+        reloaded = LocalResultCacheBackend(folder, MagicMock(), max_size=50)
+        assert list(reloaded.entries) == ["first", "third"]
+        assert reloaded.size == 40
+        assert not os.path.exists(os.path.join(folder, "broken"))
+
+        # An output cached by another instance on the node is found even if it was not there at startup
+        shutil.rmtree(os.path.join(temp_dir, "restored"))
+        backend.delete("first")
+        reloaded.put("first", output, ["results.json", "source.html"])
+        assert backend.get("first", os.path.join(temp_dir, "restored")) is not None
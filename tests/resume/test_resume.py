@@ -0,0 +1,132 @@
+import hashlib
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+from urldownloader.download import Download
+from urldownloader.resume import find_partial_download, resume_download
+
+CONTENT = bytes(range(256)) * 64
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    accept_ranges = True
+    etag = '"v1"'
+    # ETag of the resource once the HEAD request was answered
+    get_etag = '"v1"'
+    ranges = []
+    # Set to make HEAD requests hang until the test is over
+    hang_head: threading.Event | None = None
+
+    def send_content(self, include_body):
+        etag = self.etag if self.command == "HEAD" else self.get_etag
+        start = 0
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if range_header and self.accept_ranges and (if_range is None or if_range == etag):
+            RangeHandler.ranges.append(range_header)
+            start = int(range_header.split("=")[1].rstrip("-"))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(CONTENT) - 1}/{len(CONTENT)}")
+        else:
+            self.send_response(200)
+        if self.accept_ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(CONTENT) - start))
+        self.end_headers()
+        if include_body:
+            self.wfile.write(CONTENT[start:])
+
+    def do_HEAD(self):
+        if self.hang_head is not None:
+            self.hang_head.wait()
+            return
+        self.send_content(False)
+
+    def do_GET(self):
+        self.send_content(True)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    RangeHandler.accept_ranges = True
+    RangeHandler.etag = RangeHandler.get_etag = '"v1"'
+    RangeHandler.ranges = []
+    RangeHandler.hang_head = None
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/payload.bin"
+    if RangeHandler.hang_head is not None:
+        RangeHandler.hang_head.set()
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def resume(url, partial_content, timeout=None):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        partial_path = os.path.join(temp_dir, "payload.bin.crdownload")
+        with open(partial_path, "wb") as f:
+            f.write(partial_content)
+        with httpx.Client() as client, Download(os.path.join(temp_dir, "requests_content")) as download:
+            resumed = resume_download(client, url, partial_path, download, MagicMock(), timeout=timeout)
+            # The partial download is kept for the full GET
+            assert os.path.exists(partial_path)
+        with open(download.path, "rb") as f:
+            return resumed, download, f.read()
+
+
+def test_find_partial_download():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.makedirs(os.path.join(temp_dir, "output", "downloads"))
+        for name, size in (("a.crdownload", 10), ("output/downloads/b.crdownload", 20), ("c.zip", 30)):
+            with open(os.path.join(temp_dir, name), "wb") as f:
+                f.write(b"x" * size)
+        assert find_partial_download([temp_dir]) == os.path.join(temp_dir, "output", "downloads", "b.crdownload")
+        assert find_partial_download([os.path.join(temp_dir, "missing")]) is None
+
+
+def test_resume(server):
+    resumed, download, content = resume(server, CONTENT[:5000])
+    assert resumed == download.resumed == 5000
+    assert content == CONTENT
+    assert download.sha256 == hashlib.sha256(CONTENT).hexdigest()
+    # The end of the partial download was requested again to be compared
+    assert RangeHandler.ranges == [f"bytes={5000 - 1024}-"]
+
+
+def test_changed_content_is_not_stitched(server):
+    partial_content = b"y" * 5000
+    resumed, download, content = resume(server, partial_content)
+    assert resumed is None
+    assert content == b"" and download.size == 0
+
+
+def test_changed_validator_gives_the_full_content(server):
+    RangeHandler.get_etag = '"v2"'
+    resumed, download, content = resume(server, CONTENT[:5000])
+    assert resumed == 0 and download.resumed == 0
+    assert content == CONTENT
+
+
+def test_ranges_not_supported(server):
+    RangeHandler.accept_ranges = False
+    resumed, download, content = resume(server, CONTENT[:5000])
+    assert resumed is None
+    assert content == b"" and download.size == 0
+
+
+def test_hanging_server_falls_back_on_a_full_get(server):
+    RangeHandler.hang_head = threading.Event()
+    resumed, download, content = resume(server, CONTENT[:5000], timeout=0.5)
+    assert resumed is None
+    assert content == b"" and download.size == 0 and download.resumed == 0
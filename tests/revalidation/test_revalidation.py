@@ -0,0 +1,144 @@
+import hashlib
+import os
+import tempfile
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from urldownloader.revalidation import RevalidationStore
+from urldownloader.urls import normalize_url
+
+
+@pytest.mark.parametrize(
+    "url, normalized",
+    [
+        ("HTTP://Example.COM:80#fragment", "http://example.com/"),
+        ("https://example.com:8443/Path?q=1", "https://example.com:8443/Path?q=1"),
+        ("https://example.com.:443/a", "https://example.com/a"),
+        ("http://User:pw@[::1]:80/x", "http://User:pw@[::1]/x"),
+    ],
+)
+def test_normalize_url(url, normalized):
+    assert normalize_url(url) == normalized
+
+
+def write_body(folder, content):
+    path = os.path.join(folder, "requests_content")
+    with open(path, "wb") as f:
+        f.write(content)
+    return path, hashlib.sha256(content).hexdigest(), len(content)
+
+
+def test_store_and_lookup():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = RevalidationStore(os.path.join(temp_dir, "store"), MagicMock())
+        body = write_body(temp_dir, b"payload")
+
+        assert not store.store("http://example.com/a", "no_proxy", {}, *body)
+        assert not store.store("http://example.com/a", "no_proxy", {"ETag": '"1"', "Cache-Control": "no-store"}, *body)
+        assert store.store("http://example.com/a", "no_proxy", {"ETag": '"1"', "Last-Modified": "yesterday"}, *body)
+
+        stored = store.lookup("HTTP://EXAMPLE.com:80/a#top", "no_proxy")
+        assert stored.validators() == {"If-None-Match": '"1"', "If-Modified-Since": "yesterday"}
+        with open(store.body_path(stored.sha256), "rb") as f:
+            assert f.read() == b"payload"
+        # The proxy profile is part of the key
+        assert store.lookup("http://example.com/a", "localhost_proxy") is None
+
+
+def test_ttl():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = RevalidationStore(os.path.join(temp_dir, "store"), MagicMock(), ttl=60)
+        body = write_body(temp_dir, b"payload")
+        store.store("http://example.com/a", "no_proxy", {"ETag": '"1"'}, *body)
+        store.entries[store.key("http://example.com/a", "no_proxy")].stored_at = time.time() - 61
+        assert store.lookup("http://example.com/a", "no_proxy") is None
+        assert not os.path.exists(store.body_path(body[1]))
+
+        store.store("http://example.com/a", "no_proxy", {"ETag": '"1"'}, *body)
+        store.entries[store.key("http://example.com/a", "no_proxy")].stored_at = time.time() - 61
+        store.refresh("http://example.com/a", "no_proxy")
+        assert store.lookup("http://example.com/a", "no_proxy") is not None
+
+
+def test_lru_eviction_and_shared_bodies():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = RevalidationStore(os.path.join(temp_dir, "store"), MagicMock(), max_size=10)
+        first = write_body(temp_dir, b"1234")
+        store.store("http://example.com/a", "no_proxy", {"ETag": '"a"'}, *first)
+        store.store("http://example.com/b", "no_proxy", {"ETag": '"a"'}, *first)
+        assert store.stats() == {"entries": 2, "bodies": 1, "size": 4}
+
+        second = write_body(temp_dir, b"567890")
+        store.store("http://example.com/c", "no_proxy", {"ETag": '"c"'}, *second)
+        assert store.size == 10
+        # /a is used again, /b is now the least recently used entry
+        store.lookup("http://example.com/a", "no_proxy")
+        third = write_body(temp_dir, b"x")
+        store.store("http://example.com/d", "no_proxy", {"ETag": '"d"'}, *third)
+        assert store.lookup("http://example.com/b", "no_proxy") is None
+        assert store.lookup("http://example.com/a", "no_proxy") is not None
+        # The body of /a and /b is kept until no entry points to it
+        assert os.path.exists(store.body_path(first[1]))
+
+        assert not store.store("http://example.com/e", "no_proxy", {"ETag": '"e"'}, *write_body(temp_dir, b"x" * 11))
+
+
+def test_save_and_load():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        folder = os.path.join(temp_dir, "store")
+        store = RevalidationStore(folder, MagicMock())
+        body = write_body(temp_dir, b"payload")
+        store.store("http://example.com/a", "no_proxy", {"ETag": '"1"'}, *body)
+        store.save()
+        # A body that is not in the index is removed when the index is loaded, unless it is recent enough to be
+        # the body of an entry another instance did not save yet
+        orphan = store.body_path("0" * 64)
+        recent_orphan = store.body_path("1" * 64)
+        for path in (orphan, recent_orphan):
+            with open(path, "wb") as f:
+                f.write(b"orphan")
+        expired = time.time() - store.ttl - 1
+        os.utime(orphan, (expired, expired))
+
+        loaded = RevalidationStore(folder, MagicMock())
+        loaded.load()
+        assert loaded.lookup("http://example.com/a", "no_proxy").etag == '"1"'
+        assert not os.path.exists(orphan)
+        assert os.path.exists(recent_orphan)
+
+
+def test_instances_sharing_the_folder():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        folder = os.path.join(temp_dir, "store")
+        first = RevalidationStore(folder, MagicMock())
+        second = RevalidationStore(folder, MagicMock())
+        first.store("http://example.com/a", "no_proxy", {"ETag": '"1"'}, *write_body(temp_dir, b"a"))
+        first.store("http://example.com/c", "no_proxy", {"ETag": '"1"'}, *write_body(temp_dir, b"c"))
+        second.store("http://example.com/b", "no_proxy", {"ETag": '"1"'}, *write_body(temp_dir, b"b"))
+        second.store("http://example.com/c", "no_proxy", {"ETag": '"2"'}, *write_body(temp_dir, b"c2"))
+        first.save()
+        second.save()
+
+        # The indexes are merged, the most recent response of a URL wins
+        loaded = RevalidationStore(folder, MagicMock())
+        loaded.load()
+        assert loaded.lookup("http://example.com/a", "no_proxy") is not None
+        assert loaded.lookup("http://example.com/b", "no_proxy") is not None
+        assert loaded.lookup("http://example.com/c", "no_proxy").etag == '"2"'
+
+
+def test_body_removed_by_another_instance():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = RevalidationStore(os.path.join(temp_dir, "store"), MagicMock())
+        store.store("http://example.com/a", "no_proxy", {"ETag": '"1"'}, *write_body(temp_dir, b"payload"))
+        stored = store.lookup("http://example.com/a", "no_proxy")
+        with store.open_body("http://example.com/a", "no_proxy", stored) as body:
+            # An opened body stays readable
+            os.unlink(store.body_path(stored.sha256))
+            assert body.read() == b"payload"
+
+        # The entry is dropped, the response is fetched again in full
+        assert store.open_body("http://example.com/a", "no_proxy", stored) is None
+        assert store.stats() == {"entries": 0, "bodies": 0, "size": 0}
@@ -0,0 +1,132 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from urldownloader.routing import Probe, RoutingStats, probe_url
+
+PAGES = {
+    "/sample.zip": ("application/zip", None),
+    "/download.php": ("application/pdf", 'attachment; filename="invoice.pdf"'),
+    "/index.html": ("text/html; charset=utf-8", None),
+}
+
+
+class ProbeHandler(BaseHTTPRequestHandler):
+    head_allowed = True
+    requests = []
+
+    def send_page(self, include_body):
+        ProbeHandler.requests.append((self.command, self.headers.get("Range")))
+        if self.path == "/redirect":
+            self.send_response(302)
+            self.send_header("Location", "/sample.zip")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        content_type, disposition = PAGES[self.path]
+        content = b"0123456789"
+        if self.headers.get("Range") == "bytes=0-0":
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes 0-0/{len(content)}")
+            content = content[:1]
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        if disposition:
+            self.send_header("Content-Disposition", disposition)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        if include_body:
+            self.wfile.write(content)
+
+    def do_HEAD(self):
+        if not self.head_allowed:
+            self.send_response(405)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_page(False)
+
+    def do_GET(self):
+        self.send_page(True)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    ProbeHandler.head_allowed = True
+    ProbeHandler.requests = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ProbeHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.mark.parametrize(
+    "status_code, headers, expected",
+    [
+        (200, {"Content-Type": "application/x-msdownload"}, "Binary content type application/x-msdownload"),
+        (200, {"Content-Type": "application/octet-stream", "Content-Length": "0"}, None),
+        (
+            200,
+            {"Content-Type": "application/pdf", "Content-Disposition": "attachment"},
+            "Attachment of type application/pdf",
+        ),
+        (200, {"Content-Type": "text/html", "Content-Disposition": "attachment"}, None),
+        (200, {"Content-Type": "text/plain", "Content-Disposition": "attachment"}, None),
+        (200, {"Content-Disposition": "attachment"}, None),
+        (200, {"Content-Type": "application/pdf"}, None),
+        (200, {}, None),
+        (403, {"Content-Type": "application/zip"}, None),
+    ],
+)
+def test_direct_download(status_code, headers, expected):
+    assert Probe("http://example.com/", status_code, headers).direct_download() == expected
+
+
+def test_probe_size():
+    assert Probe("http://example.com/", 206, {"Content-Range": "bytes 0-0/1234", "Content-Length": "1"}).size == 1234
+    assert Probe("http://example.com/", 200, {"Content-Length": "1234"}).size == 1234
+    assert Probe("http://example.com/", 200, {"Content-Range": "bytes 0-0/*"}).size is None
+
+
+def test_probe_url(server):
+    with httpx.Client() as client:
+        probe = probe_url(client, f"{server}/redirect")
+        assert probe.url == f"{server}/sample.zip"
+        assert probe.direct_download() == "Binary content type application/zip"
+        assert probe.size == 10
+
+        probe = probe_url(client, f"{server}/download.php")
+        assert probe.attachment
+        assert probe.filename == "invoice.pdf"
+
+        assert probe_url(client, f"{server}/index.html").direct_download() is None
+    assert all(method == "HEAD" for method, _ in ProbeHandler.requests)
+
+
+def test_probe_url_without_head(server):
+    ProbeHandler.head_allowed = False
+    with httpx.Client() as client:
+        probe = probe_url(client, f"{server}/sample.zip")
+    assert probe.status_code == 206
+    assert probe.size == 10
+    assert probe.direct_download() == "Binary content type application/zip"
+    assert ProbeHandler.requests == [("GET", "bytes=0-0")]
+
+
+def test_routing_stats():
+    stats = RoutingStats()
+    stats.decision("direct")
+    stats.decision("browser")
+    assert stats.stats() == {"browser": 1, "direct": 1, "probe_failed": 0, "estimated_seconds_saved": 0.0}
+    stats.browser_run(20)
+    stats.browser_run(10)
+    stats.direct_run(2)
+    assert stats.stats()["estimated_seconds_saved"] == 13.0
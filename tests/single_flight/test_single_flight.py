@@ -0,0 +1,89 @@
+import os
+import tempfile
+import threading
+import time
+
+from urldownloader.single_flight import FileLockBackend, LockBackend, SingleFlight
+
+
+class MemoryLockBackend(LockBackend):
+    """Stand-in for a cross-node backend."""
+
+    def __init__(self):
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, key, timeout):
+        with self.lock:
+            key_lock = self.locks.setdefault(key, threading.Lock())
+        return key_lock.acquire(timeout=timeout) if timeout > 0 else key_lock.acquire(blocking=False)
+
+    def release(self, key):
+        self.locks[key].release()
+
+
+def test_file_lock_backend():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Two backends act as two service instances of the node
+        first = FileLockBackend(temp_dir, poll_interval=0.01)
+        second = FileLockBackend(temp_dir, poll_interval=0.01)
+
+        assert first.acquire("key", 0)
+        assert os.path.exists(os.path.join(temp_dir, "key.lock"))
+        start = time.monotonic()
+        assert not second.acquire("key", 0.1)
+        assert time.monotonic() - start >= 0.1
+        assert second.acquire("other", 0)
+        second.release("other")
+
+        threading.Timer(0.1, first.release, ["key"]).start()
+        assert second.acquire("key", 5)
+        second.release("key")
+        assert os.listdir(temp_dir) == []
+
+        # Releasing a lock that is not held does nothing
+        second.release("key")
+
+
+def test_single_flight():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for backend in [MemoryLockBackend(), FileLockBackend(temp_dir, poll_interval=0.01)]:
+            single_flight = SingleFlight(backend, wait=5)
+            published = []
+            flights = []
+
+            def task(single_flight=single_flight, published=published, flights=flights):
+                with single_flight.flight("key") as flight:
+                    flights.append(flight)
+                    if not published:
+                        time.sleep(0.2)
+                        published.append(flight)
+
+            threads = [threading.Thread(target=task) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            # A single task did the work, the others waited for it
+            assert len(published) == 1
+            assert flights[0] is published[0]
+            assert not flights[0].waited
+            assert all(flight.waited and flight.acquired for flight in flights[1:])
+            assert single_flight.stats() == {"leaders": 1, "followers": 3, "timeouts": 0}
+
+
+def test_single_flight_timeout():
+    single_flight = SingleFlight(MemoryLockBackend(), wait=0.1)
+    with single_flight.flight("key") as leader:
+        with single_flight.flight("key") as follower:
+            assert leader.acquired and not leader.waited
+            assert follower.waited and not follower.acquired
+        # A task with less time left waits less
+        start = time.monotonic()
+        with single_flight.flight("key", wait=0) as follower:
+            assert not follower.acquired
+        assert time.monotonic() - start < 0.1
+    with single_flight.flight("key") as flight:
+        assert flight.acquired and not flight.waited
+    assert single_flight.stats() == {"leaders": 2, "followers": 0, "timeouts": 2}
@@ -0,0 +1,82 @@
+#!/bin/env python
+"""Compare the streaming WebDAV multistatus parser with the element tree previously built from the whole body.
+
+Run from the root of the repository:
+    python -m tests.webdav.bench_webdav --entries 1000 10000 100000
+
+The synthetic listings hold files with the usual PROPFIND properties. The time and the peak of memory allocated
+by Python are reported, the streaming parser being measured with and without its entry cap.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from urldownloader.webdav import MAX_ENTRIES, parse_multistatus
+
+
+def write_listing(path, count):
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?><D:multistatus xmlns:D="DAV:">')
+        for i in range(count):
+            f.write(
+                f"<D:response><D:href>/share/folder/document_{i:06d}.pdf.lnk</D:href><D:propstat><D:prop>"
+                f"<D:displayname>document_{i:06d}.pdf.lnk</D:displayname><D:resourcetype/>"
+                f"<D:getcontentlength>{1024 + i}</D:getcontentlength>"
+                "<D:getcontenttype>application/octet-stream</D:getcontenttype>"
+                "<D:getlastmodified>Wed, 27 Nov 2024 10:00:00 GMT</D:getlastmodified>"
+                "</D:prop><D:status>HTTP/1.1 200 OK</D:status></D:propstat></D:response>"
+            )
+        f.write("</D:multistatus>")
+
+
+def element_tree(path, _):
+    # What the service did before: read the body, build the whole tree, then collect the links
+    with open(path, "rb") as f:
+        root = ET.fromstring(f.read())
+    namespace = {"d": "DAV:"}
+    return [response.find("d:href", namespace).text for response in root.findall("d:response", namespace)]
+
+
+def streaming(path, max_entries):
+    return parse_multistatus(path, max_entries)[0]
+
+
+def measure(function, path, max_entries):
+    start = time.monotonic()
+    function(path, max_entries)
+    elapsed = time.monotonic() - start
+    tracemalloc.start()
+    function(path, max_entries)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, nargs="+", default=[1000, 10000, 100000])
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for count in options.entries:
+            path = os.path.join(temp_dir, f"listing_{count}.xml")
+            write_listing(path, count)
+            size = os.path.getsize(path) / 1024 / 1024
+            for name, function, max_entries in (
+                ("element tree", element_tree, None),
+                ("streaming", streaming, count),
+                (f"streaming, cap {MAX_ENTRIES}", streaming, MAX_ENTRIES),
+            ):
+                elapsed, peak = measure(function, path, max_entries)
+                print(
+                    f"entries={count:<7} {size:>6.1f}MiB {name:<22} {elapsed * 1000:>8.1f}ms "
+                    f"peak {peak / 1024 / 1024:>7.1f}MiB"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -26,10 +26,7 @@ def test_webdav_Downloads():
     mock_request.task.fileinfo.uri_info = create_autospec(URIInfo)
     mock_request.task.fileinfo.uri_info.uri = uri_source
 
-    with open(file_path, "rb") as f:
-        data = f.read()
-
-    detect_webdav_listing(mock_request, data)
+    detect_webdav_listing(mock_request, file_path)
     assert len(mock_request.result.sections) == 1
     section = mock_request.result.sections[0]
     assert "webdav" in section.title_text.lower()
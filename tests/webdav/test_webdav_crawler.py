@@ -0,0 +1,139 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from urldownloader.webdav import WebDAVEntry
+from urldownloader.webdav_crawler import WebDAVCrawler
+
+# Folder path to its children, folders end with a slash
+SHARE = {
+    "/share/": ["/share/a/", "/share/lure.url"],
+    "/share/a/": ["/share/a/b/", "/share/a/notes.txt"],
+    "/share/a/b/": ["/share/a/b/c/", "/share/a/b/payload.lnk"],
+    "/share/a/b/c/": ["/share/a/b/c/deep.exe"],
+}
+
+
+def multistatus(folder):
+    responses = []
+    for href in [folder, *SHARE[folder]]:
+        if href.endswith("/"):
+            prop = "<d:resourcetype><d:collection/></d:resourcetype>"
+        else:
+            prop = "<d:resourcetype/><d:getcontentlength>10</d:getcontentlength>"
+        responses.append(
+            f"<d:response><d:href>{href}</d:href><d:propstat><d:prop>{prop}</d:prop>"
+            "<d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>"
+        )
+    return f'<?xml version="1.0"?><d:multistatus xmlns:d="DAV:">{"".join(responses)}</d:multistatus>'.encode()
+
+
+class WebDAVHandler(BaseHTTPRequestHandler):
+    delay = 0
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def do_PROPFIND(self):
+        with WebDAVHandler.lock:
+            WebDAVHandler.in_flight += 1
+            WebDAVHandler.max_in_flight = max(WebDAVHandler.max_in_flight, WebDAVHandler.in_flight)
+        try:
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(self.delay)
+            if self.headers.get("Depth") != "1" or self.path not in SHARE:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = multistatus(self.path)
+            self.send_response(207)
+            self.send_header("Content-Type", "text/xml")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with WebDAVHandler.lock:
+                WebDAVHandler.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    WebDAVHandler.delay = 0
+    WebDAVHandler.max_in_flight = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), WebDAVHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def first_level(root):
+    # What detect_webdav_listing gives for the listing Kangooroo received
+    return [
+        (
+            f"{root}/share/",
+            [
+                WebDAVEntry("/share/", None, "folder", None),
+                WebDAVEntry("/share/a/", None, "folder", None),
+                WebDAVEntry("/share/lure.url", 10, "unknown", None),
+                WebDAVEntry("/share/missing/", None, "folder", None),
+            ],
+        )
+    ]
+
+
+def test_full_tree(server):
+    tree = WebDAVCrawler().crawl(first_level(server))
+    assert tree.lines() == [
+        f"{server}/share/",
+        "  a/",
+        "    b/",
+        "      c/",
+        "        deep.exe (unknown, 10 bytes)",
+        "      payload.lnk (unknown, 10 bytes)",
+        "    notes.txt (unknown, 10 bytes)",
+        "  lure.url (unknown, 10 bytes)",
+        "  missing/",
+        "    [HTTP 404]",
+    ]
+    assert tree.entry_count == 8
+    assert not tree.entries_truncated and not tree.depth_truncated and not tree.timed_out
+
+
+def test_depth_and_entries_caps(server):
+    tree = WebDAVCrawler(max_depth=1).crawl(first_level(server))
+    assert f"{server}/share/a/b/" in [url for url, _ in tree.folders[f"{server}/share/a/"]]
+    assert f"{server}/share/a/b/" not in tree.folders
+    assert tree.depth_truncated
+
+    tree = WebDAVCrawler(max_entries=4).crawl(first_level(server))
+    assert tree.entry_count == 4
+    assert tree.entries_truncated
+
+
+def test_in_flight_limit_and_time_budget(server):
+    SHARE["/wide/"] = [f"/wide/{i}/" for i in range(8)]
+    for i in range(8):
+        SHARE[f"/wide/{i}/"] = []
+    try:
+        WebDAVHandler.delay = 0.1
+        listing = [(f"{server}/wide/", [WebDAVEntry(href, None, "folder", None) for href in SHARE["/wide/"]])]
+        tree = WebDAVCrawler(max_in_flight=2).crawl(listing)
+        assert WebDAVHandler.max_in_flight == 2
+        assert not tree.timed_out and not tree.errors
+
+        WebDAVHandler.delay = 1
+        start = time.monotonic()
+        tree = WebDAVCrawler(time_budget=0.5).crawl(listing)
+        assert time.monotonic() - start < 1
+        assert tree.timed_out
+    finally:
+        for href in [href for href in SHARE if href.startswith("/wide/")]:
+            del SHARE[href]
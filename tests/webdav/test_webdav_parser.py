@@ -0,0 +1,59 @@
+import io
+
+from urldownloader.webdav import parse_multistatus
+
+
+def multistatus(responses):
+    return f'<?xml version="1.0"?><d:multistatus xmlns:d="DAV:">{"".join(responses)}</d:multistatus>'.encode()
+
+
+def response(href, collection=False, size=None, content_type=None, last_modified=None, status="HTTP/1.1 200 OK"):
+    prop = "<d:resourcetype><d:collection/></d:resourcetype>" if collection else "<d:resourcetype/>"
+    if size is not None:
+        prop += f"<d:getcontentlength>{size}</d:getcontentlength>"
+    if content_type:
+        prop += f"<d:getcontenttype>{content_type}</d:getcontenttype>"
+    if last_modified:
+        prop += f"<d:getlastmodified>{last_modified}</d:getlastmodified>"
+    return (
+        f"<d:response><d:href>{href}</d:href>"
+        f"<d:propstat><d:prop>{prop}</d:prop><d:status>{status}</d:status></d:propstat>"
+        "<d:propstat><d:prop><d:getcontentlength>1</d:getcontentlength></d:prop>"
+        "<d:status>HTTP/1.1 404 Not Found</d:status></d:propstat></d:response>"
+    )
+
+
+def test_structured_entries():
+    document = multistatus(
+        [
+            response("/Downloads/", collection=True, last_modified="Wed, 27 Nov 2024 10:00:00 GMT"),
+            response("/Downloads/invoice.pdf.lnk", size=2048, content_type="application/octet-stream"),
+            response("/Downloads/unknown"),
+            "<d:response><d:status>HTTP/1.1 200 OK</d:status></d:response>",
+        ]
+    )
+    entries, truncated = parse_multistatus(io.BytesIO(document))
+    assert not truncated
+    assert [(entry.href, entry.type, entry.size, entry.last_modified) for entry in entries] == [
+        ("/Downloads/", "folder", None, "Wed, 27 Nov 2024 10:00:00 GMT"),
+        ("/Downloads/invoice.pdf.lnk", "application/octet-stream", 2048, None),
+        ("/Downloads/unknown", "unknown", None, None),
+    ]
+    assert entries[0].is_folder and not entries[1].is_folder
+
+
+def test_entries_cap():
+    document = multistatus([response(f"/share/{i}.lnk", size=i) for i in range(10)])
+    entries, truncated = parse_multistatus(io.BytesIO(document), max_entries=4)
+    assert truncated
+    assert [entry.href for entry in entries] == [f"/share/{i}.lnk" for i in range(4)]
+
+    entries, truncated = parse_multistatus(io.BytesIO(document), max_entries=10)
+    assert not truncated and len(entries) == 10
+
+
+def test_malformed_document():
+    document = multistatus([response("/share/a.lnk"), response("/share/b.lnk")])[:-10]
+    entries, truncated = parse_multistatus(io.BytesIO(document))
+    assert [entry.href for entry in entries] == ["/share/a.lnk", "/share/b.lnk"]
+    assert not truncated
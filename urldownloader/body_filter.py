@@ -0,0 +1,34 @@
+import re
+
+
+class BodyFilter:
+    """Skip the HAR bodies that are not worth decoding, only from the metadata read before the body.
+
+    The bodies of the target URLs are never skipped.
+    """
+
+    def __init__(self, config: dict, target_urls: list[str]) -> None:
+        self.skip_mimetypes = [re.compile(x) for x in config.get("skip_mimetypes", [])]
+        self.skip_urls = [re.compile(x) for x in config.get("skip_urls", [])]
+        self.max_size = config.get("max_size_mb", 0) * 1024 * 1024
+        self.tracking_pixel_size = config.get("tracking_pixel_size", 0)
+        self.target_urls = set(target_urls)
+
+    def __call__(self, entry: dict, content: dict) -> str | None:
+        url = entry.get("request", {}).get("url", "")
+        if url in self.target_urls:
+            return None
+
+        mimetype = content.get("mimeType") or ""
+        size = content.get("size") or 0
+        if self.max_size and size > self.max_size:
+            return f"Larger than {self.max_size // 1024 // 1024}MB"
+        if self.tracking_pixel_size and mimetype.startswith("image/") and 0 < size <= self.tracking_pixel_size:
+            return "Tracking pixel"
+        for regex in self.skip_mimetypes:
+            if regex.search(mimetype):
+                return f"Skipped mimeType {mimetype}"
+        for regex in self.skip_urls:
+            if regex.search(url):
+                return "Skipped URL"
+        return None
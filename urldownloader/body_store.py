@@ -0,0 +1,53 @@
+import os
+import tempfile
+
+from urldownloader.har import HARBody
+
+
+class BodyStore:
+    """Content-addressed store of the HAR response bodies, each unique body is written once.
+
+    Blobs are named after the sha256 of the decoded body. The hashes of the spooled text are remembered as well,
+    an entry whose text was already seen points to the existing blob without being decoded again.
+    """
+
+    def __init__(self, folder: str) -> None:
+        self.folder = folder
+        os.makedirs(self.folder, exist_ok=True)
+        # sha256 of the body -> md5, sha1, sha256 and size of the body
+        self.blobs: dict[str, dict] = {}
+        # (base64 encoded, sha256 of the text) -> sha256 of the body
+        self.texts: dict[tuple[bool, str], str] = {}
+
+    def path(self, sha256: str) -> str:
+        return os.path.join(self.folder, sha256)
+
+    def add(self, body: HARBody) -> dict:
+        """Extract a body from its entry and store it if its content is new.
+
+        Returns:
+            The md5, sha1, sha256 and size of the body, the blob being at path(sha256).
+        """
+        body.mark_extracted()
+        text_key = (body.base64_encoded, body.text_hasher.sha256.hexdigest())
+        if text_key in self.texts:
+            body.discard()
+            return self.blobs[self.texts[text_key]]
+
+        if body.base64_encoded:
+            fd, candidate = tempfile.mkstemp(dir=self.folder)
+            os.close(fd)
+            hashes = body.decode_to(candidate).hashes()
+            body.discard()
+        else:
+            candidate = body.text_path
+            hashes = body.text_hasher.hashes()
+
+        sha256 = hashes["sha256"]
+        if sha256 in self.blobs:
+            os.remove(candidate)
+        else:
+            os.replace(candidate, self.path(sha256))
+            self.blobs[sha256] = hashes
+        self.texts[text_key] = sha256
+        return self.blobs[sha256]
@@ -0,0 +1,57 @@
+from typing import Callable
+
+
+class NetworkConnectionCollector:
+    """Collect the HTTP connections of a session before they are added to the ontology.
+
+    When coalescing, connections with the same method, URL, status and response content are grouped into the
+    first one seen and counted. At most max_connections are kept, 0 meaning no limit.
+    """
+
+    def __init__(self, coalesce: bool = False, max_connections: int = 0) -> None:
+        self.coalesce = coalesce
+        self.max_connections = max_connections
+        # Key -> [http_details, count], in the order the connections were first seen
+        self.connections: dict[tuple, list] = {}
+        self.dropped = 0
+
+    def add(self, http_details: dict):
+        if self.coalesce:
+            key = (
+                http_details["request_method"],
+                http_details["request_uri"],
+                http_details["response_status_code"],
+                http_details.get("response_content_fileinfo", {}).get("sha256"),
+                http_details.get("response_content_mimetype"),
+            )
+        else:
+            key = (len(self.connections) + self.dropped,)
+
+        if key in self.connections:
+            self.connections[key][1] += 1
+        elif self.max_connections and len(self.connections) >= self.max_connections:
+            self.dropped += 1
+        else:
+            self.connections[key] = [http_details, 1]
+
+    def emit(self, add_connection: Callable[[dict], None]):
+        for http_details, _ in self.connections.values():
+            add_connection(http_details)
+
+    def repeated(self) -> list[tuple[dict, int]]:
+        return [(http_details, count) for http_details, count in self.connections.values() if count > 1]
+
+
+class TagDeduplicator:
+    """Add each tag value once per section, skipping the validation of the values already tagged."""
+
+    def __init__(self, add_tag: Callable) -> None:
+        self.add_tag = add_tag
+        self.seen: set[tuple[int, str, str]] = set()
+
+    def __call__(self, section, tag_type: str, value: str):
+        key = (id(section), tag_type, value)
+        if key in self.seen:
+            return
+        self.seen.add(key)
+        self.add_tag(section, tag_type, value)
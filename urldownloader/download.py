@@ -0,0 +1,69 @@
+from typing import Callable
+
+from urldownloader.hashing import ContentHasher
+
+
+class Download:
+    """Content of an HTTP response written to a file, hashed and sniffed while it is received.
+
+    The first chunk is given to the sniff callback, which follows the Identify.ident signature, as soon as it is
+    written. Once max_size bytes were written the following content is dropped and the download is truncated.
+    """
+
+    def __init__(self, path: str, max_size: int = 0, sniff: Callable[[bytes, int, str], dict] | None = None) -> None:
+        self.path = path
+        self.max_size = max_size
+        self.sniff = sniff
+        self.sniffed: dict = {}
+        self.truncated = False
+        # Bytes taken from a previous partial download
+        self.resumed = 0
+        self._file = open(path, "wb")
+        self.hasher = ContentHasher(self._file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, chunk: bytes) -> bool:
+        """Add a chunk of the response.
+
+        Returns:
+            False once the maximum size is reached, the rest of the response does not need to be read.
+        """
+        if self.max_size and self.hasher.size + len(chunk) > self.max_size:
+            chunk = chunk[: self.max_size - self.hasher.size]
+            self.truncated = True
+        if chunk:
+            first = self.hasher.size == 0
+            self.hasher.write(chunk)
+            if first and self.sniff is not None:
+                self._file.flush()
+                self.sniffed = self.sniff(chunk, len(chunk), self.path)
+        return not self.truncated
+
+    def reset(self) -> None:
+        """Drop what was written, the response is received again from its start."""
+        self._file.seek(0)
+        self._file.truncate()
+        self.hasher = ContentHasher(self._file)
+        self.sniffed = {}
+        self.truncated = False
+        self.resumed = 0
+
+    def close(self) -> None:
+        self._file.close()
+
+    @property
+    def hashes(self) -> dict:
+        return self.hasher.hashes()
+
+    @property
+    def sha256(self) -> str:
+        return self.hasher.sha256.hexdigest()
+
+    @property
+    def size(self) -> int:
+        return self.hasher.size
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class FileInfoCache:
+    """Process-wide cache of Identify results keyed by sha256, so that only unseen content gets identified.
+
+    The cache is bounded by a number of entries and by the size of the cached results, the least recently used
+    entries are evicted first. Lookups are thread safe, Identify itself runs outside of the lock. The cache can be
+    saved to a local index and loaded back when the service starts. The index is ignored if it was written by
+    another version of the service, Identify could give other results.
+    """
+
+    def __init__(
+        self,
+        identify,
+        log,
+        max_entries: int = 10000,
+        max_size: int = 32 * 1024 * 1024,
+        index_path: str | None = None,
+        version: str = "",
+    ) -> None:
+        self.identify = identify
+        self.log = log
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.index_path = index_path
+        self.version = version
+        # sha256 -> (fileinfo, size of the serialized fileinfo), least recently used first
+        self.entries: OrderedDict[str, tuple[dict, int]] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def fileinfo(self, path: str, sha256: str | None = None) -> dict:
+        """Identify a file, the sha256 is computed from the file when it is not already known.
+
+        Returns:
+            A copy of the Identify result, computed without fuzzy hashes nor entropy.
+        """
+        if sha256 is None:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                while chunk := f.read(1024 * 1024):
+                    digest.update(chunk)
+            sha256 = digest.hexdigest()
+
+        with self.lock:
+            if sha256 in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(sha256)
+                return dict(self.entries[sha256][0])
+            self.misses += 1
+
+        fileinfo = self.identify.fileinfo(path, skip_fuzzy_hashes=True, calculate_entropy=False)
+        with self.lock:
+            self._add(fileinfo["sha256"], fileinfo)
+        return dict(fileinfo)
+
+    def _add(self, sha256: str, fileinfo: dict):
+        size = len(json.dumps(fileinfo))
+        if size > self.max_size or self.max_entries <= 0:
+            return
+        if sha256 in self.entries:
+            self.size -= self.entries.pop(sha256)[1]
+        self.entries[sha256] = (fileinfo, size)
+        self.size += size
+        while len(self.entries) > self.max_entries or self.size > self.max_size:
+            self.size -= self.entries.popitem(last=False)[1][1]
+
+    def stats(self) -> dict:
+        return {"entries": len(self.entries), "size": self.size, "hits": self.hits, "misses": self.misses}
+
+    def load(self):
+        if not self.index_path or not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError) as e:
+            self.log.warning(f"Unable to load the fileinfo cache index {self.index_path}: {e}")
+            return
+        if index.get("version") != self.version:
+            self.log.info("Ignoring the fileinfo cache index written by another version of the service")
+            return
+        for sha256, fileinfo in index.get("entries", []):
+            self._add(sha256, fileinfo)
+        self.log.info(f"Loaded {len(self.entries)} entries in the fileinfo cache")
+
+    def save(self):
+        if not self.index_path:
+            return
+        index = {"version": self.version, "entries": [[sha256, entry[0]] for sha256, entry in self.entries.items()]}
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.index_path))
+            with open(fd, "w") as f:
+                json.dump(index, f)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            self.log.warning(f"Unable to save the fileinfo cache index {self.index_path}: {e}")
+
+
+class FileInfoBatch:
+    """Identify the files of a task, fanned out to a thread pool when an executor is given.
+
+    Files are submitted in order and each sha256 is identified once, the results are collected by sha256 once
+    every file was submitted so the order of the output does not depend on which identification ends first.
+    """
+
+    def __init__(self, cache: FileInfoCache, executor: ThreadPoolExecutor | None = None) -> None:
+        self.cache = cache
+        self.executor = executor
+        self.results: dict[str, dict | Future] = {}
+
+    def submit(self, path: str, sha256: str):
+        if sha256 in self.results:
+            return
+        if self.executor:
+            self.results[sha256] = self.executor.submit(self.cache.fileinfo, path, sha256)
+        else:
+            self.results[sha256] = self.cache.fileinfo(path, sha256)
+
+    def result(self, sha256: str) -> dict:
+        result = self.results[sha256]
+        if isinstance(result, Future):
+            result = self.results[sha256] = result.result()
+        return result
@@ -0,0 +1,396 @@
+import base64
+import binascii
+import json
+import os
+import re
+import shutil
+import tempfile
+from typing import IO, Callable, Iterator
+
+from urldownloader.hashing import ContentHasher
+
+READ_SIZE = 1024 * 1024
+# Multiple of 4 so that every chunk holds complete base64 quanta
+BASE64_CHUNK_SIZE = 4 * 256 * 1024
+
+BASE64_INVALID_CHARACTERS = re.compile(rb"[^A-Za-z0-9+/=]")
+STRING_SPECIAL_CHARACTERS = re.compile(r'["\\]')
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+JSON_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+# Path of the response body inside a HAR entry
+TEXT_PATH = ("response", "content", "text")
+_STREAMED = object()
+
+
+class HARFormatError(Exception):
+    pass
+
+
+class JSONStream:
+    """Incremental JSON reader keeping at most a few chunks of the document in memory.
+
+    Values are decoded as a whole with read_value(), except the strings read with stream_string() which are
+    written to a file as they are decoded.
+    """
+
+    def __init__(self, fh: IO[str]) -> None:
+        self.fh = fh
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size: int | None = None) -> bool:
+        if self.eof:
+            return False
+        data = self.fh.read(size or READ_SIZE)
+        if not data:
+            self.eof = True
+            return False
+        if self.pos > READ_SIZE:
+            self.buffer = self.buffer[self.pos :]
+            self.pos = 0
+        self.buffer += data
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, character: str):
+        if self.peek() != character:
+            raise HARFormatError(f"Expected '{character}' but found '{self.peek()}'")
+        self.pos += 1
+
+    def read_value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number at the end of the buffer could still be incomplete
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow the buffer with at least as much data as the value already holds
+            self._fill(max(READ_SIZE, len(self.buffer) - self.pos))
+
+    def _require(self, length: int):
+        while len(self.buffer) - self.pos < length:
+            if not self._fill():
+                raise HARFormatError("Unexpected end of document")
+
+    def stream_string(self, sink: IO[str]):
+        self.expect('"')
+        while True:
+            match = STRING_SPECIAL_CHARACTERS.search(self.buffer, self.pos)
+            if match is None:
+                sink.write(self.buffer[self.pos :])
+                self.pos = len(self.buffer)
+                if not self._fill():
+                    raise HARFormatError("Unterminated string")
+                continue
+
+            sink.write(self.buffer[self.pos : match.start()])
+            self.pos = match.start() + 1
+            if match.group() == '"':
+                return
+
+            self._require(1)
+            escape = self.buffer[self.pos]
+            if escape != "u":
+                if escape not in JSON_ESCAPES:
+                    raise HARFormatError(f"Invalid escape '\\{escape}'")
+                sink.write(JSON_ESCAPES[escape])
+                self.pos += 1
+                continue
+
+            self._require(5)
+            code = int(self.buffer[self.pos + 1 : self.pos + 5], 16)
+            self.pos += 5
+            if 0xD800 <= code < 0xDC00:
+                # Surrogate pair, combined the same way json.loads does
+                try:
+                    self._require(6)
+                except HARFormatError:
+                    pass
+                if self.buffer[self.pos : self.pos + 2] == "\\u":
+                    low = int(self.buffer[self.pos + 2 : self.pos + 6], 16)
+                    if 0xDC00 <= low < 0xE000:
+                        code = 0x10000 + (((code - 0xD800) << 10) | (low - 0xDC00))
+                        self.pos += 6
+            sink.write(chr(code))
+
+
+class _Discard:
+    def write(self, text: str):
+        pass
+
+
+class _TextSpool:
+    """Write the decoded text of a JSON string to a file, hashing it on the way."""
+
+    def __init__(self, output: IO[bytes]) -> None:
+        self.hasher = ContentHasher(output)
+
+    def write(self, text: str):
+        self.hasher.write(text.encode("utf-8", errors="surrogatepass"))
+
+
+class HARBody:
+    """Response body of a HAR entry, spooled to disk while the HAR is read.
+
+    The hashes of the spooled text are also the hashes of the body when it is not base64 encoded.
+    """
+
+    def __init__(self, content: dict, text_path: str, text_hasher: ContentHasher) -> None:
+        self.content = content
+        self.text_path = text_path
+        self.text_hasher = text_hasher
+        self.extracted = False
+
+    @property
+    def base64_encoded(self) -> bool:
+        return self.content.get("encoding") == "base64"
+
+    def read_text(self) -> str:
+        with open(self.text_path, "r", encoding="utf-8", errors="surrogatepass", newline="") as f:
+            return f.read()
+
+    def decode_to(self, path: str) -> ContentHasher:
+        """Decode a base64 encoded body to a file, hashing it as it is written.
+
+        Returns:
+            The hasher of the content written, the text itself if it was not valid base64.
+        """
+        with open(path, "wb") as content_file:
+            hasher = ContentHasher(content_file)
+            try:
+                decode_base64(self.text_path, hasher)
+            except (ValueError, binascii.Error):
+                # Not valid base64 after all, keep the text as it is
+                content_file.seek(0)
+                content_file.truncate()
+                hasher = ContentHasher(content_file)
+                with open(self.text_path, "rb") as f:
+                    shutil.copyfileobj(f, hasher)
+        return hasher
+
+    def mark_extracted(self):
+        """Remove the text from the entry, the consumer takes care of the spooled text."""
+        self.extracted = True
+        self.content.pop("text", None)
+
+    def extract(self) -> str:
+        """Decode the body to a file and remove its text from the entry.
+
+        Returns:
+            The path of the file holding the decoded body.
+        """
+        self.mark_extracted()
+        if not self.base64_encoded:
+            return self.text_path
+
+        fd, content_path = tempfile.mkstemp(dir=os.path.dirname(self.text_path))
+        os.close(fd)
+        self.decode_to(content_path)
+        os.remove(self.text_path)
+        return content_path
+
+    def discard(self):
+        if os.path.exists(self.text_path):
+            os.remove(self.text_path)
+
+
+class HARHeaders:
+    """Headers of a HAR request or response, with a case-insensitive index built on the first lookup."""
+
+    __slots__ = ("headers", "_index")
+
+    def __init__(self, headers: list[dict]) -> None:
+        self.headers = headers
+        self._index = None
+
+    def get(self, name: str, default: str | None = None) -> str | None:
+        if self._index is None:
+            # Like in a dictionary built from the list, the last header of a given name wins
+            self._index = {header["name"].lower(): header["value"] for header in self.headers}
+        return self._index.get(name.lower(), default)
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def to_dict(self) -> dict:
+        return {header["name"]: header["value"] for header in self.headers}
+
+
+class HAREntry:
+    """Fields of a HAR entry inspected by the service.
+
+    The content is the dictionary of the entry, so that changes made to it are kept in the modified HAR.
+    """
+
+    __slots__ = (
+        "url",
+        "method",
+        "status",
+        "server_ip",
+        "redirect_url",
+        "error",
+        "content",
+        "request_headers",
+        "response_headers",
+    )
+
+    def __init__(self, entry: dict) -> None:
+        request = entry["request"]
+        response = entry["response"]
+        self.url: str = request["url"]
+        self.method: str = request["method"]
+        self.status: int = response["status"]
+        self.server_ip: str | None = entry.get("serverIPAddress")
+        self.redirect_url: str = response.get("redirectURL", "")
+        self.error: str | None = response.get("_errorMessage")
+        self.content: dict = response["content"]
+        self.request_headers = HARHeaders(request["headers"])
+        self.response_headers = HARHeaders(response["headers"])
+
+
+def decode_base64(text_path: str, output: IO[bytes]):
+    """Decode base64 text in fixed-size chunks, giving the same result as base64.b64decode on the whole text."""
+    remainder = b""
+    with open(text_path, "r", encoding="utf-8", errors="surrogatepass", newline="") as f:
+        while chunk := f.read(BASE64_CHUNK_SIZE):
+            # Same error as base64.b64decode for non-ASCII text
+            data = remainder + BASE64_INVALID_CHARACTERS.sub(b"", chunk.encode("ascii"))
+            if b"=" in data:
+                # Padding is only expected at the very end, let b64decode deal with whatever is left
+                remainder = data + BASE64_INVALID_CHARACTERS.sub(b"", f.read().encode("ascii"))
+                break
+            cut = len(data) - len(data) % 4
+            output.write(binascii.a2b_base64(data[:cut]))
+            remainder = data[cut:]
+    output.write(base64.b64decode(remainder))
+
+
+class HARRewriter:
+    """Walk the entries of a HAR one at a time while writing a modified copy of the document.
+
+    The document is copied as json.dump would write it. The response bodies are never loaded in memory, they are
+    spooled to disk and can be extracted by the consumer, which removes them from the modified copy.
+
+    The body filter is called with the entry and its content, as much as was read before the body, and returns the
+    reason why the body should be skipped. A skipped body is read without being spooled and its text is replaced
+    by that reason in the modified copy.
+    """
+
+    def __init__(
+        self,
+        har_path: str,
+        modified_har_path: str,
+        body_folder: str,
+        body_filter: Callable[[dict, dict], str | None] | None = None,
+    ) -> None:
+        self.har_path = har_path
+        self.modified_har_path = modified_har_path
+        self.body_folder = body_folder
+        self.body_filter = body_filter
+
+    def _copy_object(self, stream: JSONStream, output: IO[str], handlers: dict):
+        stream.expect("{")
+        output.write("{")
+        first = True
+        while stream.peek() != "}":
+            if not first:
+                stream.expect(",")
+                output.write(", ")
+            first = False
+            key = stream.read_value()
+            stream.expect(":")
+            output.write(f"{json.dumps(key)}: ")
+            if key in handlers and stream.peek() == handlers[key][0]:
+                yield from handlers[key][1](stream, output)
+            else:
+                json.dump(stream.read_value(), output)
+        stream.expect("}")
+        output.write("}")
+
+    def _copy_entries(self, stream: JSONStream, output: IO[str]):
+        stream.expect("[")
+        output.write("[")
+        first = True
+        while stream.peek() != "]":
+            if not first:
+                stream.expect(",")
+                output.write(", ")
+            first = False
+
+            body = None
+            if stream.peek() == "{":
+                entry, body = self._read_entry(stream)
+            else:
+                entry = stream.read_value()
+
+            yield entry, body
+
+            if body is not None and not body.extracted:
+                if body.content.get("text") is _STREAMED:
+                    body.content["text"] = body.read_text()
+                body.discard()
+            json.dump(entry, output)
+        stream.expect("]")
+        output.write("]")
+
+    def _read_object(self, stream: JSONStream, path: tuple, bodies: list, entry: dict | None = None) -> dict:
+        stream.expect("{")
+        value = {}
+        if entry is None:
+            entry = value
+        while stream.peek() != "}":
+            if value:
+                stream.expect(",")
+            key = stream.read_value()
+            stream.expect(":")
+            skip_reason = None
+            if key == path[0] and len(path) == 1 and stream.peek() == '"' and self.body_filter:
+                skip_reason = self.body_filter(entry, value)
+            if skip_reason:
+                stream.stream_string(_Discard())
+                value["_skipped"] = skip_reason
+            elif key == path[0] and len(path) == 1 and stream.peek() == '"':
+                fd, text_path = tempfile.mkstemp(dir=self.body_folder)
+                with open(fd, "wb") as text_file:
+                    spool = _TextSpool(text_file)
+                    stream.stream_string(spool)
+                value[key] = _STREAMED
+                bodies.append(HARBody(value, text_path, spool.hasher))
+            elif key == path[0] and len(path) > 1 and stream.peek() == "{":
+                value[key] = self._read_object(stream, path[1:], bodies, entry)
+            else:
+                value[key] = stream.read_value()
+        stream.expect("}")
+        return value
+
+    def _read_entry(self, stream: JSONStream) -> tuple[dict, HARBody | None]:
+        bodies = []
+        entry = self._read_object(stream, TEXT_PATH, bodies)
+        return entry, bodies[-1] if bodies else None
+
+    def __iter__(self) -> Iterator[tuple[dict, HARBody | None]]:
+        """Yield the entries with their spooled body, changes made to an entry are kept in the modified copy."""
+        with (
+            open(self.har_path, "r", encoding="utf-8", newline="") as har_file,
+            open(self.modified_har_path, "w") as output,
+        ):
+            stream = JSONStream(har_file)
+            log_handlers = {"entries": ("[", self._copy_entries)}
+            yield from self._copy_object(
+                stream, output, {"log": ("{", lambda s, o: self._copy_object(s, o, log_handlers))}
+            )
@@ -0,0 +1,30 @@
+import hashlib
+from typing import IO
+
+
+class ContentHasher:
+    """Compute the hashes and size of content while it is being written."""
+
+    def __init__(self, output: IO[bytes] | None = None) -> None:
+        self.output = output
+        self.md5 = hashlib.md5()
+        self.sha1 = hashlib.sha1()
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.md5.update(data)
+        self.sha1.update(data)
+        self.sha256.update(data)
+        self.size += len(data)
+        if self.output is not None:
+            self.output.write(data)
+        return len(data)
+
+    def hashes(self) -> dict:
+        return {
+            "md5": self.md5.hexdigest(),
+            "sha1": self.sha1.hexdigest(),
+            "sha256": self.sha256.hexdigest(),
+            "size": self.size,
+        }
@@ -0,0 +1,222 @@
+import abc
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Iterator
+
+# Second level labels under which every name is registered by a different owner, as in example.co.uk
+SHARED_SECOND_LEVELS = {"ac", "co", "com", "edu", "gc", "go", "gob", "gouv", "gov", "ltd", "ne", "net", "or", "org"}
+
+
+def registrable_domain(host: str) -> str:
+    """Approximate the domain a host was registered under, without a public suffix list.
+
+    Returns:
+        The last two labels of the host, three under a shared second level of a country code, or the IP address.
+    """
+    host = host.lower().rstrip(".")
+    labels = host.split(".")
+    if ":" in host or labels[-1].isdigit() or len(labels) <= 2:
+        return host
+    if len(labels[-1]) == 2 and labels[-2] in SHARED_SECOND_LEVELS:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+class GovernorBackend(abc.ABC):
+    """State of the hosts shared by the service instances, a cross-node backend implements the same methods."""
+
+    @abc.abstractmethod
+    def try_acquire(self, key: str, max_in_flight: int, rate: float, burst: int) -> tuple[str | None, float]:
+        """Start a fetch of the host if it has a free slot and a token.
+
+        Returns:
+            The identifier of the slot, None if the fetch cannot start yet, and the seconds to wait before trying again.
+        """
+
+    @abc.abstractmethod
+    def renew(self, key: str, slot: str):
+        """Extend the lease of a slot that is still held."""
+
+    @abc.abstractmethod
+    def release(self, key: str, slot: str):
+        """Free a slot taken by try_acquire."""
+
+
+def take_slot(state: dict, max_in_flight: int, rate: float, burst: int, now: float) -> tuple[str | None, float]:
+    """Take a slot and a token from the state of a host, a dict with in_flight, tokens and updated keys.
+
+    The in_flight dict maps each slot to the last time its lease was renewed.
+
+    Returns:
+        The identifier of the slot, None if there is no free slot or no token, and the seconds to wait for a token.
+    """
+    state["tokens"] = min(burst, state["tokens"] + (now - state["updated"]) * rate)
+    state["updated"] = now
+    if len(state["in_flight"]) >= max_in_flight:
+        return None, 0
+    if state["tokens"] < 1:
+        return None, (1 - state["tokens"]) / rate
+    state["tokens"] -= 1
+    slot = uuid.uuid4().hex
+    state["in_flight"][slot] = now
+    return slot, 0
+
+
+class FileGovernorBackend(GovernorBackend):
+    """State of each host kept in a file of a folder and changed under flock, shared by the instances mounting it.
+
+    The holder of a slot renews its lease while it fetches. Slots not renewed for lease seconds, as those of an
+    instance that was stopped, are released by the next instance reading the state.
+    """
+
+    def __init__(self, folder: str, lease: float = 60) -> None:
+        self.folder = folder
+        self.lease = lease
+        os.makedirs(folder, exist_ok=True)
+        # The state of a host that was not fetched for a day is a full bucket without any slot taken
+        for name in os.listdir(folder):
+            path = os.path.join(folder, name)
+            if time.time() - os.path.getmtime(path) > 86400:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+    @contextlib.contextmanager
+    def _state(self, key: str) -> Iterator[dict]:
+        with open(os.path.join(self.folder, hashlib.sha256(key.encode()).hexdigest()), "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            try:
+                state = json.loads(f.read())
+            except ValueError:
+                state = {"in_flight": {}, "tokens": None, "updated": time.time()}
+            yield state
+            f.seek(0)
+            f.truncate()
+            json.dump(state, f)
+
+    def try_acquire(self, key: str, max_in_flight: int, rate: float, burst: int) -> tuple[str | None, float]:
+        now = time.time()
+        with self._state(key) as state:
+            if state["tokens"] is None:
+                state["tokens"] = burst
+            state["in_flight"] = {
+                slot: renewed for slot, renewed in state["in_flight"].items() if now - renewed <= self.lease
+            }
+            return take_slot(state, max_in_flight, rate, burst, now)
+
+    def renew(self, key: str, slot: str):
+        with self._state(key) as state:
+            if slot in state["in_flight"]:
+                state["in_flight"][slot] = time.time()
+
+    def release(self, key: str, slot: str):
+        with self._state(key) as state:
+            state["in_flight"].pop(slot, None)
+
+
+class Slot:
+    __slots__ = ("key", "acquired", "waited")
+
+    def __init__(self, key: str, acquired: bool, waited: float) -> None:
+        self.key = key
+        # False if the task gave up waiting for the host
+        self.acquired = acquired
+        # Seconds spent in the queue of the host
+        self.waited = waited
+
+
+class HostGovernor:
+    """Limit the fetches of each site, keyed by registrable domain, to max_in_flight at a time.
+
+    New fetches of a site are also limited to rate per second with a token bucket holding up to burst tokens. Tasks
+    wait for a free slot and a token for at most max_wait seconds. The lease of a slot is renewed every heartbeat
+    seconds while it is held, which must be shorter than the lease of the backend.
+    """
+
+    def __init__(
+        self,
+        backend: GovernorBackend,
+        max_in_flight: int = 2,
+        rate: float = 1,
+        burst: int = 2,
+        max_wait: float = 60,
+        poll_interval: float = 0.5,
+        heartbeat: float = 20,
+    ) -> None:
+        self.backend = backend
+        self.max_in_flight = max_in_flight
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self.heartbeat = heartbeat
+        self.acquired = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.longest_wait = 0.0
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def slot(self, host: str, max_wait: float | None = None) -> Iterator[Slot]:
+        """Wait for a slot to fetch from host and hold it for the duration of the block.
+
+        Args:
+            host: Host the task fetches from.
+            max_wait: Seconds the task can wait, when it has less time left than the max_wait of the governor.
+
+        Yields:
+            The slot, telling if it was acquired and how long the task waited for it.
+        """
+        key = registrable_domain(host)
+        start = time.monotonic()
+        deadline = start + (self.max_wait if max_wait is None else min(max_wait, self.max_wait))
+        while True:
+            slot_id, retry_after = self.backend.try_acquire(key, self.max_in_flight, self.rate, self.burst)
+            now = time.monotonic()
+            if slot_id is not None or now >= deadline:
+                break
+            time.sleep(min(max(retry_after, self.poll_interval), deadline - now))
+
+        waited = now - start
+        with self.lock:
+            self.total_wait += waited
+            self.longest_wait = max(self.longest_wait, waited)
+            if slot_id is None:
+                self.timeouts += 1
+            else:
+                self.acquired += 1
+        if slot_id is None:
+            yield Slot(key, False, waited)
+            return
+
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._renew, args=(key, slot_id, stop), daemon=True)
+        heartbeat.start()
+        try:
+            yield Slot(key, True, waited)
+        finally:
+            stop.set()
+            heartbeat.join()
+            self.backend.release(key, slot_id)
+
+    def _renew(self, key: str, slot_id: str, stop: threading.Event):
+        while not stop.wait(self.heartbeat):
+            self.backend.renew(key, slot_id)
+
+    def stats(self) -> dict:
+        with self.lock:
+            requests = self.acquired + self.timeouts
+            return {
+                "acquired": self.acquired,
+                "timeouts": self.timeouts,
+                "mean_wait": round(self.total_wait / requests, 2) if requests else 0,
+                "longest_wait": round(self.longest_wait, 2),
+            }
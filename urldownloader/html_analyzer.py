@@ -0,0 +1,79 @@
+import hashlib
+
+from lxml import etree
+
+from urldownloader.redirects import parse_refresh_header
+
+READ_SIZE = 64 * 1024
+
+
+class HTMLPage:
+    """What the service looks for in the final HTML source of a page."""
+
+    __slots__ = ("title", "hrefs", "meta_refresh", "sha256")
+
+    def __init__(self) -> None:
+        self.title: str | None = None
+        # href of every <a> in document order, for the open directory detection
+        self.hrefs: list[str] = []
+        self.meta_refresh = ""
+        self.sha256 = ""
+
+
+def analyze_html(path: str) -> HTMLPage:
+    """Parse an HTML file incrementally, hashing it in the same read.
+
+    Elements are dropped from the tree once they are parsed, so the memory used does not grow with the size of the
+    page, only with the number of links found.
+
+    Returns:
+        The title, links, meta refresh target and sha256 of the page.
+    """
+    page = HTMLPage()
+    digest = hashlib.sha256()
+    parser = etree.HTMLPullParser(events=("start", "end"))
+    title_seen = False
+
+    def handle_events():
+        nonlocal title_seen
+        for event, element in parser.read_events():
+            if event == "start":
+                if element.tag == "a":
+                    href = element.get("href")
+                    if href is not None:
+                        page.hrefs.append(href)
+                elif element.tag == "meta" and not page.meta_refresh:
+                    # A meta refresh in <noscript> is only followed by browsers with JavaScript disabled
+                    in_noscript = next(element.iterancestors("noscript"), None) is not None
+                    if (element.get("http-equiv") or "").lower() == "refresh" and not in_noscript:
+                        page.meta_refresh = parse_refresh_header(element.get("content", ""))
+                continue
+
+            if element.tag == "title" and not title_seen:
+                title_seen = True
+                page.title = element.text
+            element.clear(keep_tail=True)
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+    parsing = True
+    with open(path, "rb") as f:
+        while chunk := f.read(READ_SIZE):
+            digest.update(chunk)
+            if not parsing:
+                continue
+            try:
+                parser.feed(chunk)
+                handle_events()
+            except etree.LxmlError:
+                # Keep what was found so far, the file is still hashed entirely
+                parsing = False
+    if parsing:
+        try:
+            parser.close()
+            handle_events()
+        except etree.LxmlError:
+            pass
+
+    page.sha256 = digest.hexdigest()
+    return page
@@ -0,0 +1,79 @@
+import contextlib
+import importlib.util
+import ssl
+import threading
+from typing import Iterator
+
+import httpx
+
+
+class HTTPClientPool:
+    """Long-lived httpx clients, one per proxy profile, keeping their connections open between tasks.
+
+    The clients share a single SSL context so the CA bundle is only loaded once. The cookies a client received are
+    cleared after each use so nothing leaks from one task to the next.
+    """
+
+    def __init__(
+        self,
+        proxies: dict,
+        log,
+        max_connections: int = 10,
+        max_keepalive_connections: int = 5,
+        keepalive_expiry: float = 30,
+        http2: bool = False,
+    ) -> None:
+        self.proxies = proxies
+        self.log = log
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        if http2 and importlib.util.find_spec("h2") is None:
+            self.log.warning("HTTP/2 is enabled but the h2 package is not installed, using HTTP/1.1.")
+            http2 = False
+        self.http2 = http2
+        self.ssl_context: ssl.SSLContext | None = None
+        self.clients: dict[str, httpx.Client] = {}
+        self.lock = threading.Lock()
+
+    def _proxy_transport(self, proxy: str) -> httpx.HTTPTransport:
+        return httpx.HTTPTransport(
+            proxy=f"http://{proxy}" if "://" not in proxy else proxy,
+            verify=self.ssl_context,
+            http2=self.http2,
+            limits=self.limits,
+        )
+
+    def _client(self, profile: str) -> httpx.Client:
+        with self.lock:
+            if profile not in self.clients:
+                if self.ssl_context is None:
+                    self.ssl_context = httpx.create_ssl_context()
+                proxy_mounts = {
+                    f"{scheme}://": self._proxy_transport(proxy) for scheme, proxy in self.proxies[profile].items()
+                }
+                self.clients[profile] = httpx.Client(
+                    mounts=proxy_mounts, verify=self.ssl_context, http2=self.http2, limits=self.limits
+                )
+            return self.clients[profile]
+
+    @contextlib.contextmanager
+    def client(self, profile: str) -> Iterator[httpx.Client]:
+        """Borrow the client of a proxy profile, it is created on its first use.
+
+        Yields:
+            The client of the profile, its cookies are cleared once the block ends.
+        """
+        client = self._client(profile)
+        try:
+            yield client
+        finally:
+            client.cookies.clear()
+
+    def close(self) -> None:
+        with self.lock:
+            for client in self.clients.values():
+                client.close()
+            self.clients = {}
@@ -0,0 +1,70 @@
+import hashlib
+import os
+import uuid
+
+# Kangooroo only runs for a few seconds per URL, favour a fast startup over peak JIT performance
+STARTUP_FLAGS = ["-XX:TieredStopAtLevel=1", "-XX:+UseSerialGC", "-XX:-UsePerfData", "-Xshare:auto"]
+
+
+class KangoorooJVM:
+    def __init__(
+        self,
+        kangooroo_folder: str,
+        cache_folder: str,
+        max_heap_mb: int,
+        class_data_sharing: bool = False,
+        startup_flags: bool = False,
+    ) -> None:
+        self.kangooroo_folder = kangooroo_folder
+        self.cache_folder = cache_folder
+        self.max_heap_mb = max_heap_mb
+        self.class_data_sharing = class_data_sharing
+        self.startup_flags = startup_flags
+        self._archive_path = None
+        # Archives the runs were asked to dump, each run dumps to its own file
+        self.pending_dumps: list[str] = []
+
+    @property
+    def archive_path(self) -> str:
+        """Location of the AppCDS archive matching the installed Kangooroo classpath and JVM flags."""
+        if self._archive_path is None:
+            classpath = hashlib.sha256(str(self.startup_flags).encode())
+            lib_folder = os.path.join(self.kangooroo_folder, "lib")
+            if os.path.isdir(lib_folder):
+                for entry in sorted(os.scandir(lib_folder), key=lambda e: e.name):
+                    stat = entry.stat()
+                    classpath.update(f"{entry.name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+            self._archive_path = os.path.join(self.cache_folder, f"kangooroo-{classpath.hexdigest()[:16]}.jsa")
+        return self._archive_path
+
+    def java_opts(self) -> str:
+        opts = [f"-Xmx{self.max_heap_mb}m"]
+        if self.startup_flags:
+            opts.extend(STARTUP_FLAGS)
+        if self.class_data_sharing:
+            if os.path.exists(self.archive_path):
+                opts.append(f"-XX:SharedArchiveFile={self.archive_path}")
+            else:
+                # The first runs dump the classes they loaded, one of the archives is moved in place by
+                # commit_archive(). Pool workers run at the same time, they must not write to the same file.
+                os.makedirs(self.cache_folder, exist_ok=True)
+                dumped_archive = f"{self.archive_path}.{uuid.uuid4().hex}.tmp"
+                self.pending_dumps.append(dumped_archive)
+                opts.append(f"-XX:ArchiveClassesAtExit={dumped_archive}")
+        return " ".join(opts)
+
+    def commit_archive(self, completed: bool = True):
+        """Move an archive dumped by the runs in place, unless the run was killed while dumping it.
+
+        Archives that were not dumped yet, by workers still running, are kept for a later call.
+        """
+        if not self.class_data_sharing:
+            return
+        for dumped_archive in list(self.pending_dumps):
+            if not os.path.exists(dumped_archive):
+                continue
+            self.pending_dumps.remove(dumped_archive)
+            if completed and not os.path.exists(self.archive_path) and os.path.getsize(dumped_archive) > 0:
+                os.replace(dumped_archive, self.archive_path)
+            else:
+                os.remove(dumped_archive)
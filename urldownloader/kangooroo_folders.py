@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+
+
+class KangoorooFolders:
+    """Temporary and output folders of a Kangooroo run, placed on a RAM backed mount when it has enough room.
+
+    Chrome creates its profile in TMPDIR, pointing it to the temporary folder keeps the many small writes done
+    while the browser starts off the disk. Files are only moved to the working directory when the service needs
+    them to be part of the result.
+
+    The mount is only used when it has min_free_mb available as the run starts. The run itself is not capped, the
+    size of the mount is what bounds it.
+    """
+
+    def __init__(self, working_directory: str, ram_config: dict, log) -> None:
+        self.working_directory = working_directory
+        self.root = working_directory
+        self.in_ram = False
+
+        if ram_config.get("enabled", False):
+            ram_path = ram_config.get("path", "/dev/shm")
+            min_free = ram_config.get("min_free_mb", 256) * 1024 * 1024
+            try:
+                os.makedirs(ram_path, exist_ok=True)
+                free = shutil.disk_usage(ram_path).free
+                if free >= min_free:
+                    self.root = tempfile.mkdtemp(dir=ram_path)
+                    self.in_ram = True
+                else:
+                    log.warning(
+                        f"Only {free // 1024 // 1024}MB available in {ram_path}, "
+                        f"{min_free // 1024 // 1024}MB required. Using the working directory instead."
+                    )
+            except OSError as e:
+                log.warning(f"Unable to use {ram_path} for the Kangooroo folders: {e}")
+
+        self.temporary_folder = os.path.join(self.root, "tmp")
+        os.makedirs(self.temporary_folder, exist_ok=True)
+        self.output_folder = os.path.join(self.root, "output")
+        os.makedirs(self.output_folder, exist_ok=True)
+
+    def env(self) -> dict:
+        if not self.in_ram:
+            return {}
+        return {"TMPDIR": self.temporary_folder}
+
+    def retrieve(self, path: str) -> str:
+        """Move a file produced by Kangooroo to the working directory so it can be added to the result.
+
+        Returns:
+            The path of the file in the working directory, the given path if it was not in the RAM folder.
+        """
+        if not self.in_ram or not path.startswith(self.root) or not os.path.exists(path):
+            return path
+        destination = os.path.join(self.working_directory, os.path.relpath(path, self.root))
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.move(path, destination)
+        return destination
+
+    def cleanup(self):
+        if self.in_ram:
+            shutil.rmtree(self.root, ignore_errors=True)
@@ -0,0 +1,194 @@
+import json
+import os
+import queue
+import selectors
+import signal
+import subprocess
+import time
+from typing import Callable
+
+# Kangooroo workers speak a line based JSON protocol over their stdin/stdout:
+#   -> {"args": ["--conf-file", "...", "--url", "..."], "env": {"TMPDIR": "..."}}
+#   <- {"status": "done"} or {"status": "error", "message": "..."}
+# Any other line written on stdout (Kangooroo's own logging) is ignored. The env of a request is set for the browser
+# started for that URL only, the folders it points to change with every task.
+WORKER_READ_SIZE = 65536
+
+
+class KangoorooWorkerError(Exception):
+    pass
+
+
+class KangoorooWorker:
+    def __init__(self, command: list[str], cwd: str, env: dict, log):
+        self.log = log
+        self.urls_processed = 0
+        self.process = subprocess.Popen(
+            command, cwd=cwd, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, start_new_session=True
+        )
+        self._buffer = b""
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def describe_exit(self) -> str:
+        returncode = self.process.poll()
+        if returncode in (-signal.SIGKILL, 128 + signal.SIGKILL):
+            return f"Kangooroo worker {self.process.pid} was killed, it may have been OOMKilled."
+        return f"Kangooroo worker {self.process.pid} exited with return code {returncode}."
+
+    def _read_line(self, deadline: float, timeout: float) -> bytes:
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.process.stdout, selectors.EVENT_READ)
+            while b"\n" not in self._buffer:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not selector.select(remaining):
+                    raise subprocess.TimeoutExpired(self.process.args, timeout)
+                chunk = os.read(self.process.stdout.fileno(), WORKER_READ_SIZE)
+                if not chunk:
+                    try:
+                        self.process.wait(5)
+                    except subprocess.TimeoutExpired:
+                        raise KangoorooWorkerError(f"Kangooroo worker {self.process.pid} closed its output.")
+                    raise KangoorooWorkerError(self.describe_exit())
+                self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return line
+
+    def run(self, args: list[str], timeout: float, env: dict | None = None) -> dict:
+        try:
+            self.process.stdin.write(json.dumps({"args": args, "env": env or {}}).encode() + b"\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            self.process.wait(5)
+            raise KangoorooWorkerError(self.describe_exit())
+
+        deadline = time.monotonic() + timeout
+        while True:
+            line = self._read_line(deadline, timeout)
+            try:
+                reply = json.loads(line)
+            except ValueError:
+                # Kangooroo logging
+                continue
+            if isinstance(reply, dict) and "status" in reply:
+                self.urls_processed += 1
+                return reply
+
+    def close(self):
+        if self.process.stdin:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+        try:
+            self.process.wait(5)
+        except subprocess.TimeoutExpired:
+            self.kill()
+
+    def kill(self):
+        try:
+            # The worker runs in its own session, take chrome and chromedriver down with it
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self.process.wait()
+
+
+class KangoorooPool:
+    def __init__(
+        self,
+        command: list[str],
+        cwd: str,
+        env: Callable[[], dict],
+        log,
+        size: int = 1,
+        max_urls_per_worker: int = 50,
+    ) -> None:
+        self.command = command
+        self.cwd = cwd
+        # Called for each worker started, the JVM options change from one launch to the next
+        self.env = env
+        self.log = log
+        self.size = max(size, 1)
+        self.max_urls_per_worker = max_urls_per_worker
+        self.idle_workers: queue.Queue[KangoorooWorker] = queue.Queue()
+
+    def _spawn(self) -> KangoorooWorker | None:
+        try:
+            worker = KangoorooWorker(self.command, self.cwd, self.env(), self.log)
+        except OSError as e:
+            self.log.warning(f"Unable to start Kangooroo worker: {e}")
+            return None
+        self.log.debug(f"Started Kangooroo worker {worker.process.pid}")
+        return worker
+
+    def start(self):
+        for _ in range(self.size):
+            if worker := self._spawn():
+                self.idle_workers.put(worker)
+
+    def stop(self):
+        while True:
+            try:
+                self.idle_workers.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def _replace(self):
+        # The replacement warms up in the background until the next task needs it
+        if worker := self._spawn():
+            self.idle_workers.put(worker)
+
+    def _release(self, worker: KangoorooWorker):
+        if worker.urls_processed < self.max_urls_per_worker:
+            self.idle_workers.put(worker)
+            return
+
+        self.log.debug(f"Recycling Kangooroo worker {worker.process.pid} after {worker.urls_processed} URLs")
+        worker.close()
+        self._replace()
+
+    def run(self, args: list[str], timeout: float, env: dict | None = None) -> bool:
+        """Send a URL to an idle worker.
+
+        Args:
+            args: The Kangooroo arguments, without the executable.
+            timeout: Seconds to wait for the worker to finish with the URL.
+            env: Environment variables of the browser started for the URL, such as the TMPDIR of the task.
+
+        Returns:
+            True if a worker processed the URL, False if the caller should fall back to a one-shot Kangooroo run.
+
+        Raises:
+            subprocess.TimeoutExpired: The worker did not answer in time, it has been killed and replaced.
+        """
+        try:
+            worker = self.idle_workers.get_nowait()
+        except queue.Empty:
+            worker = self._spawn()
+            if worker is None:
+                return False
+
+        if not worker.is_alive():
+            self.log.warning(worker.describe_exit())
+            self._replace()
+            return False
+
+        try:
+            reply = worker.run(args, timeout, env)
+        except subprocess.TimeoutExpired:
+            worker.kill()
+            self._replace()
+            raise
+        except KangoorooWorkerError as e:
+            self.log.warning(f"Kangooroo worker failed, falling back to a one-shot run: {e}")
+            worker.kill()
+            self._replace()
+            return False
+
+        self._release(worker)
+        if reply["status"] != "done":
+            self.log.warning(f"Kangooroo worker reported an error: {reply.get('message', 'Unknown error')}")
+            return False
+        return True
@@ -0,0 +1,140 @@
+import codecs
+import re
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from html.parser import HTMLParser
+from typing import IO
+
+READ_SIZE = 64 * 1024
+
+# Apache "2024-11-09 13:34", nginx "27-Nov-2024 10:00" and WsgiDAV "Wed, 13 Nov 2024 09:28:16 GMT" columns
+DATE_FORMATS = [
+    (re.compile(r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(?::\d{2})?"), ["%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S"]),
+    (re.compile(r"\d{1,2}-[A-Za-z]{3}-\d{4} \d{2}:\d{2}(?::\d{2})?"), ["%d-%b-%Y %H:%M", "%d-%b-%Y %H:%M:%S"]),
+    (re.compile(r"[A-Za-z]{3}, \d{1,2} [A-Za-z]{3} \d{4} \d{2}:\d{2}:\d{2} GMT"), None),
+]
+# "1234567", "1.2M", "4.0 KiB" or "51,579,928 Bytes", a "-" is used for the folders
+SIZE_REGEX = re.compile(r"(?<![\w.,])(\d[\d,]*(?:\.\d+)?) ?([KMGT]?)(?:i?B|Bytes?)?(?!\w)", re.IGNORECASE)
+SIZE_UNITS = "KMGT"
+
+
+class ListingEntry:
+    __slots__ = ("href", "size", "last_modified", "timestamp")
+
+    def __init__(self, href: str, size: int | None, last_modified: str | None, timestamp: float | None) -> None:
+        self.href = href
+        self.size = size
+        self.last_modified = last_modified
+        self.timestamp = timestamp
+
+    @property
+    def is_folder(self) -> bool:
+        return self.href.split("?", 1)[0].endswith("/")
+
+
+def parse_date(text: str) -> tuple[str, float] | None:
+    """Find the last modification date in the columns following a link.
+
+    Returns:
+        The date as written in the listing and its timestamp, None if no known format is found.
+    """
+    for regex, formats in DATE_FORMATS:
+        match = regex.search(text)
+        if not match:
+            continue
+        value = match.group(0)
+        if formats is None:
+            try:
+                return value, parsedate_to_datetime(value).timestamp()
+            except (TypeError, ValueError):
+                continue
+        for date_format in formats:
+            try:
+                return value, datetime.strptime(value.replace("T", " "), date_format).timestamp()
+            except ValueError:
+                pass
+    return None
+
+
+def parse_size(text: str) -> int | None:
+    """Find the size in the columns following a link, once the date was removed from them.
+
+    Returns:
+        The size in bytes, None if no size is found.
+    """
+    match = SIZE_REGEX.search(text)
+    if not match:
+        return None
+    size = float(match.group(1).replace(",", ""))
+    if match.group(2):
+        size *= 1024 ** (SIZE_UNITS.index(match.group(2).upper()) + 1)
+    return int(size)
+
+
+class ListingParser(HTMLParser):
+    """Collect the links of a directory listing with the text of the columns that follow each of them.
+
+    The columns of a link end at the next link or at the end of its row, which covers the table, list and
+    preformatted listings of the common web servers.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.entries: list[ListingEntry] = []
+        self._href = None
+        self._in_anchor = False
+        self._columns = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            self._close_entry()
+            self._href = dict(attrs).get("href") or None
+            self._in_anchor = self._href is not None
+        elif tag in ("tr", "li"):
+            self._close_entry()
+
+    def handle_endtag(self, tag):
+        if tag == "a":
+            self._in_anchor = False
+        elif tag in ("tr", "li", "pre", "table", "ul"):
+            self._close_entry()
+
+    def handle_data(self, data):
+        if self._href is not None and not self._in_anchor:
+            self._columns.append(data)
+
+    def close(self):
+        super().close()
+        self._close_entry()
+
+    def _close_entry(self) -> None:
+        if self._href is None:
+            return
+        columns = " ".join(" ".join(self._columns).split())
+        last_modified = timestamp = None
+        if date := parse_date(columns):
+            last_modified, timestamp = date
+            columns = columns.replace(last_modified, " ")
+        self.entries.append(ListingEntry(self._href.strip(), parse_size(columns), last_modified, timestamp))
+        self._href = None
+        self._in_anchor = False
+        self._columns = []
+
+
+def parse_listing(source: str | IO[bytes]) -> list[ListingEntry]:
+    """Read a directory listing in chunks.
+
+    Returns:
+        Every link of the page, with the size and last modification date found next to it.
+    """
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return parse_listing(f)
+
+    parser = ListingParser()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while chunk := source.read(READ_SIZE):
+        parser.feed(decoder.decode(chunk))
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    return parser.entries
@@ -0,0 +1,205 @@
+import asyncio
+import codecs
+import heapq
+import itertools
+import os
+import tempfile
+from urllib.parse import urldefrag, urljoin, urlparse
+
+import httpx
+
+from urldownloader.hashing import ContentHasher
+from urldownloader.open_directory import ListingEntry, ListingParser
+
+
+class CrawledEntry:
+    __slots__ = ("url", "entry", "depth", "fetched")
+
+    def __init__(self, url: str, entry: ListingEntry, depth: int) -> None:
+        self.url = url
+        self.entry = entry
+        self.depth = depth
+        # Hashes and path of the file once it was downloaded
+        self.fetched: dict | None = None
+
+
+class OpenDirectoryCrawl:
+    def __init__(self) -> None:
+        self.entries: list[CrawledEntry] = []
+        # URL to the reason it could not be listed or downloaded
+        self.errors: dict[str, str] = {}
+        self.bytes_read = 0
+        self.entries_truncated = False
+        self.depth_truncated = False
+        self.bytes_truncated = False
+        self.timed_out = False
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class OpenDirectoryCrawler:
+    """Follow the folders of an open directory with plain HTTP requests.
+
+    The most recent entries of the shallowest folders are requested first. Only the entries below the crawled
+    folder are followed, which leaves out the parent folders, the sorting links and the other websites.
+    """
+
+    def __init__(
+        self,
+        proxies: dict | None = None,
+        headers: dict | None = None,
+        max_depth: int = 2,
+        max_entries: int = 500,
+        max_bytes: int = 50 * 1024 * 1024,
+        max_per_host: int = 2,
+        fetch_max_size: int = 0,
+        fetch_folder: str | None = None,
+        time_budget: float = 60,
+        request_timeout: float = 10,
+    ) -> None:
+        self.proxies = proxies or {}
+        self.headers = headers or {}
+        self.max_depth = max_depth
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_per_host = max_per_host
+        # Files of at most this many bytes are downloaded in fetch_folder, 0 to only list them
+        self.fetch_max_size = fetch_max_size if fetch_folder else 0
+        self.fetch_folder = fetch_folder
+        self.time_budget = time_budget
+        self.request_timeout = request_timeout
+
+    def crawl(self, url: str, entries: list[ListingEntry]) -> OpenDirectoryCrawl:
+        """Crawl the folders and files found in the already parsed listing of url.
+
+        Returns:
+            Every entry found below url, with the files that were downloaded.
+        """
+        return asyncio.run(self._crawl(url, entries))
+
+    async def _crawl(self, root: str, entries: list[ListingEntry]) -> OpenDirectoryCrawl:
+        crawl = OpenDirectoryCrawl()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.time_budget
+        counter = itertools.count()
+        queue: list[tuple[int, float, int, CrawledEntry]] = []
+        seen = {root}
+        in_flight: dict[str, int] = {}
+        pending: dict[asyncio.Task, CrawledEntry] = {}
+        proxy_mounts = {
+            f"{scheme}://": httpx.AsyncHTTPTransport(proxy=f"http://{proxy}" if "://" not in proxy else proxy)
+            for scheme, proxy in self.proxies.items()
+        }
+
+        def add_listing(folder: str, depth: int, listing: list[ListingEntry]) -> None:
+            for entry in listing:
+                url = urldefrag(urljoin(folder, entry.href))[0]
+                if url in seen or not url.startswith(folder) or urlparse(url).query:
+                    continue
+                if len(crawl.entries) >= self.max_entries:
+                    crawl.entries_truncated = True
+                    return
+                seen.add(url)
+                crawled = CrawledEntry(url, entry, depth + 1)
+                crawl.entries.append(crawled)
+                if entry.is_folder and depth + 1 > self.max_depth:
+                    crawl.depth_truncated = True
+                elif entry.is_folder or 0 < (entry.size or 0) <= self.fetch_max_size:
+                    heapq.heappush(queue, (depth, -(entry.timestamp or 0), next(counter), crawled))
+                elif entry.size is None and self.fetch_max_size:
+                    # Unknown sizes are downloaded last, up to the size limit
+                    heapq.heappush(queue, (depth, float("inf"), next(counter), crawled))
+
+        def schedule() -> None:
+            deferred = []
+            while queue:
+                item = heapq.heappop(queue)
+                host = urlparse(item[3].url).netloc
+                if in_flight.get(host, 0) >= self.max_per_host:
+                    deferred.append(item)
+                    continue
+                in_flight[host] = in_flight.get(host, 0) + 1
+                crawled = item[3]
+                fetch = self._list if crawled.entry.is_folder else self._fetch
+                pending[asyncio.create_task(fetch(client, crawl, crawled.url))] = crawled
+            for item in deferred:
+                heapq.heappush(queue, item)
+
+        async with httpx.AsyncClient(mounts=proxy_mounts, headers=self.headers, timeout=self.request_timeout) as client:
+            add_listing(root, 0, entries)
+            schedule()
+            while pending:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    crawled = pending.pop(task)
+                    in_flight[urlparse(crawled.url).netloc] -= 1
+                    try:
+                        result = task.result()
+                    except BudgetExceeded:
+                        crawl.bytes_truncated = True
+                        continue
+                    except (httpx.HTTPError, ValueError) as e:
+                        crawl.errors[crawled.url] = str(e) or type(e).__name__
+                        continue
+                    if crawled.entry.is_folder:
+                        add_listing(crawled.url, crawled.depth, result)
+                    else:
+                        crawled.fetched = result
+                if crawl.bytes_truncated:
+                    queue.clear()
+                schedule()
+
+            if pending:
+                crawl.timed_out = True
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        return crawl
+
+    async def _read(self, response: httpx.Response, crawl: OpenDirectoryCrawl, max_size: int = 0):
+        size = 0
+        async for chunk in response.aiter_bytes():
+            if crawl.bytes_read + len(chunk) > self.max_bytes:
+                raise BudgetExceeded()
+            crawl.bytes_read += len(chunk)
+            size += len(chunk)
+            if max_size and size > max_size:
+                raise ValueError(f"Larger than {max_size} bytes")
+            yield chunk
+
+    async def _list(self, client: httpx.AsyncClient, crawl: OpenDirectoryCrawl, url: str) -> list[ListingEntry]:
+        parser = ListingParser()
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        async with client.stream("GET", url) as response:
+            if response.status_code != 200:
+                raise ValueError(f"HTTP {response.status_code}")
+            async for chunk in self._read(response, crawl):
+                parser.feed(decoder.decode(chunk))
+        parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+        return parser.entries
+
+    async def _fetch(self, client: httpx.AsyncClient, crawl: OpenDirectoryCrawl, url: str) -> dict:
+        os.makedirs(self.fetch_folder, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.fetch_folder)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                hasher = ContentHasher(f)
+                async with client.stream("GET", url) as response:
+                    if response.status_code != 200:
+                        raise ValueError(f"HTTP {response.status_code}")
+                    async for chunk in self._read(response, crawl, self.fetch_max_size):
+                        hasher.write(chunk)
+            hashes = hasher.hashes()
+            path = os.path.join(self.fetch_folder, hashes["sha256"])
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return {**hashes, "path": path}
@@ -0,0 +1,114 @@
+import asyncio
+import socket
+import threading
+import time
+
+
+class PreflightResult:
+    __slots__ = ("host", "port", "error", "expires")
+
+    def __init__(self, host: str, port: int, error: str | None, expires: float) -> None:
+        self.host = host
+        self.port = port
+        # Why the host cannot be reached, None if it can be or if the checks were not conclusive
+        self.error = error
+        self.expires = expires
+
+    @property
+    def reachable(self) -> bool:
+        return self.error is None
+
+
+class Preflight:
+    """Resolve a host and open a TCP connection to it before starting a fetch.
+
+    Hosts that do not resolve, or whose every address refuses the connection, are known to be unreachable without
+    starting the browser. Results are cached for the process, reachable hosts for positive_ttl seconds and unreachable
+    ones for negative_ttl seconds. Timeouts are not conclusive, a fetch with longer timeouts could still succeed, so
+    they are neither cached nor reported as failures.
+    """
+
+    def __init__(
+        self,
+        log,
+        positive_ttl: float = 300,
+        negative_ttl: float = 60,
+        resolve_timeout: float = 3,
+        connect_timeout: float = 3,
+        max_entries: int = 10000,
+    ) -> None:
+        self.log = log
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.resolve_timeout = resolve_timeout
+        self.connect_timeout = connect_timeout
+        self.max_entries = max_entries
+        self.results: dict[tuple[str, int], PreflightResult] = {}
+        self.lock = threading.Lock()
+        self.checks = 0
+        self.cache_hits = 0
+        self.failures = 0
+
+    def check(self, host: str, port: int) -> PreflightResult:
+        """Tell if a TCP connection can be opened to host.
+
+        Returns:
+            The cached result if it did not expire, the result of a new check otherwise.
+        """
+        now = time.time()
+        with self.lock:
+            result = self.results.get((host, port))
+            if result is not None and result.expires > now:
+                self.cache_hits += 1
+                if not result.reachable:
+                    self.failures += 1
+                return result
+
+        error, conclusive = asyncio.run(self._check(host, port))
+        result = PreflightResult(host, port, error, now + (self.negative_ttl if error else self.positive_ttl))
+        with self.lock:
+            self.checks += 1
+            if error:
+                self.failures += 1
+            if conclusive:
+                if len(self.results) >= self.max_entries:
+                    self.results = {key: value for key, value in self.results.items() if value.expires > now}
+                    if len(self.results) >= self.max_entries:
+                        del self.results[next(iter(self.results))]
+                self.results[(host, port)] = result
+        return result
+
+    async def _check(self, host: str, port: int) -> tuple[str | None, bool]:
+        loop = asyncio.get_running_loop()
+        try:
+            addresses = await asyncio.wait_for(
+                loop.getaddrinfo(host, port, type=socket.SOCK_STREAM), self.resolve_timeout
+            )
+        except socket.gaierror as e:
+            if e.errno in (socket.EAI_NONAME, getattr(socket, "EAI_NODATA", socket.EAI_NONAME)):
+                return f"Unable to resolve host: {host}", True
+            # Temporary failure of the resolver
+            self.log.debug(f"Pre-flight of {host} was not conclusive: {e}")
+            return None, False
+        except (asyncio.TimeoutError, UnicodeError, ValueError):
+            return None, False
+
+        errors = []
+        for sockaddr in dict.fromkeys(address[4][:2] for address in addresses):
+            try:
+                _, writer = await asyncio.wait_for(
+                    asyncio.open_connection(sockaddr[0], sockaddr[1]), self.connect_timeout
+                )
+            except asyncio.TimeoutError:
+                return None, False
+            except OSError as e:
+                # The other addresses can still be reachable, an IPv6 address on a node without IPv6 for example
+                errors.append(f"{sockaddr[0]}: {e.strerror or e}")
+                continue
+            writer.close()
+            await writer.wait_closed()
+            return None, True
+        return f"Unable to connect to {host} on port {port} ({', '.join(errors)})", True
+
+    def stats(self) -> dict:
+        return {"checks": self.checks, "cache_hits": self.cache_hits, "failures": self.failures}
@@ -0,0 +1,180 @@
+import socket
+import threading
+import time
+from urllib.parse import ParseResult, urlparse
+
+# Weight of the last check in the latency of an upstream
+LATENCY_WEIGHT = 0.3
+
+
+def parse_proxy(proxy: str) -> ParseResult:
+    """Parse a proxy address, written with or without a scheme.
+
+    Returns:
+        The parsed address.
+    """
+    url_proxy = urlparse(proxy)
+    if not url_proxy.netloc:
+        # If the proxy was written as
+        # "127.0.0.1:8080"
+        # "user@127.0.0.1:8080"
+        # "user:password@127.0.0.1:8080"
+        url_proxy = urlparse(f"http://{proxy}")
+    return url_proxy
+
+
+class Upstream:
+    __slots__ = ("name", "address", "alive", "latency", "attempts", "errors", "consecutive_errors", "last_error")
+
+    def __init__(self, name: str, address: tuple[str, int]) -> None:
+        self.name = name
+        self.address = address
+        self.alive = True
+        # Seconds to open a connection, averaged over the checks, None until a check succeeded
+        self.latency: float | None = None
+        self.attempts = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.last_error: str | None = None
+
+    def sort_key(self) -> tuple:
+        return (not self.alive, self.latency is None, self.latency or 0, self.consecutive_errors)
+
+    def error_rate(self) -> float:
+        return self.errors / self.attempts if self.attempts else 0
+
+
+class ProxyPool:
+    """Proxy profiles listing several upstreams, the best live upstream is used first.
+
+    A profile of the proxies config is either a single proxy, a string or a dict of proxies by scheme, or a list of
+    those. Each upstream of a list gets its own endpoint, named after the profile and its position, and a background
+    thread measures how long it takes to open a connection to it. Upstreams failing max_errors times in a row, in a
+    check or in a fetch, are considered down until a check succeeds again.
+    """
+
+    def __init__(
+        self,
+        proxies: dict,
+        log,
+        check_interval: float = 30,
+        check_timeout: float = 3,
+        max_errors: int = 2,
+    ) -> None:
+        self.log = log
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self.max_errors = max_errors
+        # Proxies of every endpoint, by scheme for the upstreams of the pools
+        self.endpoints: dict = {}
+        self.pools: dict[str, list[Upstream]] = {}
+        self.upstreams: dict[str, Upstream] = {}
+        for profile, proxy in proxies.items():
+            if not isinstance(proxy, list):
+                # Proxies are used by scheme, a single string is the proxy of both schemes
+                if proxy and isinstance(proxy, str):
+                    proxy = {"http": proxy, "https": proxy}
+                self.endpoints[profile] = proxy
+                continue
+            self.pools[profile] = []
+            for index, upstream_proxy in enumerate(proxy):
+                name = f"{profile}#{index}"
+                if isinstance(upstream_proxy, str):
+                    upstream_proxy = {"http": upstream_proxy, "https": upstream_proxy}
+                self.endpoints[name] = upstream_proxy
+                url_proxy = parse_proxy(next(iter(upstream_proxy.values())))
+                upstream = Upstream(name, (url_proxy.hostname, url_proxy.port or 80))
+                self.pools[profile].append(upstream)
+                self.upstreams[name] = upstream
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread: threading.Thread | None = None
+
+    def select(self, profile: str) -> list[str]:
+        """Order the endpoints of a profile, the live upstreams with the lowest latency first.
+
+        Returns:
+            The endpoints to try in order, the profile itself if it has a single proxy.
+        """
+        if profile not in self.pools:
+            return [profile]
+        with self.lock:
+            return [upstream.name for upstream in sorted(self.pools[profile], key=Upstream.sort_key)]
+
+    def _record(self, upstream: Upstream, latency: float | None, error: str | None):
+        with self.lock:
+            upstream.attempts += 1
+            if error is None:
+                if upstream.latency is None:
+                    upstream.latency = latency
+                else:
+                    upstream.latency = LATENCY_WEIGHT * latency + (1 - LATENCY_WEIGHT) * upstream.latency
+                upstream.consecutive_errors = 0
+                upstream.alive = True
+                return
+            upstream.errors += 1
+            upstream.consecutive_errors += 1
+            upstream.last_error = error
+            if upstream.alive and upstream.consecutive_errors >= self.max_errors:
+                upstream.alive = False
+                self.log.warning(f"Upstream proxy {upstream.name} is down: {error}")
+
+    def report_error(self, name: str, error: str):
+        """Count an error of the upstream used by a fetch."""
+        if name in self.upstreams:
+            self._record(self.upstreams[name], None, error)
+
+    def check(self, upstream: Upstream):
+        start = time.monotonic()
+        try:
+            with socket.create_connection(upstream.address, timeout=self.check_timeout):
+                pass
+        except OSError as e:
+            self._record(upstream, None, str(e) or e.__class__.__name__)
+            return
+        self._record(upstream, time.monotonic() - start, None)
+
+    def check_all(self):
+        for upstream in list(self.upstreams.values()):
+            if self.stopping.is_set():
+                return
+            self.check(upstream)
+
+    def _run(self):
+        while not self.stopping.is_set():
+            self.check_all()
+            self.stopping.wait(self.check_interval)
+
+    def start(self):
+        if self.upstreams and self.thread is None:
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self._run, name="proxy-health", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def health(self, profile: str) -> list[dict]:
+        """Health of the upstreams of a profile.
+
+        Returns:
+            One row per upstream, in the order of the profile.
+        """
+        with self.lock:
+            return [
+                {
+                    "upstream": upstream.name,
+                    "address": f"{upstream.address[0]}:{upstream.address[1]}",
+                    "alive": upstream.alive,
+                    "latency_ms": None if upstream.latency is None else round(upstream.latency * 1000, 1),
+                    "error_rate": round(upstream.error_rate(), 3),
+                    "last_error": upstream.last_error,
+                }
+                for upstream in self.pools.get(profile, [])
+            ]
+
+    def stats(self) -> dict:
+        return {profile: self.health(profile) for profile in self.pools}
@@ -0,0 +1,93 @@
+import re
+from urllib.parse import urljoin
+
+from urldownloader.har import HAREntry
+
+REDIRECT_STATUSES = frozenset([301, 302, 303, 307, 308])
+# Refresh: <delay>; url=<target>, the same syntax is used by <meta http-equiv="refresh">. Browsers also follow the
+# target without the url= prefix.
+REFRESH_REGEX = re.compile(r"\s*(\d+)(?:\.\d*)?\s*[;,]\s*(?:url\s*=\s*)?(['\"]?)(.*?)\2\s*$", re.IGNORECASE | re.DOTALL)
+# Longer delays are not considered as redirections
+MAX_REFRESH_DELAY = 15
+
+
+def parse_refresh_header(header_value: str) -> str:
+    # Refresh Header: https://developer.mozilla.org/en-US/docs/Web/HTTP/Reference/Headers/Refresh
+    match = REFRESH_REGEX.match(header_value or "")
+    if match and int(match.group(1)) <= MAX_REFRESH_DELAY:
+        return match.group(3)
+    return ""
+
+
+class Redirect:
+    __slots__ = ("status", "url", "ip", "target", "resolved")
+
+    def __init__(self, status: int | str, url: str, ip: str | None, target: str) -> None:
+        self.status = status
+        self.url = url
+        self.ip = ip
+        # Target as found in the response, and resolved against the redirecting URL
+        self.target = target
+        self.resolved = urljoin(url, target) if target else ""
+
+    def row(self) -> dict:
+        return {
+            "status": self.status,
+            "redirecting_url": self.url,
+            "redirecting_ip": self.ip if self.ip is not None else "Not Available",
+            "redirecting_to": self.target if self.target else "Not Available",
+        }
+
+
+class RedirectGraph:
+    """Redirections of a session, from the HTTP status, the Refresh header and the meta refresh of the page.
+
+    Redirections are kept in the order they were found and indexed by redirecting URL, so that a chain can be
+    followed from any URL in linear time, stopping on loops.
+    """
+
+    def __init__(self) -> None:
+        self.redirects: list[Redirect] = []
+        # Redirecting URL -> first redirection found from it
+        self.by_url: dict[str, Redirect] = {}
+
+    def _add(self, status: int | str, url: str, ip: str | None, target: str):
+        redirect = Redirect(status, url, ip, target)
+        self.redirects.append(redirect)
+        self.by_url.setdefault(url, redirect)
+
+    def add_entry(self, entry: HAREntry):
+        refresh = ""
+        if "Refresh" in entry.response_headers:
+            refresh = parse_refresh_header(entry.response_headers.get("Refresh"))
+
+        if entry.status in REDIRECT_STATUSES:
+            target = entry.redirect_url or entry.response_headers.get("Location", "") or refresh
+            self._add(entry.status, entry.url, entry.server_ip, target)
+
+        # Some redirects and hidden in the headers with 200 response codes
+        if refresh:
+            self._add(entry.status, entry.url, entry.server_ip, refresh)
+
+    def add_meta_refresh(self, url: str, target: str):
+        self._add("meta refresh", url, None, target)
+
+    def chain(self, url: str) -> list[Redirect]:
+        chain = []
+        visited = set()
+        while url in self.by_url and url not in visited:
+            visited.add(url)
+            redirect = self.by_url[url]
+            chain.append(redirect)
+            url = redirect.resolved
+        return chain
+
+    def ordered(self, requested_url: str) -> list[Redirect]:
+        """Order the redirections, those of the chain starting at the requested URL first.
+
+        Returns:
+            The chain of the requested URL, followed by the other redirections in the order they were found.
+        """
+        chain = self.chain(requested_url)
+        in_chain = {id(redirect) for redirect in chain}
+        return chain + [redirect for redirect in self.redirects if id(redirect) not in in_chain]
@@ -0,0 +1,182 @@
+import abc
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from urldownloader.urls import normalize_url
+
+# Files of the Kangooroo output folder needed to rebuild a result
+CACHED_FILES = ["results.json", "session.har", "screenshot.png", "favicon.ico", "source.html"]
+
+
+class ResultCacheBackend(abc.ABC):
+    """Storage of the cached Kangooroo outputs, a shared backend implements the same methods."""
+
+    @abc.abstractmethod
+    def get(self, key: str, destination: str) -> float | None:
+        """Copy the files cached under key in the destination folder.
+
+        Returns:
+            When the files were cached, None if nothing is cached under key.
+        """
+
+    @abc.abstractmethod
+    def put(self, key: str, source: str, names: list[str]):
+        """Cache the named files of the source folder under key, replacing what was cached before."""
+
+    @abc.abstractmethod
+    def delete(self, key: str):
+        """Drop the files cached under key."""
+
+
+class LocalResultCacheBackend(ResultCacheBackend):
+    """Cached outputs kept in a folder, one sub-folder per key, shared by the service instances mounting it.
+
+    The least recently used outputs are removed once the folder holds more than max_size bytes. The folder is
+    scanned when the backend is created so the outputs cached by previous runs are used.
+    """
+
+    def __init__(self, folder: str, log, max_size: int = 1024 * 1024 * 1024) -> None:
+        self.folder = folder
+        self.log = log
+        self.max_size = max_size
+        # key -> size of the cached files, least recently used first
+        self.entries: OrderedDict[str, int] = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self._scan()
+
+    def _scan(self):
+        os.makedirs(self.folder, exist_ok=True)
+        found = []
+        for key in os.listdir(self.folder):
+            folder = os.path.join(self.folder, key)
+            if key.startswith("."):
+                # Folder of a put, left over if it is older than an hour
+                if time.time() - os.path.getmtime(folder) > 3600:
+                    shutil.rmtree(folder, ignore_errors=True)
+                continue
+            try:
+                stored_at, size, _ = self._read_meta(key)
+                found.append((stored_at, size, key))
+            except (OSError, ValueError, KeyError):
+                shutil.rmtree(folder, ignore_errors=True)
+        for _, size, key in sorted(found):
+            self.entries[key] = size
+            self.size += size
+
+    def _read_meta(self, key: str) -> tuple[float, int, list[str]]:
+        with open(os.path.join(self.folder, key, "meta.json"), "r") as f:
+            meta = json.load(f)
+        return meta["stored_at"], meta["size"], meta["names"]
+
+    def get(self, key: str, destination: str) -> float | None:
+        folder = os.path.join(self.folder, key)
+        try:
+            # The output could have been cached by another instance of the service on the node
+            stored_at, size, names = self._read_meta(key)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            self.log.warning(f"Unable to read the cached result {key}: {e}")
+            self.delete(key)
+            return None
+        with self.lock:
+            if key not in self.entries:
+                self.size += size
+            self.entries[key] = size
+            self.entries.move_to_end(key)
+        try:
+            os.makedirs(destination, exist_ok=True)
+            for name in names:
+                shutil.copyfile(os.path.join(folder, name), os.path.join(destination, name))
+        except OSError as e:
+            self.log.warning(f"Unable to read the cached result {key}: {e}")
+            self.delete(key)
+            return None
+        return stored_at
+
+    def put(self, key: str, source: str, names: list[str]):
+        temp_folder = tempfile.mkdtemp(dir=self.folder, prefix=".")
+        try:
+            size = 0
+            for name in names:
+                shutil.copyfile(os.path.join(source, name), os.path.join(temp_folder, name))
+                size += os.path.getsize(os.path.join(temp_folder, name))
+            if size > self.max_size:
+                shutil.rmtree(temp_folder, ignore_errors=True)
+                return
+            with open(os.path.join(temp_folder, "meta.json"), "w") as f:
+                json.dump({"stored_at": time.time(), "size": size, "names": names}, f)
+            self.delete(key)
+            os.rename(temp_folder, os.path.join(self.folder, key))
+        except OSError as e:
+            self.log.warning(f"Unable to cache the result {key}: {e}")
+            shutil.rmtree(temp_folder, ignore_errors=True)
+            return
+
+        with self.lock:
+            self.entries[key] = size
+            self.size += size
+            evicted = []
+            while self.size > self.max_size:
+                evicted_key, evicted_size = self.entries.popitem(last=False)
+                self.size -= evicted_size
+                evicted.append(evicted_key)
+        for evicted_key in evicted:
+            shutil.rmtree(os.path.join(self.folder, evicted_key), ignore_errors=True)
+
+    def delete(self, key: str):
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entries.pop(key)
+        shutil.rmtree(os.path.join(self.folder, key), ignore_errors=True)
+
+
+class ResultCache:
+    """Kangooroo outputs reused by the tasks submitting the same URL with the same parameters within ttl seconds."""
+
+    def __init__(self, backend: ResultCacheBackend, ttl: float = 1800) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(uri: str, params: dict) -> str:
+        """Identify a fetch by its URL and every parameter changing what the browser does.
+
+        Returns:
+            The sha256 of the normalized URL and of the parameters.
+        """
+        return hashlib.sha256(json.dumps([normalize_url(uri), params], sort_keys=True).encode()).hexdigest()
+
+    def restore(self, key: str, output_folder: str) -> float | None:
+        """Copy a cached Kangooroo output in output_folder.
+
+        Returns:
+            When the output was cached, None if no output younger than the TTL is cached.
+        """
+        stored_at = self.backend.get(key, output_folder)
+        if stored_at is not None and time.time() - stored_at > self.ttl:
+            self.backend.delete(key)
+            shutil.rmtree(output_folder, ignore_errors=True)
+            stored_at = None
+        if stored_at is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return stored_at
+
+    def store(self, key: str, output_folder: str):
+        names = [name for name in CACHED_FILES if os.path.exists(os.path.join(output_folder, name))]
+        if "results.json" in names:
+            self.backend.put(key, output_folder, names)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,123 @@
+import os
+
+import httpx
+
+from urldownloader.download import Download
+
+PARTIAL_SUFFIX = ".crdownload"
+# Bytes requested again before the end of the partial download, they must match what the browser received
+OVERLAP = 1024
+READ_SIZE = 1024 * 1024
+
+
+def find_partial_download(folders: list[str]) -> str | None:
+    """Look for the file Chrome was still downloading when Kangooroo stopped.
+
+    Returns:
+        The path of the largest non-empty partial download, None if there is none.
+    """
+    partial_path = None
+    partial_size = 0
+    for folder in folders:
+        for root, _, files in os.walk(folder):
+            for name in files:
+                if not name.endswith(PARTIAL_SUFFIX):
+                    continue
+                path = os.path.join(root, name)
+                size = os.path.getsize(path)
+                if size > partial_size:
+                    partial_path, partial_size = path, size
+    return partial_path
+
+
+def _read_exactly(chunks, size: int) -> bytes:
+    data = b""
+    for chunk in chunks:
+        data += chunk
+        if len(data) >= size:
+            break
+    return data
+
+
+def resume_download(
+    client: httpx.Client,
+    url: str,
+    partial_path: str,
+    download: Download,
+    log,
+    headers: dict | None = None,
+    cookies: dict | None = None,
+    timeout: float | None = None,
+) -> int | None:
+    """Complete a partial download with a Range request, the content is written to download.
+
+    The server must advertise byte ranges and give a strong ETag or a Last-Modified date, sent back in If-Range so
+    that a changed resource is sent in full instead of being stitched. The last OVERLAP bytes of the partial
+    download are requested again and compared, which catches a resource that changed since the browser got it.
+    A failed request is not fatal, the partial download is kept and whatever was written is dropped.
+
+    Returns:
+        The number of bytes reused from the partial download, 0 if the server sent the full content instead, or
+        None if nothing was written and the content must be fetched again.
+    """
+    try:
+        return _resume_download(client, url, partial_path, download, headers, cookies, timeout)
+    except httpx.HTTPError as e:
+        log.warning(f"Unable to resume the download of {url}, fetching it again: {e}")
+        download.reset()
+        return None
+
+
+def _resume_download(
+    client: httpx.Client,
+    url: str,
+    partial_path: str,
+    download: Download,
+    headers: dict | None,
+    cookies: dict | None,
+    timeout: float | None,
+) -> int | None:
+    partial_size = os.path.getsize(partial_path)
+    if partial_size == 0:
+        return None
+
+    head = client.head(url, headers=headers, cookies=cookies, timeout=timeout, follow_redirects=True)
+    if "bytes" not in head.headers.get("Accept-Ranges", "").lower():
+        return None
+    validator = head.headers.get("ETag")
+    if not validator or validator.startswith("W/"):
+        validator = head.headers.get("Last-Modified")
+    if not validator:
+        return None
+    length = head.headers.get("Content-Length", "")
+    if length.isdigit() and int(length) <= partial_size:
+        return None
+
+    start = max(partial_size - OVERLAP, 0)
+    range_headers = {**(headers or {}), "Range": f"bytes={start}-", "If-Range": validator}
+    with client.stream("GET", str(head.url), headers=range_headers, cookies=cookies, timeout=timeout) as r:
+        chunks = r.iter_bytes()
+        if r.status_code == 200:
+            # The resource changed, the server sent all of it
+            for chunk in chunks:
+                if not download.write(chunk):
+                    break
+            return 0
+        if r.status_code != 206 or not r.headers.get("Content-Range", "").startswith(f"bytes {start}-"):
+            return None
+
+        overlap = _read_exactly(chunks, partial_size - start)
+        with open(partial_path, "rb") as f:
+            f.seek(start)
+            if overlap[: partial_size - start] != f.read():
+                return None
+            download.resumed = partial_size
+            f.seek(0)
+            while chunk := f.read(READ_SIZE):
+                if not download.write(chunk):
+                    return partial_size
+        if download.write(overlap[partial_size - start :]):
+            for chunk in chunks:
+                if not download.write(chunk):
+                    break
+    return partial_size
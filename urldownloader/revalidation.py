@@ -0,0 +1,231 @@
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import BinaryIO
+
+from urldownloader.urls import normalize_url
+
+
+class StoredResponse:
+    __slots__ = ("etag", "last_modified", "sha256", "size", "stored_at")
+
+    def __init__(self, etag: str | None, last_modified: str | None, sha256: str, size: int, stored_at: float) -> None:
+        self.etag = etag
+        self.last_modified = last_modified
+        self.sha256 = sha256
+        self.size = size
+        self.stored_at = stored_at
+
+    def validators(self) -> dict:
+        """Headers asking the server to only send the content if it changed.
+
+        Returns:
+            The If-None-Match and If-Modified-Since headers for the validators that were received.
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_list(self) -> list:
+        return [self.etag, self.last_modified, self.sha256, self.size, self.stored_at]
+
+
+class RevalidationStore:
+    """Bodies of the last responses to GET requests, kept with their ETag and Last-Modified validators.
+
+    Responses are keyed by normalized URL and proxy profile. A stored body is reused when the server answers a
+    conditional request with 304 Not Modified. Entries older than ttl seconds are not revalidated, the least
+    recently used entries are evicted once the bodies take more than max_size bytes. Identical bodies are stored
+    once. The index is kept in memory, it can be saved in the store folder and loaded back when the service starts.
+
+    The instances of a node can share the folder. Their indexes are merged under a lock when they are saved, and a
+    body evicted by one instance is dropped from the index of the others when they find it missing.
+    """
+
+    def __init__(self, folder: str, log, max_size: int = 512 * 1024 * 1024, ttl: float = 86400) -> None:
+        self.folder = folder
+        self.log = log
+        self.max_size = max_size
+        self.ttl = ttl
+        self.index_path = os.path.join(folder, "index.json")
+        self.lock_path = os.path.join(folder, "index.lock")
+        # key -> StoredResponse, least recently used first
+        self.entries: OrderedDict[str, StoredResponse] = OrderedDict()
+        # sha256 -> number of entries pointing to the body
+        self.references: dict[str, int] = {}
+        self.size = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(url: str, profile: str) -> str:
+        return hashlib.sha256(f"{profile}\n{normalize_url(url)}".encode()).hexdigest()
+
+    def body_path(self, sha256: str) -> str:
+        return os.path.join(self.folder, sha256)
+
+    def lookup(self, url: str, profile: str) -> StoredResponse | None:
+        """Find the stored response of a URL that can still be revalidated.
+
+        Returns:
+            The stored response, None if there is none or if it expired.
+        """
+        key = self.key(url, profile)
+        with self.lock:
+            stored = self.entries.get(key)
+            if stored is None:
+                return None
+            if time.time() - stored.stored_at > self.ttl or not os.path.exists(self.body_path(stored.sha256)):
+                self._remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return stored
+
+    def open_body(self, url: str, profile: str, stored: StoredResponse) -> BinaryIO | None:
+        """Open the body of a stored response, it stays readable if another instance evicts it afterwards.
+
+        Returns:
+            The body opened for reading, None if it was already removed, the entry is then dropped.
+        """
+        try:
+            return open(self.body_path(stored.sha256), "rb")
+        except FileNotFoundError:
+            key = self.key(url, profile)
+            with self.lock:
+                if self.entries.get(key) is stored:
+                    self._remove(key)
+            return None
+
+    def store(self, url: str, profile: str, headers, path: str, sha256: str, size: int) -> bool:
+        """Keep the body of a complete response if it came with validators.
+
+        Returns:
+            Whether the response was stored.
+        """
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return False
+        if "no-store" in headers.get("Cache-Control", "").lower() or size > self.max_size:
+            return False
+
+        body_path = self.body_path(sha256)
+        try:
+            if not os.path.exists(body_path):
+                os.makedirs(self.folder, exist_ok=True)
+                fd, temp_path = tempfile.mkstemp(dir=self.folder)
+                os.close(fd)
+                shutil.copyfile(path, temp_path)
+                os.replace(temp_path, body_path)
+            else:
+                # The body can be shared with an entry of another instance, it is recent again
+                os.utime(body_path)
+        except OSError as e:
+            self.log.warning(f"Unable to store the response of {url}: {e}")
+            return False
+
+        with self.lock:
+            self._add(self.key(url, profile), StoredResponse(etag, last_modified, sha256, size, time.time()))
+        return True
+
+    def refresh(self, url: str, profile: str):
+        """Restart the TTL of a response the server confirmed to be unchanged."""
+        with self.lock:
+            stored = self.entries.get(self.key(url, profile))
+            if stored is not None:
+                stored.stored_at = time.time()
+        if stored is not None:
+            try:
+                os.utime(self.body_path(stored.sha256))
+            except FileNotFoundError:
+                pass
+
+    def _add(self, key: str, stored: StoredResponse):
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = stored
+        if stored.sha256 not in self.references:
+            self.size += stored.size
+        self.references[stored.sha256] = self.references.get(stored.sha256, 0) + 1
+        while self.size > self.max_size and self.entries:
+            self._remove(next(iter(self.entries)))
+
+    def _remove(self, key: str):
+        stored = self.entries.pop(key)
+        self.references[stored.sha256] -= 1
+        if self.references[stored.sha256] == 0:
+            del self.references[stored.sha256]
+            self.size -= stored.size
+            try:
+                os.unlink(self.body_path(stored.sha256))
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        return {"entries": len(self.entries), "bodies": len(self.references), "size": self.size}
+
+    def _read_index(self) -> list:
+        try:
+            with open(self.index_path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            self.log.warning(f"Unable to load the revalidation store index {self.index_path}: {e}")
+            return []
+
+    def load(self):
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_SH)
+            index = self._read_index()
+        now = time.time()
+        with self.lock:
+            for key, stored in index:
+                stored = StoredResponse(*stored)
+                if os.path.exists(self.body_path(stored.sha256)):
+                    self._add(key, stored)
+            # Bodies left by a run that could not save its index. The bodies stored by the other instances since
+            # they saved their index are recent, only those that could no longer be revalidated are removed.
+            for name in os.listdir(self.folder):
+                if len(name) != 64 or name in self.references:
+                    continue
+                try:
+                    if now - os.path.getmtime(self.body_path(name)) > self.ttl:
+                        os.unlink(self.body_path(name))
+                except FileNotFoundError:
+                    pass
+        self.log.info(f"Loaded {len(self.entries)} entries in the revalidation store")
+
+    def save(self):
+        with self.lock:
+            index = {key: stored.to_list() for key, stored in self.entries.items()}
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                # The entries saved by the other instances are kept, the most recent response of a key wins
+                for key, stored in self._read_index():
+                    if key not in index or stored[4] > index[key][4]:
+                        index[key] = stored
+                now = time.time()
+                merged = [
+                    [key, stored]
+                    for key, stored in sorted(index.items(), key=lambda item: item[1][4])
+                    if now - stored[4] <= self.ttl and os.path.exists(self.body_path(stored[2]))
+                ]
+                fd, temp_path = tempfile.mkstemp(dir=self.folder)
+                with open(fd, "w") as f:
+                    json.dump(merged, f)
+                os.replace(temp_path, self.index_path)
+        except OSError as e:
+            self.log.warning(f"Unable to save the revalidation store index {self.index_path}: {e}")
@@ -0,0 +1,122 @@
+import threading
+from email.message import Message
+
+import httpx
+
+# Content types of files a browser downloads instead of rendering
+DOWNLOAD_TYPES = {
+    "application/octet-stream",
+    "application/zip",
+    "application/x-zip-compressed",
+    "application/x-7z-compressed",
+    "application/x-rar-compressed",
+    "application/vnd.rar",
+    "application/gzip",
+    "application/x-gzip",
+    "application/x-tar",
+    "application/x-bzip2",
+    "application/x-xz",
+    "application/x-msdownload",
+    "application/x-msdos-program",
+    "application/x-msi",
+    "application/x-ms-installer",
+    "application/vnd.microsoft.portable-executable",
+    "application/x-dosexec",
+    "application/x-executable",
+    "application/x-sharedlib",
+    "application/x-iso9660-image",
+    "application/x-apple-diskimage",
+    "application/vnd.android.package-archive",
+    "application/java-archive",
+    "application/vnd.ms-cab-compressed",
+}
+# Content types rendered by the browser even when they are sent as attachments
+BROWSER_TYPES = {"text/html", "application/xhtml+xml"}
+
+
+class Probe:
+    __slots__ = ("url", "status_code", "content_type", "attachment", "filename", "size")
+
+    def __init__(self, url: str, status_code: int, headers) -> None:
+        self.url = url
+        self.status_code = status_code
+        self.content_type = headers.get("Content-Type", "").split(";")[0].strip().lower()
+        disposition = Message()
+        disposition["Content-Disposition"] = headers.get("Content-Disposition", "")
+        self.attachment = disposition.get_content_disposition() == "attachment"
+        self.filename = disposition.get_filename()
+        self.size = None
+        content_range = headers.get("Content-Range", "")
+        length = content_range.rpartition("/")[2] if content_range else headers.get("Content-Length", "")
+        if length.isdigit():
+            self.size = int(length)
+
+    def direct_download(self) -> str | None:
+        """Tell if the URL serves a file that can be downloaded without the browser.
+
+        Returns:
+            Why the content is a direct download, None if it should go to the browser.
+        """
+        if self.status_code not in (200, 206) or self.size == 0 or self.content_type in BROWSER_TYPES:
+            return None
+        if self.content_type in DOWNLOAD_TYPES:
+            return f"Binary content type {self.content_type}"
+        if self.attachment and self.content_type and not self.content_type.startswith("text/"):
+            return f"Attachment of type {self.content_type}"
+        return None
+
+
+def probe_url(
+    client: httpx.Client,
+    url: str,
+    headers: dict | None = None,
+    cookies: dict | None = None,
+    timeout: float | None = None,
+) -> Probe:
+    """Get the headers of a URL without its content, with a HEAD request or a GET of its first byte.
+
+    Returns:
+        The probe of the final URL, after the redirections.
+    """
+    response = client.head(url, headers=headers, cookies=cookies, timeout=timeout, follow_redirects=True)
+    if response.status_code not in (405, 501):
+        return Probe(str(response.url), response.status_code, response.headers)
+    # Servers not implementing HEAD
+    range_headers = {**(headers or {}), "Range": "bytes=0-0"}
+    with client.stream(
+        "GET", url, headers=range_headers, cookies=cookies, timeout=timeout, follow_redirects=True
+    ) as response:
+        return Probe(str(response.url), response.status_code, response.headers)
+
+
+class RoutingStats:
+    """Routing decisions, with the time taken by the browser and by the direct downloads to estimate the time saved."""
+
+    def __init__(self) -> None:
+        self.decisions = {"browser": 0, "direct": 0, "probe_failed": 0}
+        self.browser_runs = 0
+        self.browser_time = 0.0
+        self.direct_runs = 0
+        self.direct_time = 0.0
+        self.lock = threading.Lock()
+
+    def decision(self, decision: str):
+        with self.lock:
+            self.decisions[decision] += 1
+
+    def browser_run(self, seconds: float):
+        with self.lock:
+            self.browser_runs += 1
+            self.browser_time += seconds
+
+    def direct_run(self, seconds: float):
+        with self.lock:
+            self.direct_runs += 1
+            self.direct_time += seconds
+
+    def stats(self) -> dict:
+        with self.lock:
+            saved = 0.0
+            if self.browser_runs:
+                saved = self.direct_runs * self.browser_time / self.browser_runs - self.direct_time
+            return {**self.decisions, "estimated_seconds_saved": round(saved, 1)}
@@ -0,0 +1,132 @@
+import abc
+import contextlib
+import fcntl
+import os
+import threading
+import time
+from typing import Iterator
+
+
+class LockBackend(abc.ABC):
+    """Exclusive locks shared by the service instances, a cross-node backend implements the same methods."""
+
+    @abc.abstractmethod
+    def acquire(self, key: str, timeout: float) -> bool:
+        """Wait for the lock of key.
+
+        Returns:
+            Whether the lock was acquired before the timeout.
+        """
+
+    @abc.abstractmethod
+    def release(self, key: str):
+        """Release the lock of key, if it is held by this instance."""
+
+
+class FileLockBackend(LockBackend):
+    """Locks taken with flock on files of a folder, shared by the service instances mounting it."""
+
+    def __init__(self, folder: str, poll_interval: float = 0.2) -> None:
+        self.folder = folder
+        self.poll_interval = poll_interval
+        # key -> descriptor of the locked file
+        self.locks: dict[str, int] = {}
+        self.lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.folder, f"{key}.lock")
+
+    def _try_lock(self, path: str) -> int | None:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        try:
+            # The holder removes the file when it releases the lock, a lock taken on a removed file is not shared
+            if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                return fd
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+        return None
+
+    def acquire(self, key: str, timeout: float) -> bool:
+        path = self._path(key)
+        deadline = time.monotonic() + timeout
+        while True:
+            fd = self._try_lock(path)
+            if fd is not None:
+                with self.lock:
+                    self.locks[key] = fd
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(self.poll_interval)
+
+    def release(self, key: str):
+        with self.lock:
+            fd = self.locks.pop(key, None)
+        if fd is None:
+            return
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+
+
+class Flight:
+    __slots__ = ("key", "acquired", "waited")
+
+    def __init__(self, key: str, acquired: bool, waited: bool) -> None:
+        self.key = key
+        # False if the task gave up waiting and fetches without the lock
+        self.acquired = acquired
+        # Whether another task held the lock, its output could have been published in the meantime
+        self.waited = waited
+
+
+class SingleFlight:
+    """Let a single task at a time fetch a URL with the same parameters.
+
+    The first task takes the lock of the key and fetches the URL. The tasks arriving while it is held wait for it,
+    up to wait seconds, and can then reuse what the first task published instead of fetching the URL again.
+    """
+
+    def __init__(self, backend: LockBackend, wait: float = 180) -> None:
+        self.backend = backend
+        self.wait = wait
+        self.leaders = 0
+        self.followers = 0
+        self.timeouts = 0
+
+    @contextlib.contextmanager
+    def flight(self, key: str, wait: float | None = None) -> Iterator[Flight]:
+        """Hold the lock of key for the duration of the block.
+
+        Args:
+            key: Key of the URL and of the parameters it is fetched with.
+            wait: Seconds the task can wait, when it has less time left than the wait of the single flight.
+
+        Yields:
+            The flight, telling if the lock was acquired and if the task had to wait for another one.
+        """
+        waited = not self.backend.acquire(key, 0)
+        acquired = not waited or self.backend.acquire(key, self.wait if wait is None else min(wait, self.wait))
+        if not waited:
+            self.leaders += 1
+        elif acquired:
+            self.followers += 1
+        else:
+            self.timeouts += 1
+        try:
+            yield Flight(key, acquired, waited)
+        finally:
+            if acquired:
+                self.backend.release(key)
+
+    def stats(self) -> dict:
+        return {"leaders": self.leaders, "followers": self.followers, "timeouts": self.timeouts}
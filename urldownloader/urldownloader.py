@@ -1,4 +1,4 @@
-import base64
+import contextlib
 import hashlib
 import json
 import math
@@ -6,11 +6,12 @@ import os
 import re
 import subprocess
 import tempfile
-import xml.etree.ElementTree as ET
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import IO
 from urllib.parse import urlparse
 
-import httpx
 import yaml
 from assemblyline.common.identify import Identify
 from assemblyline.odm.base import DATEFORMAT
@@ -32,13 +33,39 @@ from assemblyline_v4_service.common.result import (
     URLSectionBody,
 )
 from assemblyline_v4_service.common.task import PARENT_RELATION
-from bs4 import BeautifulSoup
-from httpx._exceptions import ConnectError, ConnectTimeout, TooManyRedirects
+from httpx._exceptions import ConnectError, ConnectTimeout, HTTPError, TooManyRedirects
 from PIL import UnidentifiedImageError
 
+from urldownloader.body_filter import BodyFilter
+from urldownloader.body_store import BodyStore
+from urldownloader.collectors import NetworkConnectionCollector, TagDeduplicator
+from urldownloader.download import Download
+from urldownloader.fileinfo_cache import FileInfoBatch, FileInfoCache
+from urldownloader.har import HAREntry, HARRewriter
+from urldownloader.host_governor import FileGovernorBackend, HostGovernor, Slot
+from urldownloader.html_analyzer import HTMLPage, analyze_html
+from urldownloader.http_clients import HTTPClientPool
 from urldownloader.httpx_logger import log_httpx
+from urldownloader.jvm import KangoorooJVM
+from urldownloader.kangooroo_folders import KangoorooFolders
+from urldownloader.kangooroo_pool import KangoorooPool
+from urldownloader.open_directory import parse_listing
+from urldownloader.open_directory_crawler import OpenDirectoryCrawler
+from urldownloader.preflight import Preflight
+from urldownloader.proxy_pool import ProxyPool, parse_proxy
+from urldownloader.redirects import RedirectGraph
+from urldownloader.result_cache import LocalResultCacheBackend, ResultCache
+from urldownloader.resume import find_partial_download, resume_download
+from urldownloader.revalidation import RevalidationStore
+from urldownloader.routing import RoutingStats, probe_url
+from urldownloader.single_flight import FileLockBackend, SingleFlight
+from urldownloader.webdav import MAX_ENTRIES as WEBDAV_MAX_ENTRIES
+from urldownloader.webdav import WebDAVEntry, parse_multistatus
+from urldownloader.webdav_crawler import WebDAVCrawler
 
 KANGOOROO_FOLDER = os.path.join(os.path.dirname(__file__), "kangooroo")
+# Seconds of the service timeout kept to process the output once the URL is fetched
+TIMEOUT_MARGIN = 30
 
 # Regex from
 # https://stackoverflow.com/questions/40939380/how-to-get-file-name-from-content-disposition
@@ -47,32 +74,57 @@ UTF8_FILENAME_REGEX = r"filename\*=UTF-8''([\w%\-\.]+)(?:; ?|$)"
 ASCII_FILENAME_REGEX = r"filename=([\"']?)(.*?[^\\])\1(?:; ?|$)"
 
 
-def detect_open_directory(request: ServiceRequest, soup: BeautifulSoup):
-    if not soup.title or "index of" not in soup.title.string.lower():
-        return
+def incomplete_download(output_folder: str) -> bool:
+    """Tell if Kangooroo stopped before the end of a download, the service then fetches the file itself.
+
+    Returns:
+        Whether the results of the output folder report an incomplete download.
+    """
+    try:
+        with open(os.path.join(output_folder, "results.json"), "r") as f:
+            results = json.load(f) or {}
+    except (OSError, ValueError):
+        return False
+    return results.get("experiment", {}).get("execution", {}).get("downloadStatus") == "INCOMPLETE_DOWNLOAD"
+
+
+def container_local(path: str) -> bool:
+    """Tell if a folder is in the temporary folder of the container, which the other service instances do not see.
+
+    Returns:
+        Whether path is under the temporary folder.
+    """
+    temp_folder = os.path.realpath(tempfile.gettempdir())
+    return os.path.commonpath([os.path.realpath(path), temp_folder]) == temp_folder
+
+
+def detect_open_directory(request: ServiceRequest, page: HTMLPage) -> bool:
+    if not page.title or "index of" not in page.title.lower():
+        return False
 
     open_directory_links = []
     open_directory_folders = []
-    for a in soup.find_all("a", href=True):
-        if "://" in a["href"][:10] and a["href"][0] != ".":
+    for href in page.hrefs:
+        if "://" in href[:10] and href[0] != ".":
             continue
-        if a["href"] == "..":
+        if href == "..":
             # Link to the parent directory
             continue
-        if a["href"][0] == "?":
+        if href[0] == "?":
             # Probably just some table ordering
             continue
-        if a["href"][0] == "/":
+        if href[0] == "/":
             # Check if it is the root or a parent directory
-            if a["href"] == "/" or request.task.fileinfo.uri_info.path.startswith(a["href"]):
+            if href == "/" or request.task.fileinfo.uri_info.path.startswith(href):
                 continue
 
-        if a["href"].endswith("/"):
-            open_directory_folders.append(a["href"])
+        if href.endswith("/"):
+            open_directory_folders.append(href)
         else:
-            open_directory_links.append(a["href"])
+            open_directory_links.append(href)
 
     if open_directory_links or open_directory_folders:
+        add_unique_tag = TagDeduplicator(add_tag)
         open_directory_section = ResultTextSection("Open Directory Detected", parent=request.result)
         if open_directory_links:
             open_directory_section.add_line(f"File{'s' if len(open_directory_links) > 1 else ''}:")
@@ -83,7 +135,7 @@ def detect_open_directory(request: ServiceRequest, soup: BeautifulSoup):
                 link = link[2:]
             link = f"{request.task.fileinfo.uri_info.uri.rstrip('/')}/{link}"
             open_directory_section.add_line(link)
-            add_tag(open_directory_section, "network.static.uri", link)
+            add_unique_tag(open_directory_section, "network.static.uri", link)
 
         if open_directory_folders:
             open_directory_section.add_line(f"Folder{'s' if len(open_directory_folders) > 1 else ''}:")
@@ -94,41 +146,35 @@ def detect_open_directory(request: ServiceRequest, soup: BeautifulSoup):
                 link = link[2:]
             link = f"{request.task.fileinfo.uri_info.uri.rstrip('/')}/{link}"
             open_directory_section.add_line(link)
-            add_tag(open_directory_section, "network.static.uri", link)
+            add_unique_tag(open_directory_section, "network.static.uri", link)
 
+    return bool(open_directory_links or open_directory_folders)
 
-def detect_webdav_listing(request: ServiceRequest, content: bytes):
-    root = ET.fromstring(content)
-    namespace = {"d": "DAV:"}
-    links = []
-    for response in root.findall("d:response", namespace):
-        href = response.find("d:href", namespace)
-        if href is not None:
-            links.append(href.text)
 
-    if not links:
-        return
+def detect_webdav_listing(
+    request: ServiceRequest, source: str | IO[bytes], max_entries: int = WEBDAV_MAX_ENTRIES
+) -> list[WebDAVEntry]:
+    entries, truncated = parse_multistatus(source, max_entries)
+    if not entries:
+        return entries
 
+    add_unique_tag = TagDeduplicator(add_tag)
     webdav_section = ResultTextSection("WebDav Listing Detected", parent=request.result)
+    entries_section = ResultTableSection("WebDav Entries", parent=webdav_section)
     root_url = urlparse(request.task.fileinfo.uri_info.uri)
     root_url = root_url._replace(fragment="")._replace(params="")._replace(query="")._replace(path="").geturl()
-    for link in links:
+    for entry in entries:
         # Append the root website
-        link = f"{root_url}{link}"
+        link = entry.href if "://" in entry.href[:10] else f"{root_url}{entry.href}"
         webdav_section.add_line(link)
-        add_tag(webdav_section, "network.static.uri", link)
-
-
-def parse_refresh_header(header_value):
-    # Refresh Header: https://developer.mozilla.org/en-US/docs/Web/HTTP/Reference/Headers/Refresh
-    try:
-        refresh = header_value.split(";", 1)
-        if int(refresh[0]) <= 15 and refresh[1].startswith("url="):
-            return refresh[1][4:]
-    except Exception:
-        # We weren't able to parse the refresh header value
-        pass
-    return ""
+        add_unique_tag(webdav_section, "network.static.uri", link)
+        entries_section.add_row(
+            TableRow({"href": entry.href, "type": entry.type, "size": entry.size, "last_modified": entry.last_modified})
+        )
+    entries_section.set_column_order(["href", "type", "size", "last_modified"])
+    if truncated:
+        webdav_section.add_line(f"Only the first {max_entries} entries are listed.")
+    return entries
 
 
 class URLDownloader(ServiceBase):
@@ -136,6 +182,10 @@ class URLDownloader(ServiceBase):
         super().__init__(config)
         self.identify = Identify(use_cache=False)
         self.request_timeout = self.config.get("request_timeout", 150)
+        # Time a task can wait for other tasks while still giving the browser request_timeout seconds
+        self.wait_limit = max(self.service_attributes.timeout - self.request_timeout - TIMEOUT_MARGIN, 0)
+        # When the task must be done fetching the URL, set when the task starts
+        self.task_deadline = 0.0
         self.do_not_download_regexes = [re.compile(x) for x in self.config.get("do_not_download_regexes", [])]
 
         with open(os.path.join(KANGOOROO_FOLDER, "default_conf.yml"), "r") as f:
@@ -144,24 +194,299 @@ class URLDownloader(ServiceBase):
         if self.config["default_browser_settings"]:
             self.default_kangooroo_config["browser_settings"]["DEFAULT"] = self.config["default_browser_settings"]
 
-    def execute_kangooroo(self, request: ServiceRequest, headers: dict, browser_settings: dict):
+        self.cache_folder = self.config.get("cache_folder", os.path.join(tempfile.gettempdir(), "urldownloader"))
+        jvm_config = self.config.get("kangooroo_jvm", {})
+        self.kangooroo_jvm = KangoorooJVM(
+            KANGOOROO_FOLDER,
+            self.cache_folder,
+            math.floor(self.service_attributes.docker_config.ram_mb * 0.75),
+            class_data_sharing=jvm_config.get("class_data_sharing", False),
+            startup_flags=jvm_config.get("startup_flags", False),
+        )
+        self.kangooroo_pool = None
+        self.kangooroo_folders = None
+
+        fileinfo_cache_config = self.config.get("fileinfo_cache", {})
+        self.fileinfo_cache = FileInfoCache(
+            self.identify,
+            self.log,
+            max_entries=fileinfo_cache_config.get("max_entries", 10000),
+            max_size=fileinfo_cache_config.get("max_size_mb", 32) * 1024 * 1024,
+            index_path=(
+                os.path.join(self.cache_folder, "fileinfo_cache.json")
+                if fileinfo_cache_config.get("persist", False)
+                else None
+            ),
+            version=self.service_attributes.version,
+        )
+        self.identify_executor = None
+
+        proxy_pool_config = self.config.get("proxy_pool", {})
+        self.proxy_pool = ProxyPool(
+            self.config["proxies"],
+            self.log,
+            check_interval=proxy_pool_config.get("check_interval", 30),
+            check_timeout=proxy_pool_config.get("check_timeout", 3),
+            max_errors=proxy_pool_config.get("max_errors", 2),
+        )
+        # Endpoints of the proxy profile of the task, in the order they are tried
+        self.proxy_endpoints = []
+
+        http_client_config = self.config.get("http_client", {})
+        self.http_clients = HTTPClientPool(
+            self.proxy_pool.endpoints,
+            self.log,
+            max_connections=http_client_config.get("max_connections", 10),
+            max_keepalive_connections=http_client_config.get("max_keepalive_connections", 5),
+            keepalive_expiry=http_client_config.get("keepalive_expiry", 30),
+            http2=http_client_config.get("http2", False),
+        )
+
+        result_cache_config = self.config.get("result_cache", {})
+        single_flight_config = self.config.get("single_flight", {})
+        self.result_cache = None
+        self.single_flight = None
+        if single_flight_config.get("enabled", False):
+            self.single_flight = SingleFlight(
+                FileLockBackend(os.path.join(self.cache_folder, "locks")),
+                wait=min(single_flight_config.get("wait_seconds", 180), self.wait_limit),
+            )
+            if container_local(self.cache_folder):
+                self.log.warning(
+                    f"The single flight only coordinates this instance, {self.cache_folder} is local to the container. "
+                    "Set cache_folder to a volume mounted by every instance."
+                )
+        # The single flight publishes outputs through the result cache, which it enables on its own
+        if result_cache_config.get("enabled", False) or self.single_flight:
+            self.result_cache = ResultCache(
+                LocalResultCacheBackend(
+                    os.path.join(self.cache_folder, "results"),
+                    self.log,
+                    max_size=result_cache_config.get("max_size_mb", 1024) * 1024 * 1024,
+                ),
+                # Without the result_cache flag, outputs are only kept for the tasks waiting on the same URL
+                ttl=(
+                    result_cache_config.get("ttl_minutes", 30) * 60
+                    if result_cache_config.get("enabled", False)
+                    else self.single_flight.wait
+                ),
+            )
+        self.kangooroo_timed_out = False
+
+        preflight_config = self.config.get("preflight", {})
+        self.preflight = None
+        if preflight_config.get("enabled", False):
+            self.preflight = Preflight(
+                self.log,
+                positive_ttl=preflight_config.get("positive_ttl", 300),
+                negative_ttl=preflight_config.get("negative_ttl", 60),
+                resolve_timeout=preflight_config.get("resolve_timeout", 3),
+                connect_timeout=preflight_config.get("connect_timeout", 3),
+            )
+        self.browser_launches_avoided = 0
+
+        download_routing_config = self.config.get("download_routing", {})
+        self.download_routing = None
+        if download_routing_config.get("enabled", False):
+            self.download_routing = RoutingStats()
+        self.probe_timeout = download_routing_config.get("probe_timeout", 10)
+
+        host_governor_config = self.config.get("host_governor", {})
+        self.host_governor = None
+        if host_governor_config.get("enabled", False):
+            self.host_governor = HostGovernor(
+                FileGovernorBackend(os.path.join(self.cache_folder, "governor")),
+                max_in_flight=host_governor_config.get("max_in_flight", 2),
+                rate=host_governor_config.get("rate", 1),
+                burst=host_governor_config.get("burst", 2),
+                max_wait=host_governor_config.get("max_wait", 60),
+            )
+            if container_local(self.cache_folder):
+                self.log.warning(
+                    f"The host governor only limits this instance, {self.cache_folder} is local to the container. "
+                    "Set cache_folder to a volume mounted by every instance."
+                )
+        self.host_slot: Slot | None = None
+        self.host_slots = contextlib.ExitStack()
+
+        revalidation_config = self.config.get("revalidation", {})
+        self.revalidation = None
+        if revalidation_config.get("enabled", False):
+            self.revalidation = RevalidationStore(
+                os.path.join(self.cache_folder, "revalidation"),
+                self.log,
+                max_size=revalidation_config.get("max_size_mb", 512) * 1024 * 1024,
+                ttl=revalidation_config.get("ttl_hours", 24) * 3600,
+            )
+
+    def start(self):
+        self.fileinfo_cache.load()
+        self.proxy_pool.start()
+        if self.revalidation:
+            self.revalidation.load()
+        if self.config.get("identify_workers", 0) > 0:
+            self.identify_executor = ThreadPoolExecutor(self.config["identify_workers"], thread_name_prefix="identify")
+
+        pool_config = self.config.get("kangooroo_pool", {})
+        if pool_config.get("enabled", False):
+            if not pool_config.get("command"):
+                self.log.warning("Kangooroo pool is enabled but no worker command is configured, ignoring.")
+            else:
+                self.kangooroo_pool = KangoorooPool(
+                    pool_config["command"],
+                    cwd=KANGOOROO_FOLDER,
+                    env=self.kangooroo_env,
+                    log=self.log,
+                    size=pool_config.get("size", 1),
+                    max_urls_per_worker=pool_config.get("max_urls_per_worker", 50),
+                )
+                self.kangooroo_pool.start()
+
+    def stop(self):
+        if self.kangooroo_pool:
+            self.kangooroo_pool.stop()
+            self.kangooroo_pool = None
+            self.kangooroo_jvm.commit_archive()
+        if self.identify_executor:
+            self.identify_executor.shutdown(cancel_futures=True)
+            self.identify_executor = None
+        self.log.info(f"Fileinfo cache: {self.fileinfo_cache.stats()}")
+        self.fileinfo_cache.save()
+        self.http_clients.close()
+        self.proxy_pool.stop()
+        if self.proxy_pool.pools:
+            self.log.info(f"Proxy pools: {self.proxy_pool.stats()}")
+        if self.result_cache:
+            self.log.info(f"Result cache: {self.result_cache.stats()}")
+        if self.single_flight:
+            self.log.info(f"Single flight: {self.single_flight.stats()}")
+        if self.preflight:
+            self.log.info(
+                f"Pre-flight: {self.preflight.stats()}, {self.browser_launches_avoided} browser launches avoided"
+            )
+        if self.download_routing:
+            self.log.info(f"Download routing: {self.download_routing.stats()}")
+        if self.host_governor:
+            self.log.info(f"Host governor: {self.host_governor.stats()}")
+        if self.revalidation:
+            self.log.info(f"Revalidation store: {self.revalidation.stats()}")
+            self.revalidation.save()
+
+    def kangooroo_env(self):
+        return {"JAVA_OPTS": self.kangooroo_jvm.java_opts()}
+
+    def proxy_endpoint(self, request: ServiceRequest) -> str:
+        """Endpoint of the proxy profile of the task, selected once per task.
+
+        Returns:
+            The name of the endpoint in the proxy pool.
+        """
+        if not self.proxy_endpoints:
+            self.proxy_endpoints = self.proxy_pool.select(request.get_param("proxy"))
+        return self.proxy_endpoints[0]
+
+    def upstream_proxy(self, request: ServiceRequest):
+        proxy = self.proxy_pool.endpoints[self.proxy_endpoint(request)]
+        if not proxy:
+            return None
+        if isinstance(proxy, dict):
+            proxy = proxy[request.task.fileinfo.uri_info.scheme]
+        return parse_proxy(proxy)
+
+    def add_proxy_health_section(self, request: ServiceRequest):
+        health = self.proxy_pool.health(request.get_param("proxy"))
+        if not health:
+            return
+        health_section = ResultTableSection("Proxy health", parent=request.result)
+        for upstream in health:
+            selected = upstream["upstream"] == self.proxy_endpoint(request)
+            health_section.add_row(TableRow({**upstream, "selected": selected}))
+        health_section.set_column_order(
+            ["upstream", "address", "selected", "alive", "latency_ms", "error_rate", "last_error"]
+        )
+
+    def check_reachable(self, request: ServiceRequest) -> bool:
+        """Check that the host, or the proxy used to reach it, accepts connections before fetching the URL.
+
+        Returns:
+            False if the host is known to be unreachable, the result explains why.
+        """
+        url_proxy = self.upstream_proxy(request)
+        try:
+            if url_proxy:
+                # Only the proxy can resolve and connect to the host
+                host, port = url_proxy.hostname, url_proxy.port or 80
+            else:
+                parsed_uri = urlparse(request.task.fileinfo.uri_info.uri)
+                host, port = parsed_uri.hostname, parsed_uri.port or (443 if parsed_uri.scheme == "https" else 80)
+        except ValueError:
+            return True
+        if not host:
+            return True
+
+        preflight = self.preflight.check(host, port)
+        if preflight.reachable:
+            return True
+        if url_proxy:
+            request.partial()
+            error_section = ResultTextSection("Proxy unavailable", parent=request.result)
+            error_section.add_line(f"Cannot connect to the {request.get_param('proxy')} proxy")
+        else:
+            error_section = ResultTextSection("Error", parent=request.result)
+            error_section.add_line(f"Cannot connect to {request.task.fileinfo.uri_info.hostname}")
+        error_section.add_line(preflight.error)
+        return False
+
+    def route_download(self, request: ServiceRequest, data: dict) -> bool:
+        """Probe the URL to fetch the files it serves for download without starting the browser.
+
+        Returns:
+            Whether the URL should be fetched with the HTTP client.
+        """
+        uri = request.task.fileinfo.uri_info.uri
+        try:
+            with self.http_clients.client(self.proxy_endpoint(request)) as client:
+                probe = probe_url(
+                    client,
+                    uri,
+                    headers=data.get("headers", {}),
+                    cookies=data.get("cookies", None),
+                    timeout=self.probe_timeout,
+                )
+        except HTTPError as e:
+            # The browser could still get the page, the server could be blocking clients that are not browsers
+            self.log.debug(f"Unable to probe {uri}: {e}")
+            self.download_routing.decision("probe_failed")
+            return False
+
+        reason = probe.direct_download()
+        if reason is None:
+            self.download_routing.decision("browser")
+            return False
+
+        self.download_routing.decision("direct")
+        routing_section = ResultKeyValueSection("Direct download", parent=request.result)
+        routing_section.add_item("reason", reason)
+        routing_section.add_item("url", probe.url)
+        if probe.filename:
+            routing_section.add_item("filename", probe.filename)
+        if probe.size is not None:
+            routing_section.add_item("size", probe.size)
+        return True
+
+    def execute_kangooroo(
+        self, request: ServiceRequest, headers: dict, browser_settings: dict, timeout: float | None = None
+    ):
+        # What is left of the task after waiting for other tasks, the request timeout otherwise
+        timeout = timeout or self.request_timeout
         kangooroo_config = self.default_kangooroo_config.copy()
-        kangooroo_config["temporary_folder"] = os.path.join(self.working_directory, "tmp")
-        os.makedirs(kangooroo_config["temporary_folder"], exist_ok=True)
-        kangooroo_config["output_folder"] = os.path.join(self.working_directory, "output")
-        os.makedirs(kangooroo_config["output_folder"], exist_ok=True)
-
-        if self.config["proxies"][request.get_param("proxy")]:
-            proxy = self.config["proxies"][request.get_param("proxy")]
-            if isinstance(proxy, dict):
-                proxy = proxy[request.task.fileinfo.uri_info.scheme]
-            url_proxy = urlparse(proxy)
-            if not url_proxy.netloc:
-                # If the proxy was written as
-                # "127.0.0.1:8080"
-                # "user@127.0.0.1:8080"
-                # "user:password@127.0.0.1:8080"
-                url_proxy = urlparse(f"http://{proxy}")
+        self.kangooroo_folders = KangoorooFolders(self.working_directory, self.config.get("ram_folder", {}), self.log)
+        self.kangooroo_timed_out = False
+        kangooroo_config["temporary_folder"] = self.kangooroo_folders.temporary_folder
+        kangooroo_config["output_folder"] = self.kangooroo_folders.output_folder
+
+        url_proxy = self.upstream_proxy(request)
+        if url_proxy:
             kangooroo_config["kang-upstream-proxy"]["ip"] = url_proxy.hostname
             kangooroo_config["kang-upstream-proxy"]["port"] = url_proxy.port
             if url_proxy.username:
@@ -182,7 +507,7 @@ class URLDownloader(ServiceBase):
             yaml.dump(kangooroo_config, temp_conf)
 
         # Set up environment variable and commandline arguments for running kangooroo
-        env_variables = {"JAVA_OPTS": f"-Xmx{math.floor(self.service_attributes.docker_config.ram_mb * 0.75)}m"}
+        env_variables = {**self.kangooroo_env(), **self.kangooroo_folders.env()}
         kangooroo_args = [
             "./bin/kangooroo",
             # We need no-sandbox to run google chrome in a pod
@@ -198,14 +523,24 @@ class URLDownloader(ServiceBase):
             request.task.fileinfo.uri_info.uri,
         ]
 
+        deadline = time.monotonic() + timeout
         try:
-            subprocess.run(kangooroo_args, cwd=KANGOOROO_FOLDER, timeout=self.request_timeout, env=env_variables)
+            # Warm workers receive the same arguments, fall back on a one-shot run if none could process the URL
+            if not self.kangooroo_pool or not self.kangooroo_pool.run(
+                kangooroo_args[1:], timeout, self.kangooroo_folders.env()
+            ):
+                # The one-shot run only gets the time the worker left
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise subprocess.TimeoutExpired(kangooroo_args, timeout)
+                subprocess.run(kangooroo_args, cwd=KANGOOROO_FOLDER, timeout=remaining, env=env_variables)
+                self.kangooroo_jvm.commit_archive()
         except subprocess.TimeoutExpired:
+            self.kangooroo_timed_out = True
+            self.kangooroo_jvm.commit_archive(completed=False)
             request.partial()
             timeout_section = ResultTextSection("Request timed out", parent=request.result)
-            timeout_section.add_line(
-                f"Timeout of {self.request_timeout} seconds was not enough to process the query fully."
-            )
+            timeout_section.add_line(f"Timeout of {timeout:.0f} seconds was not enough to process the query fully.")
 
         url_md5 = hashlib.md5(request.task.fileinfo.uri_info.uri.encode()).hexdigest()
 
@@ -238,33 +573,104 @@ class URLDownloader(ServiceBase):
 
         return output_folder
 
-    def send_http_request(self, method, request: ServiceRequest, data: dict):
+    def restore_cached_output(self, request: ServiceRequest, cache_key: str) -> str | None:
+        self.kangooroo_folders = KangoorooFolders(self.working_directory, self.config.get("ram_folder", {}), self.log)
+        url_md5 = hashlib.md5(request.task.fileinfo.uri_info.uri.encode()).hexdigest()
+        output_folder = os.path.join(self.kangooroo_folders.output_folder, url_md5)
+        stored_at = self.result_cache.restore(cache_key, output_folder)
+        if stored_at is None:
+            self.kangooroo_folders.cleanup()
+            return None
+
+        fetched_at = datetime.fromtimestamp(stored_at, timezone.utc).strftime(DATEFORMAT)
+        cache_section = ResultTextSection("Result rebuilt from cache", parent=request.result)
+        cache_section.add_line(
+            f"The URL was fetched with the same parameters at {fetched_at}, the browser output of that fetch was "
+            "analyzed again."
+        )
+        return output_folder
+
+    def send_http_request(
+        self, method, request: ServiceRequest, data: dict, partial_path: str | None = None
+    ) -> Download | None:
         requests_log = tempfile.NamedTemporaryFile(dir=self.working_directory, delete=False)
         requests_content_path = os.path.join(self.working_directory, "requests_content")
+        max_size = self.config.get("http_client", {}).get("max_download_size_mb", 0) * 1024 * 1024
+        uri = request.task.fileinfo.uri_info.uri
+        profile = request.get_param("proxy")
+        headers = data.get("headers", {})
+        # Plain GET requests can reuse the body of a previous response if the server confirms it did not change
+        revalidate = self.revalidation is not None and method == "GET" and not data.get("data") and not data.get("json")
+        stored = self.revalidation.lookup(uri, profile) if revalidate and partial_path is None else None
+        # The body is opened before the request, a body evicted by another instance is fetched again in full
+        stored_body = self.revalidation.open_body(uri, profile, stored) if stored else None
+        if stored_body:
+            headers = {**headers, **stored.validators()}
+        response_headers = None
+        # The next upstream of the proxy profile is tried when a proxy cannot be reached
+        endpoints = self.proxy_endpoints or self.proxy_pool.select(profile)
         try:
-            proxy_mounts = {
-                f"{scheme}://": httpx.HTTPTransport(proxy=f"http://{proxy}" if "://" not in proxy else proxy)
-                for scheme, proxy in self.config["proxies"][request.get_param("proxy")].items()
-            }
-            with (
-                log_httpx(requests_log.name),
-                httpx.Client(mounts=proxy_mounts) as client,
-                client.stream(
-                    method,
-                    request.task.fileinfo.uri_info.uri,
-                    headers=data.get("headers", {}),
-                    timeout=self.request_timeout,
-                    data=data.get("data", None),
-                    json=data.get("json", None),
-                    cookies=data.get("cookies", None),
-                    follow_redirects=True,
-                ) as r,
-            ):
-                with open(requests_content_path, "wb") as f:
-                    for chunk in r.iter_bytes():
-                        f.write(chunk)
-
-                return requests_content_path
+            with log_httpx(requests_log.name):
+                for attempt, endpoint in enumerate(endpoints, 1):
+                    try:
+                        with (
+                            self.http_clients.client(endpoint) as client,
+                            # The content is hashed and its type sniffed while it is written, it is not read again
+                            Download(requests_content_path, max_size, self.identify.ident) as download,
+                        ):
+                            resumed = None
+                            if partial_path is not None:
+                                # The bytes the browser already received are completed with a Range request when
+                                # possible
+                                resumed = resume_download(
+                                    client,
+                                    uri,
+                                    partial_path,
+                                    download,
+                                    self.log,
+                                    headers=headers,
+                                    cookies=data.get("cookies", None),
+                                    timeout=self.request_timeout,
+                                )
+                            if resumed is None:
+                                with client.stream(
+                                    method,
+                                    uri,
+                                    headers=headers,
+                                    timeout=self.request_timeout,
+                                    data=data.get("data", None),
+                                    json=data.get("json", None),
+                                    cookies=data.get("cookies", None),
+                                    follow_redirects=True,
+                                ) as r:
+                                    if stored_body and r.status_code == 304:
+                                        self.log.info(f"{uri} did not change, reusing the stored response")
+                                        self.revalidation.refresh(uri, profile)
+                                        while (chunk := stored_body.read(1024 * 1024)) and download.write(chunk):
+                                            pass
+                                    else:
+                                        for chunk in r.iter_bytes():
+                                            if not download.write(chunk):
+                                                break
+                                        if r.status_code == 200:
+                                            response_headers = r.headers
+                        break
+                    except (ConnectError, ConnectTimeout) as e:
+                        # Through a proxy, connection errors come from the proxy and another upstream can be tried
+                        self.proxy_pool.report_error(endpoint, str(e) or e.__class__.__name__)
+                        if attempt == len(endpoints):
+                            raise
+                        self.log.warning(f"Unable to fetch {uri} through {endpoint}, trying another upstream: {e}")
+
+            if revalidate and response_headers is not None and not download.truncated:
+                self.revalidation.store(uri, profile, response_headers, download.path, download.sha256, download.size)
+
+            if download.truncated:
+                request.partial()
+                truncated_section = ResultTextSection("Download size limit reached", parent=request.result)
+                truncated_section.add_line(f"Only the first {max_size} bytes of {uri} were downloaded.")
+                truncated_section.add_line(f"The content starts as {download.sniffed.get('type', 'unknown')}.")
+            return download
 
         except ConnectError:
             error_section = ResultTextSection("Error", parent=request.result)
@@ -291,456 +697,722 @@ class URLDownloader(ServiceBase):
             redirect_section.set_column_order(["status", "redirecting_url"])
             return None
         finally:
+            if stored_body:
+                stored_body.close()
             if os.path.exists(requests_log.name) and os.path.getsize(requests_log.name) > 0:
                 request.add_supplementary(
                     requests_log.name, "requests_log.log", "Log of the HTTP request made using httpx."
                 )
 
-    def execute(self, request: ServiceRequest) -> None:
-        request.result = Result()
-
-        if request.task.depth != 0 and request.get_param("only_submitted_url"):
-            request.partial()
+    def crawl_open_directory(self, request: ServiceRequest, source_path: str):
+        if not self.hold_host_slot(request):
+            return
+        crawl_config = self.config.get("open_directory", {})
+        user_agent = self.default_kangooroo_config["browser_settings"]["DEFAULT"].get("user_agent")
+        crawler = OpenDirectoryCrawler(
+            proxies=self.proxy_pool.endpoints[self.proxy_endpoint(request)],
+            headers={"User-Agent": user_agent} if user_agent else None,
+            max_depth=crawl_config.get("max_depth", 2),
+            max_entries=crawl_config.get("max_entries", 500),
+            max_bytes=crawl_config.get("max_size_mb", 50) * 1024 * 1024,
+            max_per_host=crawl_config.get("max_per_host", 2),
+            fetch_max_size=crawl_config.get("fetch_max_size_kb", 0) * 1024,
+            fetch_folder=os.path.join(self.working_directory, "open_directory"),
+            time_budget=crawl_config.get("time_budget", 60),
+            request_timeout=crawl_config.get("request_timeout", 10),
+        )
+        # The links of the landing page are relative to the submitted URL, as in detect_open_directory
+        crawl = crawler.crawl(f"{request.task.fileinfo.uri_info.uri.rstrip('/')}/", parse_listing(source_path))
+        if not crawl.entries:
             return
 
-        with open(request.file_path, "r") as f:
-            data = yaml.safe_load(f)
-
-        data.pop("uri")
-        for no_dl in self.do_not_download_regexes:
-            # Do nothing if we are not supposed to scan that URL
-            if no_dl.match(request.task.fileinfo.uri_info.uri):
-                return
-
-        method = data.pop("method", "GET")
-        # Fallback on old parameter "force_requests" for backward compatibility.
-        no_browser = request.get_param("no_browser") or request.task.service_config.get("force_requests", False)
-        if method == "GET" and not no_browser:
-            if "\x00" in request.task.fileinfo.uri_info.uri:
-                # We won't try to fetch URIs with a null byte using subprocess.
-                # This would cause a fork_exec issue. We will return an empty result instead.
-                return
-            headers = data.pop("headers", {})
-            browser_settings = data.pop("browser_settings", {})
-            if data:
-                ignored_params_section = ResultKeyValueSection("Ignored params", parent=request.result)
-                ignored_params_section.update_items(data)
-
-            # use Kangooroo to fetch URL
-            output_folder = self.execute_kangooroo(request, headers, browser_settings)
-
-            results_filepath = os.path.join(output_folder, "results.json")
+        add_unique_tag = TagDeduplicator(add_tag)
+        crawl_section = ResultTextSection("Open Directory Crawl", parent=request.result)
+        crawl_section.add_line(
+            f"{len(crawl.entries)} entries found, {sum(1 for crawled in crawl.entries if crawled.fetched)} files "
+            f"downloaded, {crawl.bytes_read} bytes read."
+        )
+        if crawl.entries_truncated:
+            crawl_section.add_line(f"Only the first {crawler.max_entries} entries are listed.")
+        if crawl.depth_truncated:
+            crawl_section.add_line(f"Folders deeper than {crawler.max_depth} levels were not crawled.")
+        if crawl.bytes_truncated:
+            crawl_section.add_line(f"The crawl stopped once {crawler.max_bytes} bytes were read.")
+        if crawl.timed_out:
+            crawl_section.add_line(
+                f"The time budget of {crawler.time_budget} seconds was not enough to crawl every folder."
+            )
 
-            if not os.path.exists(results_filepath):
-                raise Exception(
-                    (
-                        "No Kangooroo results.json found. Kangooroo may have been OOMKilled. "
-                        "Check for memory usage and increase limit as needed."
-                    )
+        entries_section = ResultTableSection("Open Directory Entries", parent=crawl_section)
+        for crawled in crawl.entries:
+            add_unique_tag(crawl_section, "network.static.uri", crawled.url)
+            entries_section.add_row(
+                TableRow(
+                    {
+                        "url": crawled.url,
+                        "depth": crawled.depth,
+                        "size": crawled.entry.size,
+                        "last_modified": crawled.entry.last_modified,
+                        "sha256": crawled.fetched["sha256"] if crawled.fetched else None,
+                        "error": crawl.errors.get(crawled.url),
+                    }
                 )
-            else:
-                request.add_supplementary(results_filepath, "results.json", "Kangooroo Result Output.")
-
-            with open(results_filepath, "r") as f:
-                results = json.load(f)
-
-            if results is None:
-                raise Exception(("No Kangooroo results found. "))
-            # Main result section
-            result_summary = results.get("summary", {})
-            result_experiment = results.get("experiment", {})
-            result_params = result_experiment.get("params", {})
-            result_execution = result_experiment.get("execution", {})
-
-            sandbox_details = {
-                "analysis_metadata": {
-                    "start_time": datetime.strptime(result_execution["startTime"], "%a %b %d %H:%M:%S UTC %Y").strftime(
-                        DATEFORMAT
-                    )
-                },
-                "sandbox_name": result_experiment["engineInfo"]["engineName"],
-                "sandbox_version": result_experiment["engineInfo"]["engineVersion"],
-            }
-            http_result = {
-                "response_code": result_summary["fetchResult"]["response_code"],
-            }
-
-            # check if kangooroo has unfinished download file. If so, we do a GET request to fetch that file again.
-            download_status = result_execution.get("downloadStatus", None)
+            )
+            if crawled.fetched:
+                request.add_extracted(
+                    crawled.fetched["path"],
+                    os.path.basename(urlparse(crawled.url).path) or crawled.fetched["sha256"],
+                    crawled.url,
+                    safelist_interface=self.api_interface,
+                    parent_relation=PARENT_RELATION.DOWNLOADED,
+                )
+        entries_section.set_column_order(["url", "depth", "size", "last_modified", "sha256", "error"])
 
-            if download_status == "INCOMPLETE_DOWNLOAD":
-                data["headers"] = {**result_summary.get("requestHeaders", {}), **data.get("headers", {})}
-                data["cookies"] = result_summary.get("sessionCookies", {})
+    def crawl_webdav(self, request: ServiceRequest, listings: list[tuple[str, list[WebDAVEntry]]], headers: dict):
+        if not self.hold_host_slot(request):
+            return
+        recursion_config = self.config.get("webdav", {}).get("recursion", {})
+        crawler = WebDAVCrawler(
+            proxies=self.proxy_pool.endpoints[self.proxy_endpoint(request)],
+            headers=headers,
+            max_depth=recursion_config.get("max_depth", 3),
+            max_entries=recursion_config.get("max_entries", 1000),
+            max_in_flight=recursion_config.get("max_in_flight", 4),
+            time_budget=recursion_config.get("time_budget", 30),
+            request_timeout=recursion_config.get("request_timeout", 10),
+        )
+        tree = crawler.crawl(listings)
+
+        add_unique_tag = TagDeduplicator(add_tag)
+        tree_section = ResultTextSection("WebDav Tree", parent=request.result)
+        tree_section.add_line(
+            f"{tree.entry_count} entries found in {len(tree.folders)} folders, "
+            f"{len(tree.errors)} folders could not be listed."
+        )
+        for line in tree.lines():
+            tree_section.add_line(line)
+        for children in tree.folders.values():
+            for url, _ in children:
+                add_unique_tag(tree_section, "network.static.uri", url)
+        if tree.entries_truncated:
+            tree_section.add_line(f"Only the first {crawler.max_entries} entries are listed.")
+        if tree.depth_truncated:
+            tree_section.add_line(f"Folders deeper than {crawler.max_depth} levels were not listed.")
+        if tree.timed_out:
+            tree_section.add_line(
+                f"The time budget of {crawler.time_budget} seconds was not enough to list every folder."
+            )
 
-                requests_content_path = self.send_http_request("GET", request, data)
+    def process_kangooroo_output(self, request: ServiceRequest, output_folder: str, data: dict):
+        results_filepath = os.path.join(output_folder, "results.json")
 
-                incomplete_download_section = ResultTextSection("Incomplete download detected", parent=request.result)
+        if not os.path.exists(results_filepath):
+            raise Exception(
+                (
+                    "No Kangooroo results.json found. Kangooroo may have been OOMKilled. "
+                    "Check for memory usage and increase limit as needed."
+                )
+            )
+        else:
+            results_filepath = self.kangooroo_folders.retrieve(results_filepath)
+            request.add_supplementary(results_filepath, "results.json", "Kangooroo Result Output.")
+
+        with open(results_filepath, "r") as f:
+            results = json.load(f)
+
+        if results is None:
+            raise Exception(("No Kangooroo results found. "))
+        # Main result section
+        result_summary = results.get("summary", {})
+        result_experiment = results.get("experiment", {})
+        result_params = result_experiment.get("params", {})
+        result_execution = result_experiment.get("execution", {})
+
+        sandbox_details = {
+            "analysis_metadata": {
+                "start_time": datetime.strptime(result_execution["startTime"], "%a %b %d %H:%M:%S UTC %Y").strftime(
+                    DATEFORMAT
+                )
+            },
+            "sandbox_name": result_experiment["engineInfo"]["engineName"],
+            "sandbox_version": result_experiment["engineInfo"]["engineVersion"],
+        }
+        http_result = {
+            "response_code": result_summary["fetchResult"]["response_code"],
+        }
+
+        # check if kangooroo has unfinished download file. If so, we do a GET request to fetch that file again.
+        download_status = result_execution.get("downloadStatus", None)
+
+        if download_status == "INCOMPLETE_DOWNLOAD":
+            data["headers"] = {**result_summary.get("requestHeaders", {}), **data.get("headers", {})}
+            data["cookies"] = result_summary.get("sessionCookies", {})
+
+            download = None
+            if self.hold_host_slot(request):
+                partial_path = None
+                if self.config.get("http_client", {}).get("resume_downloads", True):
+                    partial_path = find_partial_download([output_folder, self.kangooroo_folders.temporary_folder])
+                download = self.send_http_request("GET", request, data, partial_path)
+
+            incomplete_download_section = ResultTextSection("Incomplete download detected", parent=request.result)
+            incomplete_download_section.add_line(
+                "Kangooroo was not able to complete the download within the allocated time."
+            )
+            if download is None:
                 incomplete_download_section.add_line(
-                    "Kangooroo was not able to complete the download within the allocated time."
+                    "A direct HTTP GET request was tried to download the file again but it failed as well."
                 )
-                if requests_content_path is None:
+            else:
+                if download.resumed:
                     incomplete_download_section.add_line(
-                        "A direct HTTP GET request was tried to download the file again but it failed as well."
+                        f"The download was resumed after the {download.resumed} bytes received by the browser."
                     )
                 else:
                     incomplete_download_section.add_line(
                         "The file has been downloaded again using a direct HTTP GET request."
                     )
 
-                    file_info = self.identify.fileinfo(
-                        requests_content_path, skip_fuzzy_hashes=True, calculate_entropy=False
+                file_info = self.fileinfo_cache.fileinfo(download.path, download.sha256)
+                if file_info["type"].startswith("archive") and not download.truncated:
+                    request.add_extracted(
+                        download.path,
+                        download.sha256,
+                        "Archive from the URI",
+                        parent_relation=PARENT_RELATION.DOWNLOADED,
+                    )
+                else:
+                    incomplete_download_section.add_line(
+                        f"Downloaded file of type {file_info['type']} was added as supplementary."
+                    )
+                    request.add_supplementary(
+                        download.path,
+                        download.sha256,
+                        "Truncated content from the URI" if download.truncated else "Full content from the URI",
                     )
-                    if file_info["type"].startswith("archive"):
-                        request.add_extracted(
-                            requests_content_path,
-                            file_info["sha256"],
-                            "Archive from the URI",
-                            parent_relation=PARENT_RELATION.DOWNLOADED,
-                        )
-                    else:
-                        incomplete_download_section.add_line(
-                            f"Downloaded file of type {file_info['type']} was added as supplementary."
-                        )
-                        request.add_supplementary(
-                            requests_content_path, file_info["sha256"], "Full content from the URI"
-                        )
 
-            requested_url = result_summary.get("requestedUrl", {})
-            actual_url = result_summary.get("actualUrl", {})
-
-            target_urls = [requested_url["url"]]
-
-            result_section = ResultMultiSection("Results", parent=request.result)
-            kv_section = OrderedKVSectionBody()
-            result_section.add_section_part(kv_section)
-            kv_section.add_item("response_code", result_summary["fetchResult"]["response_code"])
-            kv_section.add_item("requested_url", requested_url["url"])
-            add_tag(result_section, "network.static.uri", requested_url["url"])
-            if "ip" in requested_url:
-                kv_section.add_item("requested_url_ip", requested_url["ip"])
-                result_section.add_tag("network.static.ip", requested_url["ip"])
-            if actual_url:
-                target_urls.append(actual_url["url"])
-                kv_section.add_item("actual_url", actual_url["url"])
-                add_tag(result_section, "network.static.uri", actual_url["url"])
-            if "ip" in actual_url:
-                kv_section.add_item("actual_url_ip", actual_url["ip"])
-                result_section.add_tag("network.static.ip", actual_url["ip"])
-
-            if ("ip" in actual_url and "ip" in requested_url) and actual_url["ip"] != requested_url["ip"]:
-                result_section.add_tag("file.behavior", "IP Redirection change")
-
-            if ("url" in requested_url and "url" in actual_url) and requested_url["url"] != actual_url["url"]:
-                http_result["redirection_url"] = actual_url["url"]
-
-            if result_params.get("windowSize", False):
-                sandbox_details["analysis_metadata"]["window_size"] = result_params["windowSize"]
-
-            # Screenshot section
-            screenshot_path = os.path.join(output_folder, "screenshot.png")
-            if os.path.exists(screenshot_path):
-                screenshot_section = ResultImageSection(
-                    request, title_text="Screenshot of visited page", parent=request.result
-                )
+        requested_url = result_summary.get("requestedUrl", {})
+        actual_url = result_summary.get("actualUrl", {})
+
+        target_urls = [requested_url["url"]]
+
+        result_section = ResultMultiSection("Results", parent=request.result)
+        kv_section = OrderedKVSectionBody()
+        result_section.add_section_part(kv_section)
+        kv_section.add_item("response_code", result_summary["fetchResult"]["response_code"])
+        kv_section.add_item("requested_url", requested_url["url"])
+        add_tag(result_section, "network.static.uri", requested_url["url"])
+        if "ip" in requested_url:
+            kv_section.add_item("requested_url_ip", requested_url["ip"])
+            result_section.add_tag("network.static.ip", requested_url["ip"])
+        if actual_url:
+            target_urls.append(actual_url["url"])
+            kv_section.add_item("actual_url", actual_url["url"])
+            add_tag(result_section, "network.static.uri", actual_url["url"])
+        if "ip" in actual_url:
+            kv_section.add_item("actual_url_ip", actual_url["ip"])
+            result_section.add_tag("network.static.ip", actual_url["ip"])
+
+        if ("ip" in actual_url and "ip" in requested_url) and actual_url["ip"] != requested_url["ip"]:
+            result_section.add_tag("file.behavior", "IP Redirection change")
+
+        if ("url" in requested_url and "url" in actual_url) and requested_url["url"] != actual_url["url"]:
+            http_result["redirection_url"] = actual_url["url"]
+
+        if result_params.get("windowSize", False):
+            sandbox_details["analysis_metadata"]["window_size"] = result_params["windowSize"]
+
+        # Screenshot section
+        screenshot_path = os.path.join(output_folder, "screenshot.png")
+        if os.path.exists(screenshot_path):
+            screenshot_path = self.kangooroo_folders.retrieve(screenshot_path)
+            screenshot_section = ResultImageSection(
+                request, title_text="Screenshot of visited page", parent=request.result
+            )
+            screenshot_section.add_image(
+                path=screenshot_path,
+                name="screenshot.png",
+                description=f"Screenshot of {request.task.fileinfo.uri_info.uri}",
+            )
+            screenshot_section.promote_as_screenshot()
+
+        # favicon section
+        favicon_path = os.path.join(output_folder, "favicon.ico")
+        if os.path.exists(favicon_path):
+            favicon_path = self.kangooroo_folders.retrieve(favicon_path)
+            try:
+                screenshot_section = ResultImageSection(request, title_text="Favicon of visited page")
                 screenshot_section.add_image(
-                    path=screenshot_path,
-                    name="screenshot.png",
-                    description=f"Screenshot of {request.task.fileinfo.uri_info.uri}",
+                    path=favicon_path,
+                    name="favicon.ico",
+                    description=f"Favicon of {request.task.fileinfo.uri_info.uri}",
                 )
-                screenshot_section.promote_as_screenshot()
-
-            # favicon section
-            favicon_path = os.path.join(output_folder, "favicon.ico")
-            if os.path.exists(favicon_path):
-                try:
-                    screenshot_section = ResultImageSection(request, title_text="Favicon of visited page")
-                    screenshot_section.add_image(
-                        path=favicon_path,
-                        name="favicon.ico",
-                        description=f"Favicon of {request.task.fileinfo.uri_info.uri}",
-                    )
-                    request.result.add_section(screenshot_section)
-                    fileinfo = self.identify.fileinfo(favicon_path, skip_fuzzy_hashes=True, calculate_entropy=False)
-                    http_result["favicon"] = {
-                        "md5": fileinfo["md5"],
-                        "sha1": fileinfo["sha1"],
-                        "sha256": fileinfo["sha256"],
-                        "size": fileinfo["size"],
-                    }
-                except UnidentifiedImageError:
-                    # Kangooroo is sometime giving html page as favicon...
-                    pass
-
-            source_path = os.path.join(output_folder, "source.html")
-            if os.path.exists(source_path):
-                with open(source_path, "rb") as f:
-                    data = f.read()
-
-                soup = BeautifulSoup(data, features="lxml")
-                if soup.title and soup.title.string:
-                    http_result["title"] = soup.title.string
-
-                try:
-                    detect_open_directory(request, soup)
-                except Exception:
-                    pass
-
-                request.add_extracted(source_path, "source.html", "Final HTML source code of the page")
-                uri_section = URLSectionBody()
-                result_section.add_section_part(uri_section)
-                with open(source_path, "rb") as f:
-                    sha256hash = hashlib.sha256(f.read()).hexdigest()
-                    uri_section.add_url(f"/file/viewer/{sha256hash}", "Final HTML source code of the page")
-
-            # Find any downloaded file
-            with open(os.path.join(output_folder, "session.har"), "r") as f:
-                har_content = json.load(f)
-
-            downloads = {}
-            redirects = []
-            response_errors = []
-            for entry in har_content["log"]["entries"]:
-                # Convert Kangooroo's list of header to a proper dictionary
-                request_headers = {header["name"]: header["value"] for header in entry["request"]["headers"]}
-                response_headers = {header["name"]: header["value"] for header in entry["response"]["headers"]}
-
-                http_details = {
-                    "request_uri": entry["request"]["url"],
-                    "request_headers": request_headers,
-                    "request_method": entry["request"]["method"],
-                    "response_headers": response_headers,
-                    "response_status_code": entry["response"]["status"],
+                request.result.add_section(screenshot_section)
+                fileinfo = self.fileinfo_cache.fileinfo(favicon_path)
+                http_result["favicon"] = {
+                    "md5": fileinfo["md5"],
+                    "sha1": fileinfo["sha1"],
+                    "sha256": fileinfo["sha256"],
+                    "size": fileinfo["size"],
+                }
+            except UnidentifiedImageError:
+                # Kangooroo is sometime giving html page as favicon...
+                pass
+
+        meta_refresh = ""
+        source_path = os.path.join(output_folder, "source.html")
+        if os.path.exists(source_path):
+            source_path = self.kangooroo_folders.retrieve(source_path)
+            page = analyze_html(source_path)
+            if page.title:
+                http_result["title"] = page.title
+            meta_refresh = page.meta_refresh
+
+            try:
+                open_directory = detect_open_directory(request, page)
+            except Exception:
+                open_directory = False
+            if open_directory and request.get_param("open_directory_crawl"):
+                self.crawl_open_directory(request, source_path)
+
+            request.add_extracted(source_path, "source.html", "Final HTML source code of the page")
+            uri_section = URLSectionBody()
+            result_section.add_section_part(uri_section)
+            uri_section.add_url(f"/file/viewer/{page.sha256}", "Final HTML source code of the page")
+
+        # Find any downloaded file, the HAR is rewritten one entry at a time without the downloaded content
+        modified_har_filepath = os.path.join(self.working_directory, "modified_session.har")
+        # Bodies that are not worth decoding can be skipped, they are only kept as metadata in the HAR
+        body_filter = None
+        if self.config.get("body_filter", {}).get("enabled", False):
+            body_filter = BodyFilter(self.config["body_filter"], target_urls)
+        har_entries = HARRewriter(
+            os.path.join(output_folder, "session.har"), modified_har_filepath, self.working_directory, body_filter
+        )
+
+        # Identical bodies are written once, bodies are written in order but can be identified in parallel
+        body_store = BodyStore(os.path.join(self.working_directory, "bodies"))
+        identifications = FileInfoBatch(self.fileinfo_cache, self.identify_executor)
+        ontology_config = self.config.get("ontology", {})
+        connections = NetworkConnectionCollector(
+            coalesce=ontology_config.get("coalesce_connections", False),
+            max_connections=ontology_config.get("max_connections", 0),
+        )
+        add_unique_tag = TagDeduplicator(add_tag)
+        downloads = {}
+        redirect_graph = RedirectGraph()
+        response_errors = []
+        skipped_bodies: dict[str, int] = {}
+        webdav_listings = []
+        webdav_headers = {}
+        for har_entry, body in har_entries:
+            entry = HAREntry(har_entry)
+            http_details = {
+                "request_uri": entry.url,
+                "request_headers": entry.request_headers.to_dict(),
+                "request_method": entry.method,
+                "response_headers": entry.response_headers.to_dict(),
+                "response_status_code": entry.status,
+            }
+            redirect_graph.add_entry(entry)
+
+            # Find all content that was downloaded from the servers
+            if body is not None and "size" in entry.content and entry.content["size"] != 0:
+                content_hashes = body_store.add(body)
+                content_sha256 = content_hashes["sha256"]
+                content_md5 = content_hashes["md5"]
+                content_path = body_store.path(content_sha256)
+                identifications.submit(content_path, content_sha256)
+                entry.content["_replaced"] = content_sha256
+                http_details["response_content_fileinfo"] = {
+                    "md5": content_md5,
+                    "sha1": content_hashes["sha1"],
+                    "sha256": content_sha256,
+                    "size": content_hashes["size"],
                 }
+                if entry.content.get("mimeType"):
+                    http_details["response_content_mimetype"] = entry.content["mimeType"]
+
+                if content_md5 not in downloads:
+                    downloads[content_md5] = {"path": content_path}
+
+                # The headers could contain the name of the downloaded file
+                # Some servers are returning an empty "Content-Disposition"
+                if content_disposition := entry.response_headers.get("Content-Disposition"):
+                    downloads[content_md5]["filename"] = content_disposition
+                    match = re.search(ASCII_FILENAME_REGEX, downloads[content_md5]["filename"])
+                    if match:
+                        downloads[content_md5]["filename"] = match.group(2)
+
+                    match = re.search(UTF8_FILENAME_REGEX, downloads[content_md5]["filename"])
+                    if match:
+                        downloads[content_md5]["filename"] = match.group(1)
+                else:
+                    filename = None
+                    entry_url = urlparse(entry.url)
+                    if "." in os.path.basename(entry_url.path):
+                        filename = os.path.basename(entry_url.path)
+
+                    if not filename:
+                        possible_filename = entry.url
+                        if len(possible_filename) > 150:
+                            parsed_url = entry_url._replace(fragment="")
+                            possible_filename = parsed_url.geturl()
+
+                        if len(possible_filename) > 150:
+                            parsed_url = parsed_url._replace(params="")
+                            possible_filename = parsed_url.geturl()
+
+                        if len(possible_filename) > 150:
+                            parsed_url = parsed_url._replace(query="")
+                            possible_filename = parsed_url.geturl()
+
+                        if len(possible_filename) > 150:
+                            parsed_url = parsed_url._replace(path="")
+                            possible_filename = parsed_url.geturl()
+                        filename = possible_filename
+
+                    downloads[content_md5]["filename"] = filename
+
+                if not downloads[content_md5]["filename"]:
+                    downloads[content_md5]["filename"] = f"UnknownFilename_{content_sha256[:8]}"
+                downloads[content_md5]["size"] = entry.content["size"]
+                downloads[content_md5]["url"] = entry.url
+                downloads[content_md5]["mimeType"] = entry.content["mimeType"]
+                downloads[content_md5]["sha256"] = content_sha256
+
+                if entry.status == 207 and downloads[content_md5]["mimeType"].startswith("text/xml"):
+                    webdav_entries = detect_webdav_listing(
+                        request, content_path, self.config.get("webdav", {}).get("max_entries", WEBDAV_MAX_ENTRIES)
+                    )
+                    if webdav_entries and request.get_param("webdav_recursion"):
+                        webdav_listings.append((entry.url, webdav_entries))
+                        if user_agent := entry.request_headers.get("User-Agent"):
+                            webdav_headers["User-Agent"] = user_agent
+
+            if skip_reason := entry.content.get("_skipped"):
+                skipped_bodies[skip_reason] = skipped_bodies.get(skip_reason, 0) + 1
 
-                # Figure out if there is an http redirect
-                if entry["response"]["status"] in [301, 302, 303, 307, 308]:
-                    redirecting_to = ""
-                    if "redirectURL" in entry["response"]:
-                        redirecting_to = entry["response"]["redirectURL"]
-                    if not redirecting_to and "Location" in response_headers:
-                        redirecting_to = response_headers["Location"]
-                    if not redirecting_to and "Refresh" in response_headers:
-                        if refresh := parse_refresh_header(response_headers["Refresh"]):
-                            redirecting_to = refresh
-                    if not redirecting_to and "refresh" in response_headers:
-                        if refresh := parse_refresh_header(response_headers["refresh"]):
-                            redirecting_to = refresh
-                    redirects.append(
+            if entry.error is not None:
+                response_errors.append((entry.url, entry.error))
+
+            connections.add(http_details)
+
+        connections.emit(
+            lambda http_details: self.ontology.add_result_part(
+                model=NetworkConnection, data={"http_details": http_details, "connection_type": "http"}
+            )
+        )
+        if connections.dropped:
+            self.log.warning(
+                f"{connections.dropped} HTTP connections were not added to the ontology, "
+                f"only {connections.max_connections} are kept"
+            )
+        if repeated := connections.repeated():
+            repeated_section = ResultTableSection("Repeated HTTP Requests", parent=request.result)
+            for http_details, count in repeated:
+                repeated_section.add_row(
+                    TableRow(
                         {
-                            "status": entry["response"]["status"],
-                            "redirecting_url": entry["request"]["url"],
-                            "redirecting_ip": (
-                                entry["serverIPAddress"] if "serverIPAddress" in entry else "Not Available"
-                            ),
-                            "redirecting_to": redirecting_to if redirecting_to else "Not Available",
+                            "method": http_details["request_method"],
+                            "url": http_details["request_uri"],
+                            "status": http_details["response_status_code"],
+                            "count": count,
                         }
                     )
+                )
+            repeated_section.set_column_order(["method", "url", "status", "count"])
+
+        # Only the metadata of the skipped responses is kept in the session log
+        if skipped_bodies:
+            skipped_section = ResultTableSection("Skipped HTTP Bodies", parent=request.result)
+            for reason, count in skipped_bodies.items():
+                skipped_section.add_row(TableRow({"reason": reason, "count": count}))
+            skipped_section.set_column_order(["reason", "count"])
+
+        if webdav_listings:
+            self.crawl_webdav(request, webdav_listings, webdav_headers)
+
+        # Add the modified entries log
+        request.add_supplementary(modified_har_filepath, "session.har", "Complete session log")
+
+        if meta_refresh:
+            redirect_graph.add_meta_refresh(actual_url.get("url", requested_url["url"]), meta_refresh)
+
+        if redirect_graph.redirects:
+            redirect_section = ResultTableSection("Redirections", parent=request.result)
+            for redirect in redirect_graph.redirects:
+                row = redirect.row()
+                redirect_section.add_row(TableRow(row))
+                add_unique_tag(redirect_section, "network.static.uri", row["redirecting_url"])
+                if row["redirecting_ip"] != "Not Available":
+                    redirect_section.add_tag("network.static.ip", row["redirecting_ip"])
+                if row["redirecting_to"] != "Not Available":
+                    add_unique_tag(redirect_section, "network.static.uri", row["redirecting_to"])
+            redirect_section.set_column_order(["status", "redirecting_url", "redirecting_ip", "redirecting_to"])
+
+            # The ontology gets the absolute targets, following the chain from the requested URL first
+            http_result["redirects"] = [
+                {"from_url": redirect.url, "to_url": redirect.resolved}
+                for redirect in redirect_graph.ordered(requested_url["url"])
+                if redirect.resolved
+            ]
+
+        self.ontology.add_result_part(model=Sandbox, data=sandbox_details)
+        self.ontology.add_result_part(model=HTTPResult, data=http_result)
+
+        for download_params in downloads.values():
+            download_params["fileinfo"] = identifications.result(download_params["sha256"])
+
+        if downloads:
+            content_section = ResultTableSection("Downloaded Content")
+            safelisted_section = ResultTableSection("Safelisted Content")
+            for download_params in downloads.values():
+                file_info = download_params["fileinfo"]
+                added = True
+
+                if (
+                    download_params["url"] in target_urls
+                    or len(downloads) == 1
+                    or re.match(request.get_param("regex_extract_filetype"), file_info["type"])
+                    or (
+                        request.get_param("extract_unmatched_filetype")
+                        and not re.match(request.get_param("regex_supplementary_filetype"), file_info["type"])
+                    )
+                ):
+                    added = request.add_extracted(
+                        download_params["path"],
+                        download_params["filename"],
+                        download_params["url"] or "Unknown URL",
+                        safelist_interface=self.api_interface,
+                        parent_relation=PARENT_RELATION.DOWNLOADED,
+                    )
+                else:
+                    request.add_supplementary(
+                        download_params["path"],
+                        download_params["filename"],
+                        download_params["url"] or "Unknown URL",
+                        parent_relation=PARENT_RELATION.DOWNLOADED,
+                    )
 
-                # Some redirects and hidden in the headers with 200 response codes
-                if "refresh" in response_headers:
-                    if refresh := parse_refresh_header(response_headers["refresh"]):
-                        redirects.append(
-                            {
-                                "status": entry["response"]["status"],
-                                "redirecting_url": entry["request"]["url"],
-                                "redirecting_ip": (
-                                    entry["serverIPAddress"] if "serverIPAddress" in entry else "Not Available"
-                                ),
-                                "redirecting_to": refresh,
-                            }
+                (content_section if added else safelisted_section).add_row(
+                    TableRow(
+                        dict(
+                            Filename=download_params["filename"],
+                            Size=download_params["size"],
+                            mimeType=download_params["mimeType"],
+                            url=download_params["url"],
+                            SHA256=file_info["sha256"],
                         )
-
-                # Find all content that was downloaded from the servers
-                if "size" in entry["response"]["content"] and entry["response"]["content"]["size"] != 0:
-                    content_text = entry["response"]["content"].pop("text")
-                    if (
-                        "encoding" in entry["response"]["content"]
-                        and entry["response"]["content"]["encoding"] == "base64"
-                    ):
-                        try:
-                            content = base64.b64decode(content_text)
-                        except Exception:
-                            content = content_text.encode()
-                    else:
-                        content = content_text.encode()
-
-                    with tempfile.NamedTemporaryFile(
-                        dir=self.working_directory, delete=False, mode="wb"
-                    ) as content_file:
-                        content_file.write(content)
-
-                    fileinfo = self.identify.fileinfo(
-                        content_file.name, skip_fuzzy_hashes=True, calculate_entropy=False
                     )
-                    content_md5 = fileinfo["md5"]
-                    entry["response"]["content"]["_replaced"] = fileinfo["sha256"]
-                    http_details["response_content_fileinfo"] = {
-                        "md5": fileinfo["md5"],
-                        "sha1": fileinfo["sha1"],
-                        "sha256": fileinfo["sha256"],
-                        "size": fileinfo["size"],
-                    }
-                    if "mimeType" in entry["response"]["content"] and entry["response"]["content"]["mimeType"]:
-                        http_details["response_content_mimetype"] = entry["response"]["content"]["mimeType"]
-
-                    if content_md5 not in downloads:
-                        downloads[content_md5] = {"path": content_file.name}
-
-                    # The headers could contain the name of the downloaded file
-                    if (
-                        "Content-Disposition" in response_headers
-                        # Some servers are returning an empty "Content-Disposition"
-                        and response_headers["Content-Disposition"]
-                    ):
-                        downloads[content_md5]["filename"] = response_headers["Content-Disposition"]
-                        match = re.search(ASCII_FILENAME_REGEX, downloads[content_md5]["filename"])
-                        if match:
-                            downloads[content_md5]["filename"] = match.group(2)
-
-                        match = re.search(UTF8_FILENAME_REGEX, downloads[content_md5]["filename"])
-                        if match:
-                            downloads[content_md5]["filename"] = match.group(1)
-                    else:
-                        filename = None
-                        requested_url = urlparse(entry["request"]["url"])
-                        if "." in os.path.basename(requested_url.path):
-                            filename = os.path.basename(requested_url.path)
-
-                        if not filename:
-                            possible_filename = entry["request"]["url"]
-                            if len(possible_filename) > 150:
-                                parsed_url = requested_url._replace(fragment="")
-                                possible_filename = parsed_url.geturl()
-
-                            if len(possible_filename) > 150:
-                                parsed_url = parsed_url._replace(params="")
-                                possible_filename = parsed_url.geturl()
-
-                            if len(possible_filename) > 150:
-                                parsed_url = parsed_url._replace(query="")
-                                possible_filename = parsed_url.geturl()
-
-                            if len(possible_filename) > 150:
-                                parsed_url = parsed_url._replace(path="")
-                                possible_filename = parsed_url.geturl()
-                            filename = possible_filename
-
-                        downloads[content_md5]["filename"] = filename
-
-                    if not downloads[content_md5]["filename"]:
-                        downloads[content_md5]["filename"] = f"UnknownFilename_{fileinfo['sha256'][:8]}"
-                    downloads[content_md5]["size"] = entry["response"]["content"]["size"]
-                    downloads[content_md5]["url"] = entry["request"]["url"]
-                    downloads[content_md5]["mimeType"] = entry["response"]["content"]["mimeType"]
-                    downloads[content_md5]["fileinfo"] = fileinfo
-
-                    if entry["response"]["status"] == 207 and downloads[content_md5]["mimeType"].startswith("text/xml"):
-                        detect_webdav_listing(request, content)
-
-                if "_errorMessage" in entry["response"]:
-                    response_errors.append((entry["request"]["url"], entry["response"]["_errorMessage"]))
-
-                self.ontology.add_result_part(
-                    model=NetworkConnection, data={"http_details": http_details, "connection_type": "http"}
                 )
 
-            # Add the modified entries log
-            modified_har_filepath = os.path.join(self.working_directory, "modified_session.har")
-            with open(modified_har_filepath, "w") as f:
-                json.dump(har_content, f)
-
-            request.add_supplementary(modified_har_filepath, "session.har", "Complete session log")
-
-            if redirects:
-                http_result["redirects"] = []
-                redirect_section = ResultTableSection("Redirections", parent=request.result)
-                for redirect in redirects:
-                    redirect_section.add_row(TableRow(redirect))
-                    add_tag(redirect_section, "network.static.uri", redirect["redirecting_url"])
-                    if redirect["redirecting_ip"] != "Not Available":
-                        redirect_section.add_tag("network.static.ip", redirect["redirecting_ip"])
-                    if redirect["redirecting_to"] != "Not Available":
-                        add_tag(redirect_section, "network.static.uri", redirect["redirecting_to"])
-                    http_result["redirects"].append(
-                        {"from_url": redirect["redirecting_url"], "to_url": redirect["redirecting_to"]}
+                if download_params["url"] != "Unknown URL":
+                    add_unique_tag(
+                        content_section if added else safelisted_section,
+                        "network.static.uri",
+                        download_params["url"],
                     )
-                redirect_section.set_column_order(["status", "redirecting_url", "redirecting_ip", "redirecting_to"])
-
-            self.ontology.add_result_part(model=Sandbox, data=sandbox_details)
-            self.ontology.add_result_part(model=HTTPResult, data=http_result)
-
-            if downloads:
-                content_section = ResultTableSection("Downloaded Content")
-                safelisted_section = ResultTableSection("Safelisted Content")
-                for download_params in downloads.values():
-                    file_info = download_params["fileinfo"]
-                    added = True
-
-                    if (
-                        download_params["url"] in target_urls
-                        or len(downloads) == 1
-                        or re.match(request.get_param("regex_extract_filetype"), file_info["type"])
-                        or (
-                            request.get_param("extract_unmatched_filetype")
-                            and not re.match(request.get_param("regex_supplementary_filetype"), file_info["type"])
-                        )
-                    ):
-                        added = request.add_extracted(
-                            download_params["path"],
-                            download_params["filename"],
-                            download_params["url"] or "Unknown URL",
-                            safelist_interface=self.api_interface,
-                            parent_relation=PARENT_RELATION.DOWNLOADED,
-                        )
-                    else:
-                        request.add_supplementary(
-                            download_params["path"],
-                            download_params["filename"],
-                            download_params["url"] or "Unknown URL",
-                            parent_relation=PARENT_RELATION.DOWNLOADED,
-                        )
 
-                    (content_section if added else safelisted_section).add_row(
-                        TableRow(
-                            dict(
-                                Filename=download_params["filename"],
-                                Size=download_params["size"],
-                                mimeType=download_params["mimeType"],
-                                url=download_params["url"],
-                                SHA256=file_info["sha256"],
-                            )
-                        )
-                    )
+            if content_section.body:
+                request.result.add_section(content_section)
+            if safelisted_section.body:
+                request.result.add_section(safelisted_section)
+
+        if response_errors:
+            error_section = ResultTextSection("Responses Error", parent=request.result)
+            for response_url, response_error in response_errors:
+                error_section.add_line(f"{response_url}: {response_error}")
+
+    def fetch_timeout(self) -> float:
+        """Time the browser gets to fetch the URL.
+
+        Returns:
+            The request timeout, or what is left before the task deadline if the task waited for other tasks.
+        """
+        return max(min(self.request_timeout, self.task_deadline - time.monotonic()), 1)
+
+    def wait_budget(self, wait: float) -> float:
+        """Time a task can wait for other tasks, the waits of a task share the same deadline.
+
+        Returns:
+            The wait, cut to what is left before the task deadline once the browser got its request timeout.
+        """
+        return max(min(wait, self.task_deadline - time.monotonic() - self.request_timeout), 0)
+
+    def hold_host_slot(self, request: ServiceRequest) -> bool:
+        """Wait for a slot of the host governor before the first request to the host of the URL.
+
+        Fetches of the same site are capped and spread over time, across the instances sharing the cache folder.
+        The slot is held until the task is done.
+
+        Returns:
+            Whether requests can be made to the host, False if the task gave up waiting for it.
+        """
+        if not self.host_governor:
+            return True
+        if self.host_slot is None:
+            self.host_slot = self.host_slots.enter_context(
+                self.host_governor.slot(
+                    request.task.fileinfo.uri_info.hostname or "", self.wait_budget(self.host_governor.max_wait)
+                )
+            )
+            if not self.host_slot.acquired:
+                request.partial()
+                governor_section = ResultTextSection("Host busy", parent=request.result)
+                governor_section.add_line(
+                    f"Other tasks were fetching from {self.host_slot.key}, the URL was not fetched after waiting "
+                    f"{self.host_slot.waited:.0f} seconds."
+                )
+        return self.host_slot.acquired
 
-                    if download_params["url"] != "Unknown URL":
-                        add_tag(
-                            content_section if added else safelisted_section,
-                            "network.static.uri",
-                            download_params["url"],
-                        )
+    def execute(self, request: ServiceRequest) -> None:
+        self.task_deadline = time.monotonic() + self.service_attributes.timeout - TIMEOUT_MARGIN
+        request.result = Result()
 
-                if content_section.body:
-                    request.result.add_section(content_section)
-                if safelisted_section.body:
-                    request.result.add_section(safelisted_section)
+        if request.task.depth != 0 and request.get_param("only_submitted_url"):
+            request.partial()
+            return
 
-            if response_errors:
-                error_section = ResultTextSection("Responses Error", parent=request.result)
-                for response_url, response_error in response_errors:
-                    error_section.add_line(f"{response_url}: {response_error}")
-        else:
-            requests_content_path = self.send_http_request(method, request, data)
+        with open(request.file_path, "r") as f:
+            data = yaml.safe_load(f)
 
-            if not requests_content_path:
+        data.pop("uri")
+        for no_dl in self.do_not_download_regexes:
+            # Do nothing if we are not supposed to scan that URL
+            if no_dl.match(request.task.fileinfo.uri_info.uri):
                 return
 
-            file_info = self.identify.fileinfo(requests_content_path, skip_fuzzy_hashes=True, calculate_entropy=False)
-            if no_browser or file_info["type"].startswith("archive"):
-                request.add_extracted(
-                    requests_content_path,
-                    file_info["sha256"],
-                    "Archive from the URI",
-                    parent_relation=PARENT_RELATION.DOWNLOADED,
+        # The best live upstream of the proxy profile is used, the others are tried if it cannot be reached
+        self.proxy_endpoints = self.proxy_pool.select(request.get_param("proxy"))
+        self.add_proxy_health_section(request)
+
+        method = data.pop("method", "GET")
+        # Fallback on old parameter "force_requests" for backward compatibility.
+        no_browser = request.get_param("no_browser") or request.task.service_config.get("force_requests", False)
+        if self.preflight and not self.check_reachable(request):
+            if method == "GET" and not no_browser:
+                self.browser_launches_avoided += 1
+            return
+
+        # The slot of the host, taken by the first request to the host, is released once the task is done
+        self.host_slot = None
+        with self.host_slots:
+            self.fetch(request, method, data, no_browser)
+
+    def browser_params(self, request: ServiceRequest, data: dict) -> tuple[dict, dict]:
+        """Take the parameters given to Kangooroo out of the task data, the others are reported as ignored.
+
+        Returns:
+            The request headers and the browser settings.
+        """
+        headers = data.pop("headers", {})
+        browser_settings = data.pop("browser_settings", {})
+        if data:
+            ignored_params_section = ResultKeyValueSection("Ignored params", parent=request.result)
+            ignored_params_section.update_items(data)
+        return headers, browser_settings
+
+    def process_cached_output(self, request: ServiceRequest, data: dict, cache_key: str) -> bool:
+        """Rebuild the result from the output of a previous Kangooroo run, without fetching from the host.
+
+        Returns:
+            Whether an output was cached for the URL and its parameters.
+        """
+        output_folder = self.restore_cached_output(request, cache_key)
+        if output_folder is None:
+            return False
+        self.browser_params(request, data)
+        self.process_kangooroo_output(request, output_folder, data)
+        return True
+
+    def fetch(self, request: ServiceRequest, method: str, data: dict, no_browser: bool):
+        uri = request.task.fileinfo.uri_info.uri
+        browser = method == "GET" and not no_browser
+        if browser and "\x00" in uri:
+            # We won't try to fetch URIs with a null byte using subprocess.
+            # This would cause a fork_exec issue. We will return an empty result instead.
+            return
+
+        self.kangooroo_folders = None
+        try:
+            # Tasks fetching the same URL with the same parameters can reuse the output of a previous Kangooroo run
+            cache_key = None
+            if browser and self.result_cache:
+                cache_key = ResultCache.key(
+                    uri,
+                    {
+                        "proxy": request.get_param("proxy"),
+                        "headers": data.get("headers", {}),
+                        "browser_settings": data.get("browser_settings", {}),
+                        "no_browser": no_browser,
+                    },
                 )
-            else:
-                request.add_supplementary(requests_content_path, file_info["sha256"], "Full content from the URI")
+                if self.process_cached_output(request, data, cache_key):
+                    return
+
+            # Only one task at a time fetches the URL with the same parameters, the others wait for its output
+            flight_context = contextlib.nullcontext()
+            if cache_key and self.single_flight:
+                flight_context = self.single_flight.flight(cache_key, self.wait_budget(self.single_flight.wait))
+            with flight_context as flight:
+                if (
+                    flight
+                    and flight.waited
+                    and flight.acquired
+                    and self.process_cached_output(request, data, cache_key)
+                ):
+                    return
+                self.fetch_from_host(request, method, data, no_browser, cache_key)
+        finally:
+            # Whatever is left of the Kangooroo output is not part of the result, even if the run failed
+            if self.kangooroo_folders:
+                self.kangooroo_folders.cleanup()
+
+    def fetch_from_host(
+        self, request: ServiceRequest, method: str, data: dict, no_browser: bool, cache_key: str | None
+    ):
+        # Every request made to the host, from the routing probe to the ones made while processing the output,
+        # is made while holding a slot of the host
+        if not self.hold_host_slot(request):
+            return
+
+        routed = False
+        if self.download_routing and method == "GET" and not no_browser:
+            # Files served for download are fetched directly, the browser would only end up downloading them
+            routed = self.route_download(request, data)
+        if method == "GET" and not no_browser and not routed:
+            headers, browser_settings = self.browser_params(request, data)
+            # use Kangooroo to fetch URL
+            start = time.monotonic()
+            output_folder = self.execute_kangooroo(request, headers, browser_settings, self.fetch_timeout())
+            if self.download_routing:
+                self.download_routing.browser_run(time.monotonic() - start)
+            # A cached output missing its download would have it fetched again without a slot of the host
+            if cache_key and not self.kangooroo_timed_out and not incomplete_download(output_folder):
+                self.result_cache.store(cache_key, output_folder)
+            self.process_kangooroo_output(request, output_folder, data)
+            return
+
+        start = time.monotonic()
+        download = self.send_http_request(method, request, data)
+        if routed:
+            self.download_routing.direct_run(time.monotonic() - start)
+
+        if not download:
+            return
+
+        file_info = self.fileinfo_cache.fileinfo(download.path, download.sha256)
+        if (no_browser or routed or file_info["type"].startswith("archive")) and not download.truncated:
+            request.add_extracted(
+                download.path,
+                download.sha256,
+                "Archive from the URI",
+                parent_relation=PARENT_RELATION.DOWNLOADED,
+            )
+        else:
+            request.add_supplementary(
+                download.path,
+                download.sha256,
+                "Truncated content from the URI" if download.truncated else "Full content from the URI",
+            )
@@ -0,0 +1,78 @@
+import xml.etree.ElementTree as ET
+from typing import IO
+
+DAV = "{DAV:}"
+# Maximum number of entries read from a multistatus document
+MAX_ENTRIES = 1000
+
+
+class WebDAVEntry:
+    __slots__ = ("href", "size", "type", "last_modified")
+
+    def __init__(self, href: str, size: int | None, type: str, last_modified: str | None) -> None:
+        self.href = href
+        self.size = size
+        # "folder" for a collection, else the content type of the file
+        self.type = type
+        self.last_modified = last_modified
+
+    @property
+    def is_folder(self) -> bool:
+        return self.type == "folder"
+
+
+def _parse_response(response: ET.Element) -> WebDAVEntry | None:
+    href = response.findtext(f"{DAV}href")
+    if not href:
+        return None
+
+    size = content_type = last_modified = None
+    is_folder = False
+    for propstat in response.iter(f"{DAV}propstat"):
+        status = propstat.findtext(f"{DAV}status")
+        if status and " 200 " not in f"{status} ":
+            # Properties the server could not return
+            continue
+        prop = propstat.find(f"{DAV}prop")
+        if prop is None:
+            continue
+        length = prop.findtext(f"{DAV}getcontentlength")
+        if length and length.strip().isdigit():
+            size = int(length)
+        content_type = prop.findtext(f"{DAV}getcontenttype") or content_type
+        last_modified = prop.findtext(f"{DAV}getlastmodified") or last_modified
+        if prop.find(f"{DAV}resourcetype/{DAV}collection") is not None:
+            is_folder = True
+
+    entry_type = "folder" if is_folder else content_type or "unknown"
+    return WebDAVEntry(href.strip(), size, entry_type, last_modified.strip() if last_modified else None)
+
+
+def parse_multistatus(source: str | IO[bytes], max_entries: int = MAX_ENTRIES) -> tuple[list[WebDAVEntry], bool]:
+    """Stream the responses of a WebDAV multistatus document, releasing each one once it is read.
+
+    Returns:
+        The entries found, and whether the document held more than max_entries of them. A malformed document
+        gives the entries read before the error.
+    """
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return parse_multistatus(f, max_entries)
+
+    entries = []
+    root = None
+    try:
+        for event, element in ET.iterparse(source, events=("start", "end")):
+            if root is None:
+                root = element
+            if event != "end" or element.tag != f"{DAV}response":
+                continue
+            if len(entries) >= max_entries:
+                return entries, True
+            if entry := _parse_response(element):
+                entries.append(entry)
+            # Responses are direct children of the multistatus root
+            root.clear()
+    except ET.ParseError:
+        pass
+    return entries, False
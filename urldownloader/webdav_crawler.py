@@ -0,0 +1,178 @@
+import asyncio
+import io
+from urllib.parse import urljoin, urlparse
+
+import httpx
+
+from urldownloader.webdav import WebDAVEntry, parse_multistatus
+
+PROPFIND_BODY = (
+    b'<?xml version="1.0" encoding="utf-8"?><d:propfind xmlns:d="DAV:"><d:prop><d:resourcetype/>'
+    b"<d:getcontentlength/><d:getcontenttype/><d:getlastmodified/></d:prop></d:propfind>"
+)
+# Bytes read from a single PROPFIND answer, a truncated document still gives the entries read so far
+MAX_LISTING_SIZE = 4 * 1024 * 1024
+
+
+class WebDAVTree:
+    def __init__(self) -> None:
+        self.roots: list[str] = []
+        # Folder URL to the (URL, entry) of its children
+        self.folders: dict[str, list[tuple[str, WebDAVEntry]]] = {}
+        # Folder URL to the reason it could not be listed
+        self.errors: dict[str, str] = {}
+        self.entry_count = 0
+        self.entries_truncated = False
+        self.depth_truncated = False
+        self.timed_out = False
+
+    def lines(self) -> list[str]:
+        """Render the tree, each level indented by two spaces under its folder.
+
+        Returns:
+            The lines describing the tree, starting with each root folder.
+        """
+        lines = []
+        for root in self.roots:
+            lines.append(root)
+            self._folder_lines(root, 1, lines, {root})
+        return lines
+
+    def _folder_lines(self, folder: str, level: int, lines: list[str], seen: set[str]) -> None:
+        for url, entry in self.folders.get(folder, []):
+            name = url[len(folder) :] if url.startswith(folder) else url
+            if entry.is_folder:
+                lines.append(f"{'  ' * level}{name}")
+                if url in self.errors:
+                    lines.append(f"{'  ' * (level + 1)}[{self.errors[url]}]")
+                if url not in seen:
+                    self._folder_lines(url, level + 1, lines, seen | {url})
+            else:
+                details = entry.type if entry.size is None else f"{entry.type}, {entry.size} bytes"
+                lines.append(f"{'  ' * level}{name} ({details})")
+
+
+class WebDAVCrawler:
+    """List the subfolders of a WebDAV share with concurrent PROPFIND requests of depth 1.
+
+    Only the folders on the same scheme and host as the listing they were found in are followed.
+    """
+
+    def __init__(
+        self,
+        proxies: dict | None = None,
+        headers: dict | None = None,
+        max_depth: int = 3,
+        max_entries: int = 1000,
+        max_in_flight: int = 4,
+        time_budget: float = 30,
+        request_timeout: float = 10,
+    ) -> None:
+        self.proxies = proxies or {}
+        self.headers = headers or {}
+        self.max_depth = max_depth
+        self.max_entries = max_entries
+        self.max_in_flight = max_in_flight
+        self.time_budget = time_budget
+        self.request_timeout = request_timeout
+
+    def crawl(self, listings: list[tuple[str, list[WebDAVEntry]]]) -> WebDAVTree:
+        """Walk the folders found in already parsed listings, sharing the caps and the time budget between them.
+
+        Returns:
+            The tree of every listed folder.
+        """
+        return asyncio.run(self._crawl(listings))
+
+    async def _crawl(self, listings: list[tuple[str, list[WebDAVEntry]]]) -> WebDAVTree:
+        tree = WebDAVTree()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.time_budget
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        proxy_mounts = {
+            f"{scheme}://": httpx.AsyncHTTPTransport(proxy=f"http://{proxy}" if "://" not in proxy else proxy)
+            for scheme, proxy in self.proxies.items()
+        }
+        pending: dict[asyncio.Task, tuple[str, int]] = {}
+
+        async with httpx.AsyncClient(mounts=proxy_mounts, headers=self.headers, timeout=self.request_timeout) as client:
+
+            def add_folder(folder: str, depth: int, entries: list[WebDAVEntry], truncated: bool) -> None:
+                children = tree.folders.setdefault(folder, [])
+                tree.entries_truncated |= truncated
+                for entry in entries:
+                    url = urljoin(folder, entry.href)
+                    if url.rstrip("/") == folder.rstrip("/"):
+                        # A listing starts with the folder itself
+                        continue
+                    if tree.entry_count >= self.max_entries:
+                        tree.entries_truncated = True
+                        return
+                    if entry.is_folder and not url.endswith("/"):
+                        url += "/"
+                    children.append((url, entry))
+                    tree.entry_count += 1
+                    if not entry.is_folder or url in tree.folders or not same_origin(folder, url):
+                        continue
+                    if depth >= self.max_depth:
+                        tree.depth_truncated = True
+                        continue
+                    tree.folders[url] = []
+                    task = asyncio.create_task(self._propfind(client, semaphore, url))
+                    pending[task] = (url, depth + 1)
+
+            for url, entries in listings:
+                folder = url if url.endswith("/") else f"{url}/"
+                if folder not in tree.folders:
+                    tree.roots.append(folder)
+                    add_folder(folder, 0, entries, False)
+
+            while pending:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    folder, depth = pending.pop(task)
+                    try:
+                        entries, truncated = task.result()
+                    except (httpx.HTTPError, ValueError) as e:
+                        tree.errors[folder] = str(e) or type(e).__name__
+                        continue
+                    add_folder(folder, depth, entries, truncated)
+
+            if pending:
+                tree.timed_out = True
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        return tree
+
+    async def _propfind(
+        self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, url: str
+    ) -> tuple[list[WebDAVEntry], bool]:
+        async with (
+            semaphore,
+            client.stream(
+                "PROPFIND",
+                url,
+                headers={"Depth": "1", "Content-Type": "application/xml"},
+                content=PROPFIND_BODY,
+            ) as response,
+        ):
+            if response.status_code != 207:
+                raise ValueError(f"HTTP {response.status_code}")
+            listing = io.BytesIO()
+            async for chunk in response.aiter_bytes():
+                listing.write(chunk)
+                if listing.tell() >= MAX_LISTING_SIZE:
+                    break
+        listing.seek(0)
+        # The folder itself is part of its listing
+        return parse_multistatus(listing, self.max_entries + 1)
+
+
+def same_origin(first: str, second: str) -> bool:
+    first_url, second_url = urlparse(first), urlparse(second)
+    return (first_url.scheme, first_url.netloc) == (second_url.scheme, second_url.netloc)